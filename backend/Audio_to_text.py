@@ -1,30 +1,204 @@
-import librosa
 from dotenv import load_dotenv
 import assemblyai as aai
 import os
+import threading
+
+import numpy as np
 
 # Load the .env file
 load_dotenv()
 
 aai.settings.api_key = os.getenv("API_Key")
 
+# ------------------- Transcription backends -------------------
+#
+# Every backend turns an audio file into diarized utterances
+#   [{"start": sec, "end": sec, "speaker": "A", "text": "..."}]
+# which get_text() writes in the transcript layout the rest of the
+# pipeline parses (Named_Transcript.parse_transcript).
+#
+#   assemblyai  hosted transcription with speaker labels (default)
+#   local       faster-whisper (int8, CPU) + ECAPA speaker clustering
+#   auto        local for clips up to LOCAL_ASR_MAX_SECONDS, else assemblyai
+#
+# Selected with $ASR_BACKEND.
+
+ASR_BACKEND = os.getenv("ASR_BACKEND", "assemblyai")
+LOCAL_ASR_MODEL = os.getenv("LOCAL_ASR_MODEL", "small")
+LOCAL_ASR_MAX_SECONDS = float(os.getenv("LOCAL_ASR_MAX_SECONDS", 120))
+SAMPLE_RATE = 16000
+
+
+class AssemblyAIBackend:
+    name = "assemblyai"
+
+    def transcribe(self, audio_file):
+        config = aai.TranscriptionConfig(
+            speech_model=aai.SpeechModel.universal,
+            speaker_labels=True
+        )
+        print(audio_file)
+        transcript = aai.Transcriber(config=config).transcribe(audio_file)
+        if transcript.status == "error":
+            raise RuntimeError(f"Transcription failed: {transcript.error}")
+
+        return [
+            {
+                "start": u.start / 1000,
+                "end": u.end / 1000,
+                "speaker": u.speaker,
+                "text": u.text,
+            }
+            for u in transcript.utterances
+        ]
+
+
+def speaker_label(n):
+    """0 -> "A", ..., 25 -> "Z", 26 -> "AA", 27 -> "AB", ... (spreadsheet-column style, never repeats)."""
+    label = ""
+    n += 1
+    while n:
+        n, rem = divmod(n - 1, 26)
+        label = chr(ord("A") + rem) + label
+    return label
+
+
+class LocalBackend:
+    """
+    Offline CPU transcription: faster-whisper segments, each embedded with
+    the bundled ECAPA model and clustered by cosine similarity into
+    speakers; consecutive segments of one speaker become one utterance.
+    """
+
+    name = "local"
+    SAME_SPEAKER_COSINE = 0.5   # ECAPA cosine above which a segment joins a cluster
+    MIN_EMBED_SECONDS = 1.0     # shorter segments inherit the previous speaker
+
+    def __init__(self, model_size=LOCAL_ASR_MODEL, encoder=None):
+        from faster_whisper import WhisperModel
+
+        self.model = WhisperModel(model_size, device="cpu", compute_type="int8")
+        self._encoder = encoder
+
+    @property
+    def encoder(self):
+        # the process-wide ECAPA model unless one was injected; never a second copy
+        if self._encoder is None:
+            from .voice_embedding import get_voice_encoder
+
+            self._encoder = get_voice_encoder()
+        return self._encoder
+
+    def transcribe(self, audio_file):
+        from faster_whisper import decode_audio
 
-def get_text(audio_file, out_path):
-    config = aai.TranscriptionConfig(
-        speech_model=aai.SpeechModel.universal,
-        speaker_labels=True 
-    )
-    print(audio_file)
-    transcript = aai.Transcriber(config=config).transcribe(audio_file)
-    if transcript.status == "error":
-        raise RuntimeError(f"Transcription failed: {transcript.error}")
+        samples = decode_audio(audio_file, sampling_rate=SAMPLE_RATE)
+        segments, _ = self.model.transcribe(samples, vad_filter=True)
+        segments = [
+            {"start": round(s.start, 2), "end": round(s.end, 2), "text": s.text.strip()}
+            for s in segments if s.text.strip()
+        ]
+        if not segments:
+            return []
 
+        labels = self.diarize(samples, segments)
+        utterances = []
+        for seg, label in zip(segments, labels):
+            if utterances and utterances[-1]["speaker"] == label:
+                utterances[-1]["end"] = seg["end"]
+                utterances[-1]["text"] += " " + seg["text"]
+            else:
+                utterances.append({**seg, "speaker": label})
+        return utterances
+
+    def transcribe_samples(self, samples):
+        """Plain text of a short 16 kHz mono clip (no diarization), e.g. a live segment."""
+        segments, _ = self.model.transcribe(samples, vad_filter=True)
+        return " ".join(s.text.strip() for s in segments if s.text.strip())
+
+    def diarize(self, samples, segments):
+        """Speaker label ("A", "B", ...) per segment, in order of first appearance."""
+        long_idx = [
+            i for i, s in enumerate(segments)
+            if s["end"] - s["start"] >= self.MIN_EMBED_SECONDS
+        ]
+        clips = [
+            samples[int(segments[i]["start"] * SAMPLE_RATE):int(segments[i]["end"] * SAMPLE_RATE)]
+            for i in long_idx
+        ]
+        embeddings = self.encoder.embed_batch(clips) if clips else np.zeros((0, 0))
+
+        # greedy online clustering against running, normalized centroids
+        centroids, counts, cluster_of = [], [], {}
+        for i, emb in zip(long_idx, embeddings):
+            scores = [float(c @ emb) for c in centroids]
+            best = int(np.argmax(scores)) if scores else -1
+            if best >= 0 and scores[best] >= self.SAME_SPEAKER_COSINE:
+                total = centroids[best] * counts[best] + emb
+                centroids[best] = total / np.linalg.norm(total)
+                counts[best] += 1
+            else:
+                centroids.append(emb)
+                counts.append(1)
+                best = len(centroids) - 1
+            cluster_of[i] = best
+
+        letters, labels, previous = {}, [], 0
+        for i in range(len(segments)):
+            cluster = cluster_of.get(i, previous)
+            previous = cluster
+            if cluster not in letters:
+                letters[cluster] = speaker_label(len(letters))
+            labels.append(letters[cluster])
+        return labels
+
+
+_backends = {}
+_backends_lock = threading.Lock()
+
+
+def register_backend(name, backend):
+    """Add a backend under `name` (e.g. a recorded-response fake for benchmarks)."""
+    with _backends_lock:
+        _backends[name] = backend
+
+
+def get_backend(name=None, duration=None):
+    """Cached backend instance; "auto" picks by clip `duration` (seconds)."""
+    name = name or ASR_BACKEND
+    if name == "auto":
+        name = "local" if duration is not None and duration <= LOCAL_ASR_MAX_SECONDS else "assemblyai"
+    with _backends_lock:
+        if name not in _backends:
+            if name == "assemblyai":
+                _backends[name] = AssemblyAIBackend()
+            elif name == "local":
+                _backends[name] = LocalBackend()
+            else:
+                raise ValueError(f"Unknown ASR_BACKEND {name!r}; expected assemblyai, local, auto "
+                                 f"or a registered backend")
+        return _backends[name]
+
+
+def write_transcript(utterances, out_path):
     with open(out_path, "w", encoding="utf-8") as f:
-        for u in transcript.utterances:
-            start = u.start / 1000
-            end = u.end / 1000
-            speaker = u.speaker
-            text = u.text.replace("\n", " ")
-            f.write(f"[ Start Time:{start} End Time:{end} ]\nSpeaker {speaker}: {text}\n")
-
-    print(f"Wrote transcript to {out_path}")
\ No newline at end of file
+        for u in utterances:
+            text = u["text"].replace("\n", " ")
+            f.write(f"[ Start Time:{u['start']} End Time:{u['end']} ]\nSpeaker {u['speaker']}: {text}\n")
+
+
+def get_text(audio_file, out_path, time_map=None, backend=None, duration=None):
+    """
+    Transcribe `audio_file` with speaker labels into `out_path`.
+    `time_map(seconds) -> seconds` maps utterance times back onto the
+    original recording when silence was trimmed before upload.
+    Returns the utterances.
+    """
+    asr = get_backend(backend, duration)
+    utterances = asr.transcribe(audio_file)
+    if time_map is not None:
+        utterances = [{**u, "start": time_map(u["start"]), "end": time_map(u["end"])} for u in utterances]
+
+    write_transcript(utterances, out_path)
+    print(f"Wrote transcript to {out_path} ({asr.name}, {len(utterances)} utterances)")
+    return utterances
@@ -4,23 +4,153 @@ import google.generativeai as genai
 import os
 import dotenv
 import re
+import math
+from collections import Counter, defaultdict
 
 dotenv.load_dotenv()
 genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
 
 
-def summarize_speaker_content(transcript_text: str) -> dict:
+UTTERANCE_RE = re.compile(
+    r"^\[ Start Time:(?P<start>[\d.]+) End Time:(?P<end>[\d.]+) \]\n(?P<speaker>[^:\n]+): (?P<text>.*)$",
+    flags=re.MULTILINE,
+)
+
+
+def parse_transcript(transcript_text: str) -> list:
+    """
+    Parse a transcript written by Audio_to_text.get_text into utterances:
+    [{"start": sec, "end": sec, "speaker": "A", "text": "..."}]
+    """
+    utterances = []
+    for m in UTTERANCE_RE.finditer(transcript_text):
+        speaker = m.group("speaker").strip()
+        if speaker.startswith("Speaker "):
+            speaker = speaker[len("Speaker "):]
+        utterances.append({
+            "start": float(m.group("start")),
+            "end": float(m.group("end")),
+            "speaker": speaker,
+            "text": m.group("text"),
+        })
+    return utterances
+
+
+# ------------------- Local per-speaker pre-pass -------------------
+#
+# The summary prompt gets per-speaker statistics plus a bounded excerpt of
+# each speaker's most distinctive turns instead of the whole transcript, so
+# its size no longer grows with conversation length. Keyphrases are TF-IDF
+# scored uni/bigrams: term counts over a speaker's turns, IDF over all turns.
+
+WORD_RE = re.compile(r"[a-z0-9']+")
+STOPWORDS = frozenset("""
+a about above after again all also am an and any are as at be because been before being
+below between both but by can could did do does doing don't down during each few for from
+further get got had has have having he her here hers him his how i i'm if in into is it it's
+its just know like me more most my no nor not now of off on once only or other our ours out
+over own really right same she should so some such than that that's the their theirs them
+then there these they this those through to too um uh under until up us very was we we're
+were what when where which while who whom why will with would yeah yes you you're your yours
+okay oh going gonna want think thing things kind lot mean one
+""".split())
+
+EXCERPT_CHARS_PER_SPEAKER = 1200
+TOP_KEYPHRASES = 8
+
+
+def _terms(text):
+    words = [w for w in WORD_RE.findall(text.lower()) if w not in STOPWORDS and len(w) > 2]
+    return words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+
+
+def speaker_statistics(utterances: list, top_k: int = TOP_KEYPHRASES) -> dict:
+    """
+    { "Speaker A": {"talk_seconds", "turns", "words", "keyphrases": [...]}, ... }
+    """
+    turn_terms = [_terms(u["text"]) for u in utterances]
+    doc_freq = Counter(term for terms in turn_terms for term in set(terms))
+    n_turns = len(utterances)
+
+    stats = {}
+    term_counts = defaultdict(Counter)
+    for u, terms in zip(utterances, turn_terms):
+        label = f"Speaker {u['speaker']}"
+        s = stats.setdefault(label, {"talk_seconds": 0.0, "turns": 0, "words": 0})
+        s["talk_seconds"] += max(0.0, u["end"] - u["start"])
+        s["turns"] += 1
+        s["words"] += len(u["text"].split())
+        term_counts[label].update(terms)
+
+    for label, s in stats.items():
+        scored = {
+            term: count * (math.log((1 + n_turns) / (1 + doc_freq[term])) + 1)
+            for term, count in term_counts[label].items()
+        }
+        s["talk_seconds"] = round(s["talk_seconds"], 1)
+        s["keyphrases"] = [t for t, _ in sorted(scored.items(), key=lambda kv: -kv[1])[:top_k]]
+    return stats
+
+
+def speaker_excerpts(utterances: list, stats: dict,
+                     max_chars: int = EXCERPT_CHARS_PER_SPEAKER) -> dict:
+    """
+    Each speaker's turns richest in their keyphrases, in spoken order,
+    within `max_chars` (a single over-long turn is truncated).
+    """
+    by_speaker = defaultdict(list)
+    for i, u in enumerate(utterances):
+        by_speaker[f"Speaker {u['speaker']}"].append((i, u["text"].strip()))
+
+    excerpts = {}
+    for label, turns in by_speaker.items():
+        keyphrases = set(stats[label]["keyphrases"])
+        ranked = sorted(
+            turns,
+            key=lambda t: -sum(term in keyphrases for term in _terms(t[1])) / (1 + len(t[1]) / 200),
+        )
+        chosen, used = [], 0
+        for i, text in ranked:
+            if used >= max_chars:
+                break
+            text = text[:max_chars - used]
+            chosen.append((i, text))
+            used += len(text)
+        excerpts[label] = " … ".join(text for _, text in sorted(chosen))
+    return excerpts
+
+
+def summarize_speaker_content(transcript_text: str,
+                              max_chars_per_speaker: int = EXCERPT_CHARS_PER_SPEAKER) -> dict:
     """
     Summarize what each speaker mainly talked about using Gemini.
     Returns a dict { "Speaker A": "summary of their topics", ... }
     Handles non-JSON responses gracefully.
+
+    Only per-speaker statistics and bounded excerpts are sent (see
+    speaker_statistics / speaker_excerpts); a transcript that cannot be
+    parsed is sent as-is.
     """
     model = genai.GenerativeModel("gemini-2.5-flash")
 
+    utterances = parse_transcript(transcript_text)
+    if utterances:
+        stats = speaker_statistics(utterances)
+        excerpts = speaker_excerpts(utterances, stats, max_chars=max_chars_per_speaker)
+        material = "\n\n".join(
+            f"{label} ({s['turns']} turns, {s['talk_seconds']}s, {s['words']} words)\n"
+            f"Key phrases: {', '.join(s['keyphrases'])}\n"
+            f"Excerpts: {excerpts[label]}"
+            for label, s in stats.items()
+        )
+    else:
+        material = transcript_text
+
     prompt = f"""
         You are a summarization assistant.
 
-        Here is a transcript with multiple speakers (Speaker A, B, C...).
+        Here are per-speaker statistics, key phrases and excerpts from a
+        conversation with multiple speakers (Speaker A, B, C...).
         Summarize in 1-2 sentences what each speaker mainly talked about or contributed.
 
         Return ONLY valid JSON in this format:
@@ -29,8 +159,8 @@ def summarize_speaker_content(transcript_text: str) -> dict:
         "Speaker B": "summary"
         }}
 
-        Transcript:
-        {transcript_text}
+        Speakers:
+        {material}
         """
 
     response = model.generate_content(prompt)
@@ -69,34 +199,67 @@ def prompt_user_for_names(speaker_summaries: dict) -> dict:
     return mapping
 
 
-def apply_speaker_mapping(transcript_text: str, mapping: dict) -> str:
+def speaker_pattern(names) -> re.Pattern:
+    """
+    One alternation matching any of `names` as a whole word. Names are
+    escaped and tried longest first, so "Speaker A" never shadows "Speaker AB".
+    """
+    alternation = "|".join(re.escape(n) for n in sorted(names, key=len, reverse=True))
+    return re.compile(rf"(?<!\w)(?:{alternation})(?!\w)")
+
+
+def rename_utterances(utterances: list, mapping: dict) -> list:
+    """Copy of `utterances` with a "name" for every speaker label in `mapping`."""
+    named = []
+    for u in utterances:
+        label = f"Speaker {u['speaker']}"
+        named.append({**u, "name": mapping.get(label, label)})
+    return named
+
+
+def format_transcript(utterances: list) -> str:
+    """Inverse of parse_transcript (uses "name" when present)."""
+    return "".join(
+        f"[ Start Time:{u['start']} End Time:{u['end']} ]\n"
+        f"{u.get('name') or 'Speaker ' + u['speaker']}: {u['text']}\n"
+        for u in utterances
+    )
+
+
+def apply_speaker_mapping(transcript_text: str, mapping: dict, utterances: list = None) -> str:
     """
     Replace placeholder speakers in the transcript with the real names.
     Keeps timestamps and structure identical.
+
+    With parsed `utterances` only the speaker labels are renamed; otherwise
+    every whole-word occurrence in the text is replaced in a single pass
+    (so A -> B, B -> C never chains).
     """
-    replaced_text = transcript_text
-    for placeholder, real_name in mapping.items():
-        replaced_text = re.sub(
-            rf"\b{placeholder}\b", real_name, replaced_text
-        )
-    return replaced_text
+    if not mapping:
+        return transcript_text
+    if utterances:
+        return format_transcript(rename_utterances(utterances, mapping))
+    return speaker_pattern(mapping).sub(lambda m: mapping[m.group(0)], transcript_text)
 
 
-def rename_speakers_in_transcript(raw_out):
+def rename_speakers_in_transcript(raw_out, mapping=None):
     """
     Main function to rename speakers in a transcript file.
+    With a ready `mapping` (e.g. from speaker_matcher) no summaries are
+    requested and nobody is prompted.
     """
     named_out = "named"+raw_out # output file path
 
     with open(raw_out, "r", encoding="utf-8") as f:
         transcript = f.read()
     
-    summaries = summarize_speaker_content(transcript)
+    if mapping is None:
+        summaries = summarize_speaker_content(transcript)
 
-    print(summaries)
+        print(summaries)
 
-    #Ask user to identify speakers
-    mapping = prompt_user_for_names(summaries)
+        #Ask user to identify speakers
+        mapping = prompt_user_for_names(summaries)
     print(f"\n✅ Final Speaker Mapping:\n{json.dumps(mapping, indent=2)}")
 
     # Step 4: Replace and save new transcript
@@ -1,13 +1,19 @@
 import os
 import json
 import uuid
-import faiss
-from sentence_transformers import SentenceTransformer
+from embedding_service import get_encoder
+from vector_store import build_index
+from metrics import timed
 from typing import List, Dict
 import google.generativeai as genai
 
 genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
-EMBED_MODEL = SentenceTransformer("all-MiniLM-L6-v2")   
+EMBED_MODEL = "all-MiniLM-L6-v2"
+
+
+def embed_encoder():
+    """Shared encoder, loaded on first use rather than at import."""
+    return get_encoder(EMBED_MODEL)
 
 class PersonDatabase:
     """Person DB with consistent person_id, FAISS, and chunk management"""
@@ -15,7 +21,7 @@ class PersonDatabase:
     def __init__(self, model=None):
         self.persons = {}  # person_id -> data
         self.name_to_id = {}  # lowercase name -> person_id
-        self.model = model or EMBED_MODEL
+        self.model = model or embed_encoder()
         self.chunks = []
         self.index = None
 
@@ -72,15 +78,14 @@ class PersonDatabase:
         """Encode chunks and build FAISS index"""
         if not self.chunks:
             self.build_person_chunks()
-        embeddings = self.model.encode([c["text"] for c in self.chunks], convert_to_numpy=True)
-        dim = embeddings.shape[1]
-        self.index = faiss.IndexFlatL2(dim)
-        self.index.add(embeddings)
+        embeddings = self.model.encode([c["text"] for c in self.chunks])
+        self.index = build_index(embeddings)
 
+    @timed("search")
     def search(self, query: str, top_k=5):
         if self.index is None:
             raise ValueError("FAISS index not built.")
-        query_vec = self.model.encode([query], convert_to_numpy=True)
+        query_vec = self.model.encode([query])
         distances, indices = self.index.search(query_vec, top_k)
         results = []
         for dist, idx in zip(distances[0], indices[0]):
@@ -189,20 +194,16 @@ def prepare_mindmap_chunks(json_data, person_db: PersonDatabase = None):
 
 
 def build_mindmap_index(chunks):
-    print(EMBED_MODEL)
-    embeddings = EMBED_MODEL.encode([c["text"] for c in chunks], convert_to_numpy=True)
+    encoder = embed_encoder()
+    print(encoder.model_name)
+    embeddings = encoder.encode([c["text"] for c in chunks])
     print(embeddings.shape)
-    dim = embeddings.shape[1]
-    index = faiss.IndexFlatL2(dim)
-    index.add(embeddings)
-    for i, c in enumerate(chunks):
-        c["embedding"] = embeddings[i]
-    return index
+    return build_index(embeddings)
 
 
 # QUERY BOTH DATABASES
 def query_both_indexes(mindmap_index, mindmap_chunks, person_db: PersonDatabase, query_text, top_k_each=3):
-    query_vec = EMBED_MODEL.encode([query_text], convert_to_numpy=True)
+    query_vec = embed_encoder().encode([query_text])
     results = []
 
     # Mindmap
@@ -2,38 +2,170 @@ import dotenv
 
 dotenv.load_dotenv()
 import logging
+import os
+
+from .metrics import (
+    REQUEST_SECONDS, TraceIdFilter, current_timings, current_trace_id, render_prometheus, stage,
+    start_trace,
+)
 
-logging.basicConfig(level=logging.DEBUG)
-import sys, types
+logging.basicConfig(
+    level=os.getenv("LOG_LEVEL", "INFO"),
+    format="%(asctime)s %(levelname)s [%(trace_id)s] %(name)s: %(message)s",
+)
+for _handler in logging.getLogger().handlers:
+    _handler.addFilter(TraceIdFilter())
+import asyncio
 import json
-import io
-import os
+import shutil
+import time
+from contextlib import asynccontextmanager
 from typing import List, Optional
 
-import numpy as np
-import torch
-
-from fastapi import FastAPI, UploadFile, Form, HTTPException, Query, File
+from fastapi import (
+    FastAPI, UploadFile, Form, HTTPException, Query, Header, Request, Response,
+    WebSocket, WebSocketDisconnect,
+)
 from fastapi.middleware.cors import CORSMiddleware
-from pydub import AudioSegment  # To convert WebM to WAV
+from fastapi.responses import PlainTextResponse
+from starlette.concurrency import run_in_threadpool
+
+# Only light modules are imported here. The transcription / LLM modules
+# (AssemblyAI, Gemini SDKs), the numpy-based audio modules (VAD, encoding,
+# speaker matching, live transcription), torch, faiss and the models load
+# lazily or in the background warm-up below, so a worker starts serving
+# immediately.
+from .conversation_cache import ConversationCache, etag_matches
+from .mindmap_store import MINDMAP_SCHEMA_VERSION, build_conversation_doc, migrate_doc, normalize_mindmap
+from .firestore_store import InvalidCursor, display_name, make_store
+from .voice_embedding import SAMPLE_RATE, decode_audio_bytes, load_audio_file
+from .upload_sessions import (
+    ChecksumMismatch, OffsetMismatch, UnknownUpload, UploadError, UploadStore,
+)
+
+# ---- config ----
+# async Firestore access (or the in-memory fake with FIRESTORE_BACKEND=memory);
+# created on startup so the client binds to the server's event loop
+store = None
 
+# normalized /get-conversations pages, invalidated when process_audio writes
+conversation_cache = ConversationCache()
 
-import firebase_admin
-from firebase_admin import credentials, firestore
 
-import tempfile
 
-from . import Audio_to_text
-from . import LLM_json_generator
+@asynccontextmanager
+async def lifespan(app):
+    # startup only purges old uploads and creates the store; the rest loads
+    # in the background (see "Startup and readiness" below)
+    await purge_stale_uploads()
+    await warm("store", load_store)
+    app.state.warm_up = asyncio.create_task(warm_up())
+    try:
+        yield
+    finally:
+        if not app.state.warm_up.done():
+            app.state.warm_up.cancel()
+            await asyncio.gather(app.state.warm_up, return_exceptions=True)
 
-# ---- config ----
-SERVICE_ACCOUNT = "backend/ai-hackathon-4e25e-firebase-adminsdk-fbsvc-5557fc6879.json"
-if not firebase_admin._apps:
-    cred = credentials.Certificate(SERVICE_ACCOUNT)
-    firebase_admin.initialize_app(cred)
-db = firestore.client()
 
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
+
+
+# resumable chunked uploads for long recordings (see upload_sessions.py)
+upload_store = UploadStore()
+
+
+async def purge_stale_uploads():
+    removed = await run_in_threadpool(upload_store.purge_stale)
+    if removed:
+        print(f"🧹 Removed {removed} abandoned uploads")
+
+
+# ECAPA speaker encoder and the FAISS index of enrolled voices, loaded by the warm-up
+voice_encoder = None
+voice_index = None
+
+# ---------------- Startup and readiness ----------------
+# Startup only creates the store; everything heavy loads in a background
+# warm-up task. Requests that need a subsystem that is not ready yet either
+# return 503 (/voice-profile) or degrade (process_audio skips speaker
+# matching). /healthz reports each subsystem.
+
+SUBSYSTEMS = ("store", "pipeline", "voice_encoder", "voice_index")
+readiness = {name: {"ready": False, "error": None, "seconds": None} for name in SUBSYSTEMS}
+started_at = time.time()
+
+
+async def warm(name, load):
+    start = time.perf_counter()
+    try:
+        await load()
+        readiness[name]["ready"] = True
+    except Exception as e:
+        readiness[name]["error"] = str(e)
+        print(f"🔥 {name} failed to load: {e}")
+    readiness[name]["seconds"] = round(time.perf_counter() - start, 2)
+
+
+def import_pipeline():
+    from . import Audio_to_text, LLM_json_generator, Named_Transcript  # noqa: F401
+    from . import audio_encoding, live_transcription, speaker_matcher, vad  # noqa: F401
+
+
+async def load_voice_encoder():
+    global voice_encoder
+    from .voice_embedding import get_voice_encoder
+
+    voice_encoder = await run_in_threadpool(get_voice_encoder)
+
+
+async def load_voice_index():
+    global voice_index
+    if voice_encoder is None:
+        raise RuntimeError("voice encoder unavailable")
+    from .voice_index import VoiceIndex
+
+    index = await run_in_threadpool(VoiceIndex.load, voice_encoder.dim, voice_encoder.model_id)
+    if index is None:
+        # no usable index on disk: build it from the enrolled profiles below
+        index = VoiceIndex(voice_encoder.dim, model_id=voice_encoder.model_id)
+    # published before reading Firestore, so an enrollment from now on upserts
+    # directly and every earlier one is in the profile list
+    voice_index = index
+    # a saved index misses profiles enrolled by other workers, while this one
+    # was down, or during warm-up; Firestore is the source of truth
+    since = index.version
+    changed = await run_in_threadpool(index.sync, await store.list_voice_profiles(), since)
+    if changed or not os.path.exists(index.path):
+        await run_in_threadpool(index.save)
+    print(f"✅ Voice index ready ({len(voice_index)} enrolled voices)")
+
+
+async def warm_up():
+    async def voices():
+        await warm("voice_encoder", load_voice_encoder)
+        await warm("voice_index", load_voice_index)
+
+    await asyncio.gather(warm("pipeline", lambda: run_in_threadpool(import_pipeline)), voices())
+
+
+async def load_store():
+    global store
+    # on the event loop thread so the async client binds to the server's loop
+    store = make_store()
+
+
+@app.get("/healthz")
+async def healthz(response: Response):
+    """200 once every subsystem is loaded; 503 while starting or if one failed."""
+    ready = all(s["ready"] for s in readiness.values())
+    failed = any(s["error"] for s in readiness.values())
+    response.status_code = 200 if ready else 503
+    return {
+        "status": "ok" if ready else ("degraded" if failed else "starting"),
+        "uptimeSeconds": round(time.time() - started_at, 1),
+        "subsystems": readiness,
+    }
 
 # allow your frontend origin
 app.add_middleware(
@@ -48,79 +180,138 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# ---------------- Dummy utilities ----------------
+@app.middleware("http")
+async def trace_requests(request: Request, call_next):
+    """Trace id per request (X-Request-ID if sent) and a latency histogram per route."""
+    trace_id = start_trace(request.headers.get("x-request-id"))
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+    finally:
+        # route template, not the raw path, keeps the label set small
+        route = getattr(request.scope.get("route"), "path", "unmatched")
+        REQUEST_SECONDS.observe(time.perf_counter() - start, request.method, route, str(status))
+    response.headers["X-Trace-Id"] = trace_id
+    return response
 
-def make_dummy_embedding(dim: int = 192) -> np.ndarray:
-    """Generate a reproducible dummy embedding."""
-    np.random.seed(42)
-    return np.random.rand(dim).astype("float32")
 
+@app.get("/metrics")
+async def metrics():
+    return PlainTextResponse(render_prometheus(), media_type="text/plain; version=0.0.4")
 
 
-def convert_webm_to_wav(webm_path: str, wav_path: str) -> None:
+@app.post("/process-audio")
+async def process_audio(request: Request):
     """
-    Convert a WebM file to WAV using pydub.
+    Receive an uploaded audio file (multipart: userId, timestamp and the file
+    as 'filePath'), save it locally, run transcription + LLM, save to Firestore.
     """
-    try:
-        # Load WebM file
-        audio = AudioSegment.from_file(webm_path, format="webm")
-        # Export to WAV format
-        audio.export(wav_path, format="wav")
-        print(f"Converted {webm_path} to {wav_path}")
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to convert WebM to WAV: {e}")
+    # the form is parsed here rather than by FastAPI before the handler runs,
+    # so the "upload" stage covers receiving the body, not just the disk copy
+    with stage("upload"):
+        form = await request.form()
+        userId, timestamp, filePath = form.get("userId"), form.get("timestamp"), form.get("filePath")
+        if not isinstance(userId, str) or not isinstance(timestamp, str) or not hasattr(filePath, "file"):
+            raise HTTPException(status_code=422, detail="userId, timestamp and filePath are required")
+        try:
+            tmp_audio_path = recording_path(timestamp)
+            print(f"Saving audio to: {tmp_audio_path}")
 
-def webm_to_mp3(webm_file, output_path):
-    """Converts WebM file to MP3 format"""
-    audio = AudioSegment.from_file(webm_file, format="webm")
-    audio.export(output_path, format="wav")
-    return output_path
+            # stream the upload to disk instead of reading it into memory
+            def save_upload():
+                with open(tmp_audio_path, "wb") as f:
+                    shutil.copyfileobj(filePath.file, f, 1024 * 1024)
 
-@app.post("/process-audio")
-async def process_audio(
-    userId: str = Form(...),
-    timestamp: str = Form(...),
-    filePath: UploadFile = File(...),   # 👈 this was str before
-):
-    """
-    Receive an uploaded audio file (sent as 'filePath' from frontend),
-    save it locally, run transcription + LLM, save to Firestore.
-    """
-    try:
-        # pick a safe filename
-        original_name = os.path.basename(filePath.filename)
-        # or build your own name from timestamp
-        filename = f"data/recording_{timestamp}.webm"
-        tmp_dir = tempfile.gettempdir()
-        tmp_audio_path = f"data/recording_{timestamp}.webm"
+            await run_in_threadpool(save_upload)
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Failed to save audio: {e}")
+        finally:
+            await form.close()
 
-        print(f"Saving audio to: {tmp_audio_path}")
+    return await process_recording(userId, timestamp, tmp_audio_path)
 
-        # save uploaded file to temp
-        with open(tmp_audio_path, "wb") as f:
-            f.write(await filePath.read())
 
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to save audio: {e}")
+def recording_path(timestamp):
+    return os.path.join("data", f"recording_{os.path.basename(timestamp)}.webm")
+
+
+async def process_recording(userId, timestamp, webm_path):
+    """Transcribe, name speakers, build the mindmap and save the conversation."""
+    from . import Audio_to_text, LLM_json_generator, Named_Transcript
+    from .audio_encoding import prepare_transcription_audio
+    from .speaker_matcher import match_speakers
+    from .vad import VAD_ENABLED, trim_silence
 
     # 2) Run the transcription script
-    audio_file = webm_to_mp3(f"data/recording_{timestamp}.webm", f"data/recording_{timestamp}.wav")
-    transcript_path = os.path.join("data/transcript.txt")
+    # blocking decode / transcription / LLM work runs off the event loop.
+    # The recording is decoded once to 16 kHz mono; VAD, the upload encoding
+    # and speaker matching all work from these samples.
+    try:
+        with stage("decode"):
+            waveform = await run_in_threadpool(load_audio_file, webm_path)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to decode audio: {e}")
+    # per recording, so concurrent jobs never read each other's transcript
+    transcript_path = os.path.splitext(webm_path)[0] + ".transcript.txt"
+
+    # drop silence before upload; utterance times are mapped back to the original recording
+    speech, time_map, vad_stats = waveform, None, None
+    if VAD_ENABLED:
+        with stage("vad"):
+            speech, vad_map, vad_stats = await run_in_threadpool(trim_silence, waveform)
+        time_map = vad_map.to_original if vad_map.segments else None
+        print(f"✂️ VAD kept {vad_stats['speechSeconds']}s of {vad_stats['originalSeconds']}s "
+              f"(trimmed {vad_stats['trimmedRatio']:.0%})")
+
+    # upload compressed 16 kHz mono (Opus by default) instead of a full-rate WAV
+    with stage("encode"):
+        transcribe_file = await run_in_threadpool(
+            prepare_transcription_audio, webm_path, speech, time_map is not None
+        )
 
     try:
-      Audio_to_text.get_text(audio_file, transcript_path)
+      with stage("transcribe"):
+          await run_in_threadpool(
+              Audio_to_text.get_text, transcribe_file, transcript_path, time_map,
+              duration=len(speech) / SAMPLE_RATE,
+          )
     except Exception as e:
       raise HTTPException(status_code=500, detail=f"Transcription failed: {e}")
 
-    # 3) Run LLM script for conversation mindmap
-    try:
-        with open(transcript_path, "r", encoding="utf-8") as f:
-            transcript_text = f.read()
+    with open(transcript_path, "r", encoding="utf-8") as f:
+        transcript_text = f.read()
 
-        mindmap_data = LLM_json_generator.generate_conversation_mindmap_json(
+    # 2b) Name diarized speakers by matching their voices against enrolled profiles
+    speaker_matches = {}
+    utterances = Named_Transcript.parse_transcript(transcript_text)
+    if voice_encoder is not None and voice_index is not None and len(voice_index):
+        try:
+            if utterances:
+                with stage("speaker_match"):
+                    speaker_matches = await run_in_threadpool(
+                        match_speakers, voice_encoder, waveform, utterances, voice_index
+                    )
+        except Exception as e:
+            # unnamed speakers are still a usable transcript
+            print(f"⚠️ Speaker matching failed: {e}")
+    if speaker_matches:
+        transcript_text = Named_Transcript.apply_speaker_mapping(
             transcript_text,
-            source_file=os.path.basename(transcript_path),
+            {label: m["name"] for label, m in speaker_matches.items()},
+            utterances=utterances,
         )
+        print(f"✅ Matched speakers: {json.dumps(speaker_matches)}")
+
+    # 3) Run LLM script for conversation mindmap
+    try:
+        with stage("llm"):
+            mindmap_data = await run_in_threadpool(
+                LLM_json_generator.generate_conversation_mindmap_json,
+                transcript_text,
+                source_file=os.path.basename(transcript_path),
+            )
         output_path = "data/mindmap_test.json"
         with open(output_path, "w", encoding="utf-8") as f:
             json.dump(mindmap_data, f, indent=2)
@@ -130,28 +321,189 @@ async def process_audio(
         raise HTTPException(status_code=500, detail=f"LLM mindmap generation failed: {e}")
 
 
-    speakers = []
-    if "participants" in mindmap_data and isinstance(mindmap_data["participants"], list):
-        speakers = [p.get("name") for p in mindmap_data["participants"] if p.get("name")]
+    # 4) Save to Firestore, normalized once here so reads are a plain projection
+    convo_doc = build_conversation_doc(
+        userId,
+        mindmap_data,
+        source_timestamp=timestamp,
+        timestamp=store.server_timestamp(),
+        transcript=transcript_text,
+    )
+    speakers = convo_doc["speakers"]
+    # label -> {name, user_id, score}; lets profiles link back to their conversations
+    convo_doc["speakerMatches"] = speaker_matches
+    # where this job's time went (stage -> seconds), findable by trace id in the logs
+    convo_doc["traceId"] = current_trace_id()
+    convo_doc["timings"] = current_timings()
+
+    try:
+        await store.add_conversation(convo_doc)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to save conversation: {e}")
+    conversation_cache.invalidate(userId)
 
-    # 4) Save to Firestore
-    convo_doc = {
-        "userId": userId,
-        "timestamp": firestore.SERVER_TIMESTAMP,
+    return {
+        "status": "ok",
         "speakers": speakers,
-        "mindmap": mindmap_data,
-        "graph": mindmap_data.get("graph") or {},
-        "sourceTimestamp": timestamp,
+        "speakerMatches": speaker_matches,
+        "vad": vad_stats,
+        "traceId": current_trace_id(),
+        "timings": current_timings(),
     }
 
+
+# ---------------- Chunked, resumable uploads ----------------
+# POST /uploads -> PUT /uploads/{id}/parts?offset=N (raw body, X-Content-SHA256)
+# ... -> POST /uploads/{id}/finalize; GET /uploads/{id} says where to resume.
+
+def upload_status(manifest):
+    return {
+        "uploadId": manifest["uploadId"],
+        "received": manifest["received"],
+        "parts": len(manifest["parts"]),
+        "state": manifest["state"],
+        "maxPartBytes": upload_store.max_part_bytes,
+    }
+
+
+def upload_http_error(e):
+    if isinstance(e, UnknownUpload):
+        return HTTPException(status_code=404, detail="Unknown upload")
+    if isinstance(e, OffsetMismatch):
+        return HTTPException(status_code=409, detail={"message": str(e), "received": e.expected})
+    if isinstance(e, ChecksumMismatch):
+        return HTTPException(status_code=422, detail=str(e))
+    return HTTPException(status_code=400, detail=str(e))
+
+
+@app.post("/uploads")
+async def create_upload(userId: str = Form(...), timestamp: str = Form(...)):
+    manifest = await run_in_threadpool(upload_store.create, userId, timestamp)
+    return upload_status(manifest)
+
+
+@app.get("/uploads/{upload_id}")
+async def get_upload(upload_id: str):
     try:
-        db.collection("conversations").add(convo_doc)
+        manifest = await run_in_threadpool(upload_store.status, upload_id)
+    except UploadError as e:
+        raise upload_http_error(e)
+    return upload_status(manifest)
+
+
+@app.put("/uploads/{upload_id}/parts")
+async def append_upload_part(
+    upload_id: str,
+    request: Request,
+    offset: int = Query(..., ge=0),
+    x_content_sha256: str = Header(..., description="hex SHA-256 of the part"),
+):
+    declared = int(request.headers.get("content-length") or 0)
+    if declared > upload_store.max_part_bytes:
+        raise HTTPException(status_code=413, detail=f"Parts are limited to {upload_store.max_part_bytes} bytes")
+
+    with stage("upload"):
+        # parts are small and bounded; the recording as a whole never sits in memory
+        data = bytearray()
+        async for block in request.stream():
+            data += block
+            if len(data) > upload_store.max_part_bytes:
+                raise HTTPException(status_code=413, detail=f"Parts are limited to {upload_store.max_part_bytes} bytes")
+
+        try:
+            manifest = await run_in_threadpool(
+                upload_store.append, upload_id, offset, bytes(data), x_content_sha256
+            )
+        except UploadError as e:
+            raise upload_http_error(e)
+    return upload_status(manifest)
+
+
+@app.post("/uploads/{upload_id}/finalize")
+async def finalize_upload(upload_id: str, size: int = Form(..., ge=0)):
+    """
+    Assemble the uploaded parts and run the same pipeline as /process-audio.
+    If processing fails the upload stays assembled and finalize can be retried.
+    """
+    try:
+        manifest = await run_in_threadpool(upload_store.status, upload_id)
+        manifest = await run_in_threadpool(
+            upload_store.finalize, upload_id, size, recording_path(manifest["timestamp"])
+        )
+    except UploadError as e:
+        raise upload_http_error(e)
+
+    try:
+        result = await process_recording(manifest["userId"], manifest["timestamp"], manifest["path"])
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to save conversation: {e}")
+        error = getattr(e, "detail", None) or str(e) or type(e).__name__
+        await run_in_threadpool(upload_store.complete, upload_id, str(error))
+        raise
+    await run_in_threadpool(upload_store.complete, upload_id)
+    return {**result, "uploadId": upload_id, "sha256": manifest["sha256"]}
+
+
+# ---------------- Live audio over WebSocket ----------------
+# The client sends MediaRecorder chunks as binary frames and {"type": "stop"}
+# when done; the server streams back partial/utterance/mindmap events and a
+# final {"type": "done", ...} with the same result as /process-audio.
+
+async def build_live_mindmap(transcript_text):
+    from . import LLM_json_generator
+
+    mindmap_data = await run_in_threadpool(
+        LLM_json_generator.generate_conversation_mindmap_json, transcript_text, source_file="live"
+    )
+    return normalize_mindmap(mindmap_data)
+
+
+@app.websocket("/ws/live-audio")
+async def live_audio(websocket: WebSocket, userId: str, timestamp: str):
+    from .live_transcription import LiveSession, make_streaming_transcriber
+
+    start_trace(websocket.headers.get("x-request-id"))
+    await websocket.accept()
+    webm_path = recording_path(timestamp)
+    session = LiveSession(make_streaming_transcriber(), websocket.send_json, build_mindmap=build_live_mindmap)
+    stopped = False
+
+    try:
+        try:
+            await session.start()
+            await websocket.send_json({"type": "ready"})
+            # the raw stream is kept so the finished recording gets the full (diarized) pipeline
+            with open(webm_path, "wb") as raw:
+                while True:
+                    message = await websocket.receive()
+                    if message["type"] == "websocket.disconnect":
+                        break
+                    if message.get("bytes"):
+                        raw.write(message["bytes"])
+                        await session.feed(message["bytes"])
+                    elif message.get("text") and json.loads(message["text"]).get("type") == "stop":
+                        stopped = True
+                        break
+        finally:
+            # on every path, so a failed session doesn't leak its ffmpeg process
+            await session.close()
+    except WebSocketDisconnect:
+        stopped = False
+    except Exception as e:
+        print(f"🔥 Live session failed: {e}")
+        await websocket.close(code=1011)
+        return
+
+    if not stopped:
+        # client went away; the partial recording stays on disk
+        return
+    try:
+        result = await process_recording(userId, timestamp, webm_path)
+        await websocket.send_json({"type": "done", **result})
+    except HTTPException as e:
+        await websocket.send_json({"type": "error", "message": e.detail})
+    await websocket.close()
+
 
-    return {"status": "ok", "speakers": speakers}
-    
-    
 def normalize_timestamp(ts):
     if hasattr(ts, "isoformat"):
         return ts.isoformat()
@@ -159,101 +511,124 @@ def normalize_timestamp(ts):
         return ts.to_datetime().isoformat()
     return ts
 
+# fields the sidebar list needs; the heavy mindmap/graph only come from the detail endpoint
+LIST_FIELDS = ["timestamp", "speakers", "title"]
+DETAIL_FIELDS = ["timestamp", "speakers", "title", "sourceTimestamp"]
+# heavy parts live in compressed payload chunks and are loaded only when asked for
+PAYLOAD_PARTS = ("mindmap", "graph", "transcript")
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+
+async def conversation_detail(doc_id, data, parts):
+    """Detail-view projection of a stored conversation plus the requested heavy parts."""
+    manifests = data.get("payloadParts")
+    if manifests is not None:
+        data = {**data, **await store.get_payload_parts(doc_id, manifests, parts)}
+    elif data.get("schemaVersion") != MINDMAP_SCHEMA_VERSION:
+        # inline legacy document not migrated yet (see migrate_mindmaps.py)
+        logging.warning("conversation %s has schemaVersion %s", doc_id, data.get("schemaVersion"))
+        data = {**data, **migrate_doc(data)}
+
+    detail = {field: data.get(field) for field in DETAIL_FIELDS}
+    for part in parts:
+        detail[part] = data.get(part)
+    detail["id"] = doc_id
+    detail["timestamp"] = normalize_timestamp(detail["timestamp"])
+    return detail
+
+
+def conversation_list_item(doc_id, data):
+    """Projected list-view entry: id, timestamp, speakers, title."""
+    return {
+        "id": doc_id,
+        "timestamp": normalize_timestamp(data.get("timestamp")),
+        "speakers": data.get("speakers") or [],
+        "title": data.get("title"),
+    }
+
+
 @app.get("/get-conversations")
-def get_conversations(
+async def get_conversations(
+    response: Response,
     user_id: str = Query(..., description="Firebase Auth UID"),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = Query(None, description="nextCursor from the previous page"),
+    if_none_match: Optional[str] = Header(None),
 ):
     """
-    Return conversations for a user, but also parse the `mindmap` field if it's a JSON string.
+    Return one page of a user's conversations, newest first.
+    Only list fields are read from Firestore; fetch /conversations/{id} for the mindmap.
+    Pages are cached per user and carry an ETag; a matching If-None-Match gets a 304.
     """
-    # try to order by timestamp, fallback if no index
+    page_key = (cursor, limit)
+    cached = conversation_cache.get(user_id, page_key)
+    if cached is None:
+        generation = conversation_cache.generation()
+        payload = await fetch_conversation_page(user_id, limit, cursor)
+        etag = conversation_cache.put(user_id, page_key, payload, generation)
+    else:
+        etag, payload = cached
+
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return payload
+
+
+async def fetch_conversation_page(user_id, limit, cursor):
+    """Read one page of list-view conversations from Firestore."""
     try:
-        convs_ref = (
-            db.collection("conversations")
-            .where("userId", "==", user_id)
-            .order_by("timestamp", direction=firestore.Query.DESCENDING)
-        )
-    except Exception:
-        convs_ref = db.collection("conversations").where("userId", "==", user_id)
-
-    docs = convs_ref.stream()
-
-    results = []
-    for doc in docs:
-        data = doc.to_dict() or {}
-        data["id"] = doc.id
-
-        # normalize timestamp
-        if "timestamp" in data:
-            data["timestamp"] = normalize_timestamp(data["timestamp"])
-
-        # ---------- NEW PART: parse mindmap ----------
-        parsed_mindmap = None
-        graph = None
-        speakers = data.get("speakers")
-
-        mindmap_val = data.get("mindmap")
-        if isinstance(mindmap_val, str):
-            # it's a JSON string, try to parse
-            try:
-                parsed = json.loads(mindmap_val)
-                # expect a list like your example
-                if isinstance(parsed, list) and len(parsed) > 0:
-                    parsed_mindmap = parsed
-                    # take speakers from first block if not already set
-                    if not speakers and isinstance(parsed[0], dict):
-                        speakers = parsed[0].get("speakers")
-                    # take graph from first block
-                    first_graph = parsed[0].get("graph") if isinstance(parsed[0], dict) else None
-                    if first_graph:
-                        graph = first_graph
-            except json.JSONDecodeError:
-                # leave parsed_mindmap = None
-                parsed_mindmap = None
-        elif isinstance(mindmap_val, list):
-            # somehow already stored as array
-            parsed_mindmap = mindmap_val
-            if len(mindmap_val) > 0 and isinstance(mindmap_val[0], dict):
-                if not speakers:
-                    speakers = mindmap_val[0].get("speakers")
-                graph = mindmap_val[0].get("graph")
-
-        # set cleaned fields
-        data["speakers"] = speakers or []
-        if parsed_mindmap is not None:
-            data["mindmap"] = parsed_mindmap
-        # expose a top-level graph so React can do conv.graph
-        if graph is not None:
-            data["graph"] = graph
-
-        results.append(data)
+        items, next_cursor = await store.list_conversations(user_id, LIST_FIELDS, limit, cursor)
+    except InvalidCursor:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
 
+    results = [conversation_list_item(conv_id, data) for conv_id, data in items]
     return {
         "count": len(results),
         "conversations": results,
+        "nextCursor": next_cursor,
     }
+
+
+@app.get("/conversations/{conversation_id}")
+async def get_conversation(
+    conversation_id: str,
+    user_id: str = Query(..., description="Firebase Auth UID"),
+    include: str = Query("mindmap,graph", description="comma-separated: mindmap, graph, transcript"),
+):
+    """Return a single conversation with the requested heavy parts (mindmap and graph by default)."""
+    parts = [p.strip() for p in include.split(",") if p.strip()]
+    unknown = set(parts) - set(PAYLOAD_PARTS)
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown parts: {', '.join(sorted(unknown))}")
+
+    data = await store.get_conversation(conversation_id)
+    if not data or data.get("userId") != user_id:
+        raise HTTPException(status_code=404, detail="Conversation not found")
+    return await conversation_detail(conversation_id, data, parts)
     
     
 
     
 @app.get("/user-profile")
-def get_user_profile(user_id: str = Query(..., description="Firebase Auth UID"), email: str | None = None):
+async def get_user_profile(user_id: str = Query(..., description="Firebase Auth UID"), email: str | None = None):
     """
     Return (and lazily create) the user profile document.
     This mirrors what the frontend was doing with Firestore directly.
     """
-    users_ref = db.collection("users").document(user_id)
-    snap = users_ref.get()
+    data = await store.get_user(user_id)
 
-    if not snap.exists:
+    if data is None:
       # create a minimal user doc
       payload = {
           "hasVoiceProfile": False,
-          "createdAt": firestore.SERVER_TIMESTAMP,
+          "createdAt": store.server_timestamp(),
       }
       if email:
           payload["email"] = email
-      users_ref.set(payload, merge=True)
+      await store.set_user(user_id, payload, merge=True)
       return {
           "userId": user_id,
           "email": email,
@@ -261,7 +636,6 @@ def get_user_profile(user_id: str = Query(..., description="Firebase Auth UID"),
           "created": True,
       }
 
-    data = snap.to_dict() or {}
     return {
         "userId": user_id,
         "email": data.get("email", email),
@@ -269,48 +643,22 @@ def get_user_profile(user_id: str = Query(..., description="Firebase Auth UID"),
         "created": False,
     }
     
-@app.post("/voice-profile")
-async def create_voice_profile(
-    user_id: str = Form(...),
-    sample_0: Optional[UploadFile] = None,
-    sample_1: Optional[UploadFile] = None,
-    sample_2: Optional[UploadFile] = None,
-):
-    """
-    Dummy version — doesn't process audio, just simulates embedding creation and saves to Firestore.
-    """
-
-    # (Optional) read one file just to verify data received
-    total_bytes = 0
-    for f in [sample_0, sample_1, sample_2]:
-        if f:
-            b = await f.read()
-            total_bytes += len(b)
-
-    # create fake embedding vector
-    fake_emb = make_dummy_embedding(256)
-    fake_metadata = {
-        "hasVoiceProfile": True,
-        "voiceEmbedding": fake_emb.tolist(),
-        "voiceEmbeddingModel": "dummy-v0.1",
-        "totalUploadedBytes": total_bytes,
-        "status": "dummy_saved",
-    }
-
-    # save to Firestore
-    try:
-        db.collection("users").document(user_id).set(fake_metadata, merge=True)
-        print(f"✅ Saved dummy embedding for {user_id} ({len(fake_emb)}-dim vector)")
-    except Exception as e:
-        print("🔥 Firestore write failed:", e)
-        raise HTTPException(status_code=500, detail=f"Firestore error: {e}")
-
-    return {
-        "status": "ok",
-        "dim": len(fake_emb),
-        "uploaded_kb": round(total_bytes / 1024, 2),
-        "message": "Dummy embedding saved to Firestore",
-    }
+def embed_voice_samples(file_bytes_list: List[bytes]):
+    """Decode all samples and embed them in one batch (runs on the thread pool)."""
+    waveforms = []
+    for idx, b in enumerate(file_bytes_list):
+        try:
+            waveforms.append(decode_audio_bytes(b))
+        except Exception as e:
+            print(f"[backend] could not decode sample {idx}: {e!r}")
+            raise HTTPException(
+                status_code=400,
+                detail=(
+                    "Could not decode audio. Make sure ffmpeg is installed "
+                    "or send 16k mono wav from the frontend."
+                ),
+            )
+    return voice_encoder.embed_profile(waveforms)
 
 
 @app.post("/voice-profile")
@@ -320,112 +668,51 @@ async def create_voice_profile(
     sample_1: Optional[UploadFile] = None,
     sample_2: Optional[UploadFile] = None,
 ):
-
-    return {"status": "ok", "dim": 5}
-
-'''
-
-def webm_bytes_to_tensor(file_bytes: bytes) -> torch.Tensor:
-    """
-    Try to convert a .webm to a 16k mono tensor using pydub/ffmpeg.
-    If ffmpeg is not installed, this will raise.
     """
-    from pydub import AudioSegment  # import here so we can catch errors above
-
-    audio = AudioSegment.from_file(io.BytesIO(file_bytes), format="webm")
-    audio = audio.set_channels(1).set_frame_rate(16000)
-    out_io = io.BytesIO()
-    audio.export(out_io, format="wav")
-    out_io.seek(0)
-
-    # turn wav bytes into numpy
-    audio_wav = AudioSegment.from_wav(out_io)
-    samples = np.array(audio_wav.get_array_of_samples()).astype(np.float32)
-    samples = samples / (2 ** 15)
-    tensor = torch.from_numpy(samples).unsqueeze(0)
-    return tensor
-
-
-def wav_bytes_to_tensor(file_bytes: bytes) -> torch.Tensor:
+    Enroll a user's voice: embed the uploaded samples with ECAPA and store
+    the averaged embedding on the user's profile.
     """
-    Simpler path: if the frontend already gives us 16k mono wav, use this.
-    """
-    from pydub import AudioSegment
-
-    audio = AudioSegment.from_file(io.BytesIO(file_bytes), format="wav")
-    audio = audio.set_channels(1).set_frame_rate(16000)
-    samples = np.array(audio.get_array_of_samples()).astype(np.float32)
-    samples = samples / (2 ** 15)
-    tensor = torch.from_numpy(samples).unsqueeze(0)
-    return tensor
-
-
-def average_embeddings(embs: List[np.ndarray]) -> np.ndarray:
-    stacked = np.stack(embs, axis=0)
-    return stacked.mean(axis=0).astype("float32")
-    
-@app.post("/voice-profile")
-async def create_voice_profile(
-    user_id: str = Form(...),
-    sample_0: Optional[UploadFile] = None,
-    sample_1: Optional[UploadFile] = None,
-    sample_2: Optional[UploadFile] = None,
-):
-    # collect uploaded files
-    files = [sample_0, sample_1, sample_2]
     file_bytes_list: List[bytes] = []
-
-    for f in files:
+    for f in [sample_0, sample_1, sample_2]:
         if f is None:
             continue
-        b = await f.read()
-        file_bytes_list.append(b)
+        file_bytes_list.append(await f.read())
 
     if not file_bytes_list:
         # frontend sent nothing
         raise HTTPException(status_code=400, detail="no samples uploaded")
+    if voice_encoder is None:
+        raise HTTPException(status_code=503, detail="Voice encoder is still loading")
 
-    emb_list: List[np.ndarray] = []
+    with stage("embed"):
+        avg_emb = await run_in_threadpool(embed_voice_samples, file_bytes_list)
+    total_bytes = sum(len(b) for b in file_bytes_list)
 
-    for idx, b in enumerate(file_bytes_list):
-        # try webm first
-        wav_tensor: torch.Tensor
-        try:
-            print(f"[backend] trying to decode sample {idx} as webm...")
-            wav_tensor = webm_bytes_to_tensor(b)
-        except Exception as e_webm:
-            # if that fails, try wav
-            print(f"[backend] webm decode failed: {e_webm!r}")
-            try:
-                print(f"[backend] trying to decode sample {idx} as wav instead...")
-                wav_tensor = wav_bytes_to_tensor(b)
-            except Exception as e_wav:
-                print(f"[backend] wav decode also failed: {e_wav!r}")
-                raise HTTPException(
-                    status_code=400,
-                    detail=(
-                        "Could not decode audio. Make sure ffmpeg is installed "
-                        "or send 16k mono wav from the frontend."
-                    ),
-                )
-
-        # now we have a tensor -> embedding
-        with torch.no_grad():
-            emb = spk_model.encode_batch(wav_tensor)
-        emb_list.append(emb.squeeze().cpu().numpy())
-
-    # avg embedding for stability
-    avg_emb = average_embeddings(emb_list)
-
-    # save ONLY the embedding to Firestore
-    db.collection("users").document(user_id).set(
-        {
-            "hasVoiceProfile": True,
-            "voiceEmbedding": 
-            "voiceEmbeddingModel": "speechbrain/spkrec-ecapa-voxceleb",
-        },
-        merge=True,
-    )
+    try:
+        await store.set_user(
+            user_id,
+            {
+                "hasVoiceProfile": True,
+                "voiceEmbedding": avg_emb.tolist(),
+                "voiceEmbeddingModel": voice_encoder.model_id,
+                "voiceSamples": len(file_bytes_list),
+            },
+            merge=True,
+        )
+    except Exception as e:
+        print("🔥 Firestore write failed:", e)
+        raise HTTPException(status_code=500, detail=f"Firestore error: {e}")
 
-    return {"status": "ok", "dim": len(avg_emb)}
-'''
\ No newline at end of file
+    # keep the local voice index in step with the profile just written
+    if voice_index is not None:
+        profile = await store.get_user(user_id) or {}
+        voice_index.upsert(user_id, display_name(user_id, profile), avg_emb)
+        await run_in_threadpool(voice_index.save)
+
+    print(f"✅ Saved voice embedding for {user_id} ({len(avg_emb)}-dim vector)")
+    return {
+        "status": "ok",
+        "dim": len(avg_emb),
+        "samples": len(file_bytes_list),
+        "uploaded_kb": round(total_bytes / 1024, 2),
+    }
@@ -0,0 +1,61 @@
+import io
+import os
+
+import numpy as np
+
+from .voice_embedding import SAMPLE_RATE
+
+# ------------------- Transcription upload encoding -------------------
+#
+# The transcription service resamples to 16 kHz mono anyway, so the audio
+# is uploaded in that form and compressed instead of as a full-rate WAV:
+#
+#   opus      Ogg/Opus at 24 kb/s, tuned for speech (default, ~20x smaller than WAV)
+#   flac      lossless 16 kHz mono
+#   wav       16 kHz mono PCM
+#   original  the recording's own WebM/Opus container when nothing was
+#             trimmed (falls back to opus otherwise)
+#
+# Selected with $TRANSCRIBE_FORMAT.
+
+TRANSCRIBE_FORMATS = {
+    "opus": {"ext": ".ogg", "format": "ogg", "codec": "libopus",
+             "parameters": ["-b:a", "24k", "-application", "voip"]},
+    "flac": {"ext": ".flac", "format": "flac"},
+    "wav": {"ext": ".wav", "format": "wav"},
+}
+TRANSCRIBE_FORMAT = os.getenv("TRANSCRIBE_FORMAT", "opus")
+
+
+def samples_to_segment(samples: np.ndarray):
+    from pydub import AudioSegment
+
+    pcm = (np.clip(samples, -1.0, 1.0) * 32767).astype("<i2")
+    return AudioSegment(data=pcm.tobytes(), sample_width=2, frame_rate=SAMPLE_RATE, channels=1)
+
+
+def encode_samples(samples: np.ndarray, fmt: str, out_path=None):
+    """Encode 16 kHz mono samples as `fmt`; to `out_path`, or to bytes if None."""
+    spec = TRANSCRIBE_FORMATS[fmt]
+    target = out_path or io.BytesIO()
+    samples_to_segment(samples).export(
+        target,
+        format=spec["format"],
+        codec=spec.get("codec"),
+        parameters=spec.get("parameters"),
+    )
+    return out_path if out_path else target.getvalue()
+
+
+def prepare_transcription_audio(source_path: str, samples: np.ndarray, trimmed: bool, fmt=None) -> str:
+    """Path of the file to upload for transcription."""
+    fmt = fmt or TRANSCRIBE_FORMAT
+    if fmt == "original":
+        if not trimmed:
+            return source_path
+        fmt = "opus"
+    if fmt not in TRANSCRIBE_FORMATS:
+        raise ValueError(f"Unknown TRANSCRIBE_FORMAT {fmt!r}; expected one of "
+                         f"{list(TRANSCRIBE_FORMATS) + ['original']}")
+    out_path = os.path.splitext(source_path)[0] + ".speech" + TRANSCRIBE_FORMATS[fmt]["ext"]
+    return encode_samples(samples, fmt, out_path)
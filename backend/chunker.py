@@ -0,0 +1,87 @@
+import re
+
+# ------------------- Token-aware sliding-window chunking -------------------
+#
+# MiniLM (all-MiniLM-L6-v2) truncates input at 256 word pieces, so a
+# scraped page embedded as one string is mostly ignored. Descriptions are
+# cut into windows of at most `max_tokens` tokens that overlap by
+# `overlap` tokens; each window keeps character offsets into the source
+# text so a hit can be traced back to the person and source it came from.
+
+WORD_SPAN_RE = re.compile(r"\S+")
+
+
+def token_spans(text, tokenizer=None):
+    """
+    Character (start, end) span of every token in `text`.
+
+    Uses a HuggingFace fast tokenizer's offset mapping when given one, so
+    window sizes match what the embedding model actually sees; otherwise
+    falls back to whitespace-separated words.
+    """
+    if tokenizer is not None and getattr(tokenizer, "is_fast", False):
+        encoded = tokenizer(
+            text,
+            add_special_tokens=False,
+            return_offsets_mapping=True,
+            truncation=False,
+            verbose=False,
+        )
+        return [tuple(span) for span in encoded["offset_mapping"]]
+    return [m.span() for m in WORD_SPAN_RE.finditer(text)]
+
+
+def sliding_windows(text, max_tokens=200, overlap=40, tokenizer=None):
+    """
+    Split `text` into overlapping windows.
+
+    Returns a list of dicts: {"text", "char_start", "char_end", "token_count"}.
+    """
+    if overlap >= max_tokens:
+        raise ValueError("overlap must be smaller than max_tokens")
+
+    spans = token_spans(text or "", tokenizer)
+    if not spans:
+        return []
+
+    windows = []
+    step = max_tokens - overlap
+    start = 0
+    while True:
+        window = spans[start:start + max_tokens]
+        char_start, char_end = window[0][0], window[-1][1]
+        windows.append({
+            "text": text[char_start:char_end],
+            "char_start": char_start,
+            "char_end": char_end,
+            "token_count": len(window),
+        })
+        if start + max_tokens >= len(spans):
+            break
+        start += step
+    return windows
+
+
+def chunk_description(person_id, name, source, text, max_tokens=200, overlap=40, tokenizer=None):
+    """
+    Window one person description into embedding-ready passages.
+
+    Each passage carries back-pointers (person_id, source, window index and
+    character offsets into the stored description text).
+    """
+    passages = []
+    for i, window in enumerate(sliding_windows(text, max_tokens, overlap, tokenizer)):
+        passages.append({
+            "body": window["text"],
+            "metadata": {
+                "type": "person_description",
+                "name": name,
+                "person_id": person_id,
+                "source": source,
+                "window": i,
+                "char_start": window["char_start"],
+                "char_end": window["char_end"],
+                "token_count": window["token_count"],
+            },
+        })
+    return passages
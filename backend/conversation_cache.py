@@ -0,0 +1,87 @@
+import os
+import json
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+
+
+class ConversationCache:
+    """
+    Per-user in-process cache of /get-conversations pages.
+
+    Entries are keyed by (cursor, limit) under each user and dropped as a
+    whole when that user writes a conversation. The TTL bounds staleness for
+    writes handled by another worker process.
+
+    A page read from Firestore before a write must not be cached after the
+    write's invalidate(): callers take generation() before reading and pass
+    it to put(), which drops the page if the user was invalidated since.
+    """
+
+    def __init__(self, ttl=None, max_users=None):
+        self.ttl = ttl if ttl is not None else float(os.getenv("CONVERSATION_CACHE_TTL", "300"))
+        self.max_users = max_users or int(os.getenv("CONVERSATION_CACHE_USERS", "1024"))
+        self._users = OrderedDict()  # user_id -> {page_key: (etag, payload, expires_at)}
+        self._lock = threading.Lock()
+        # logical clock of invalidations: user_id -> clock at its last invalidate.
+        # Bounded; users pruned from it count as invalidated at `_floor`.
+        self._clock = 0
+        self._floor = 0
+        self._invalidated = OrderedDict()
+
+    @staticmethod
+    def make_etag(payload):
+        body = json.dumps(payload, sort_keys=True, default=str).encode("utf-8")
+        return f'W/"{hashlib.sha1(body).hexdigest()}"'
+
+    def get(self, user_id, page_key):
+        """Return (etag, payload) for a cached page, or None."""
+        with self._lock:
+            pages = self._users.get(user_id)
+            if not pages or page_key not in pages:
+                return None
+            etag, payload, expires_at = pages[page_key]
+            if expires_at < time.monotonic():
+                del pages[page_key]
+                return None
+            self._users.move_to_end(user_id)
+            return etag, payload
+
+    def generation(self):
+        """Token to take before reading a page; pass it to put()."""
+        with self._lock:
+            return self._clock
+
+    def put(self, user_id, page_key, payload, generation=None):
+        """
+        Cache a page and return its ETag. The page is not cached if the user
+        was invalidated after `generation` was taken (the read may be stale).
+        """
+        etag = self.make_etag(payload)
+        with self._lock:
+            if generation is not None and self._invalidated.get(user_id, self._floor) > generation:
+                return etag
+            pages = self._users.setdefault(user_id, {})
+            pages[page_key] = (etag, payload, time.monotonic() + self.ttl)
+            self._users.move_to_end(user_id)
+            while len(self._users) > self.max_users:
+                self._users.popitem(last=False)
+        return etag
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._users.pop(user_id, None)
+            self._clock += 1
+            self._invalidated[user_id] = self._clock
+            self._invalidated.move_to_end(user_id)
+            while len(self._invalidated) > self.max_users:
+                _, self._floor = self._invalidated.popitem(last=False)
+
+
+def etag_matches(if_none_match, etag):
+    """True if an If-None-Match header value covers `etag`."""
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates
@@ -0,0 +1,86 @@
+import json
+import zlib
+
+try:
+    import zstandard
+except ImportError:  # optional; zlib is always available
+    zstandard = None
+
+# ------------------- Split storage for heavy conversation fields -------------------
+#
+# A conversation document holds only the light list-view fields. The heavy
+# parts (mindmap, graph, transcript) are stored as compressed JSON blobs in
+# the subcollection conversations/{id}/payload, split into chunks that stay
+# well under Firestore's 1 MiB document limit:
+#
+#   conversations/{id}                  {..., "payloadParts": {part: manifest}}
+#   conversations/{id}/payload/{part}-{n}   {"part", "seq", "data": bytes}
+#
+# manifest = {"codec": "zstd" | "zlib", "chunks": n, "rawBytes": int, "storedBytes": int}
+# Only the parts a reader asks for are fetched.
+
+HEAVY_PARTS = ("mindmap", "graph", "transcript")
+CHUNK_BYTES = 900 * 1024
+ZSTD_LEVEL = 10
+
+
+def compress(obj):
+    """JSON-encode and compress `obj`. Returns (codec, bytes, raw_size)."""
+    raw = json.dumps(obj, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+    if zstandard is not None:
+        return "zstd", zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(raw), len(raw)
+    return "zlib", zlib.compress(raw, 6), len(raw)
+
+
+def decompress(codec, data):
+    if codec == "zstd":
+        if zstandard is None:
+            raise RuntimeError("zstandard is required to read zstd-compressed conversation payloads")
+        raw = zstandard.ZstdDecompressor().decompress(data)
+    elif codec == "zlib":
+        raw = zlib.decompress(data)
+    else:
+        raise ValueError(f"Unknown payload codec {codec!r}")
+    return json.loads(raw.decode("utf-8"))
+
+
+def chunk_path(conv_id, part, seq):
+    return f"conversations/{conv_id}/payload/{part}-{seq}"
+
+
+def split_conversation_doc(conv_id, doc, heavy_parts=HEAVY_PARTS):
+    """
+    Move heavy fields out of `doc`.
+
+    Returns (main_doc, ops) where ops are write_batch operations for the
+    payload chunks followed by the main document (written last, so a
+    reader never sees a manifest whose chunks are missing).
+    """
+    main_doc = {k: v for k, v in doc.items() if k not in heavy_parts}
+    manifests, ops = {}, []
+
+    for part in heavy_parts:
+        if doc.get(part) is None:
+            continue
+        codec, blob, raw_size = compress(doc[part])
+        chunks = [blob[i:i + CHUNK_BYTES] for i in range(0, len(blob), CHUNK_BYTES)] or [b""]
+        for seq, data in enumerate(chunks):
+            ops.append(("set", chunk_path(conv_id, part, seq), {"part": part, "seq": seq, "data": data}))
+        manifests[part] = {
+            "codec": codec,
+            "chunks": len(chunks),
+            "rawBytes": raw_size,
+            "storedBytes": len(blob),
+        }
+
+    main_doc["payloadParts"] = manifests
+    ops.append(("set", f"conversations/{conv_id}", main_doc))
+    return main_doc, ops
+
+
+def assemble_part(manifest, chunks):
+    """Rebuild one part from its manifest and chunk docs (any order)."""
+    ordered = sorted(chunks, key=lambda c: c["seq"])
+    if len(ordered) != manifest["chunks"]:
+        raise ValueError(f"Expected {manifest['chunks']} payload chunks, got {len(ordered)}")
+    return decompress(manifest["codec"], b"".join(bytes(c["data"]) for c in ordered))
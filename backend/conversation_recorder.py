@@ -1,3 +1,9 @@
+import argparse
+import os
+import struct
+import threading
+import time
+
 import sounddevice as sd
 from scipy.io.wavfile import write
 import numpy as np
@@ -6,26 +12,210 @@ import speech_recognition as sr
 fs = 44100  # Sample rate
 channels = 1
 
-print("Press ENTER to start recording...")
-input()
+# ------------------- Streaming recorder -------------------
+#
+# The audio callback pushes each block into a fixed-size single-producer /
+# single-consumer ring buffer (no locks, no allocation), and a background
+# thread drains it into the output file as it goes. Memory stays constant
+# however long the recording runs, and the file header is rewritten every
+# FLUSH_SECONDS so a crash leaves a playable file with everything up to the
+# last flush.
+
+RING_SECONDS = 30     # writer may fall this far behind before blocks are dropped
+FLUSH_SECONDS = 1.0
+WRITER_IDLE_SLEEP = 0.05
+
+
+class RingBuffer:
+    """
+    Lock-free SPSC ring of audio frames. Only the producer advances
+    `_written` and only the consumer advances `_read`, so each side reads
+    the other's counter without a lock.
+    """
+
+    def __init__(self, capacity, channels, dtype="int16"):
+        self.buf = np.zeros((capacity, channels), dtype=dtype)
+        self.capacity = capacity
+        self._written = 0
+        self._read = 0
+        self.dropped = 0
+
+    def push(self, block):
+        """Producer side (audio callback). Drops what does not fit."""
+        free = self.capacity - (self._written - self._read)
+        if len(block) > free:
+            self.dropped += len(block) - free
+            block = block[:free]
+        n = len(block)
+        start = self._written % self.capacity
+        first = min(n, self.capacity - start)
+        self.buf[start:start + first] = block[:first]
+        self.buf[:n - first] = block[first:]
+        self._written += n  # publish only after the copy
+
+    def pop(self):
+        """Consumer side: copy of everything available (may be empty)."""
+        n = self._written - self._read
+        start = self._read % self.capacity
+        first = min(n, self.capacity - start)
+        out = np.concatenate([self.buf[start:start + first], self.buf[:n - first]])
+        self._read += n
+        return out
+
+
+class WavAppender:
+    """16-bit PCM WAV written incrementally; sizes in the header are kept current."""
+
+    def __init__(self, path, samplerate, channels):
+        self.f = open(path, "wb")
+        self.samplerate = samplerate
+        self.channels = channels
+        self.data_bytes = 0
+        self._write_header()
+
+    def _write_header(self):
+        block_align = self.channels * 2
+        self.f.write(struct.pack(
+            "<4sI4s4sIHHIIHH4sI",
+            b"RIFF", 36 + self.data_bytes, b"WAVE",
+            b"fmt ", 16, 1, self.channels, self.samplerate,
+            self.samplerate * block_align, block_align, 16,
+            b"data", self.data_bytes,
+        ))
+
+    def write(self, frames):
+        data = frames.astype("<i2").tobytes()
+        self.f.write(data)
+        self.data_bytes += len(data)
+
+    def flush(self):
+        end = self.f.tell()
+        self.f.seek(0)
+        self._write_header()
+        self.f.seek(end)
+        self.f.flush()
+        os.fsync(self.f.fileno())
+
+    def close(self):
+        self.flush()
+        self.f.close()
+
+
+class FlacAppender:
+    """FLAC via libsndfile (soundfile), written incrementally."""
+
+    def __init__(self, path, samplerate, channels):
+        import soundfile
+
+        self.f = soundfile.SoundFile(path, "w", samplerate=samplerate, channels=channels,
+                                     format="FLAC", subtype="PCM_16")
+
+    def write(self, frames):
+        self.f.write(frames)
+
+    def flush(self):
+        self.f.flush()
+
+    def close(self):
+        self.f.close()
+
+
+class StreamingRecorder:
+    """Microphone -> ring buffer -> writer thread -> WAV/FLAC file."""
+
+    def __init__(self, path, samplerate=fs, channels=channels):
+        self.path = path
+        self.samplerate = samplerate
+        self.channels = channels
+        self.ring = RingBuffer(RING_SECONDS * samplerate, channels)
+        self.overflows = 0
+        self._stop = threading.Event()
+        appender = FlacAppender if path.lower().endswith(".flac") else WavAppender
+        self.out = appender(path, samplerate, channels)
+        self.frames_written = 0
+
+    def _callback(self, indata, frames, time_info, status):
+        if status.input_overflow:
+            self.overflows += 1
+        self.ring.push(indata)
+
+    def _writer(self):
+        last_flush = time.monotonic()
+        while True:
+            stopping = self._stop.is_set()
+            frames = self.ring.pop()
+            if len(frames):
+                self.out.write(frames)
+                self.frames_written += len(frames)
+            if time.monotonic() - last_flush >= FLUSH_SECONDS:
+                self.out.flush()
+                last_flush = time.monotonic()
+            if stopping:
+                break  # drained after the stream stopped
+            if not len(frames):
+                time.sleep(WRITER_IDLE_SLEEP)
+        self.out.close()
+
+    def __enter__(self):
+        self.writer = threading.Thread(target=self._writer, daemon=True)
+        self.writer.start()
+        self.stream = sd.InputStream(samplerate=self.samplerate, channels=self.channels,
+                                     dtype="int16", callback=self._callback)
+        self.stream.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stream.stop()
+        self.stream.close()
+        self._stop.set()
+        self.writer.join()
+
+
+def record_in_memory(path):
+    """Original mode: keep every block in memory and write once at the end."""
+    recorded_chunks = []
+
+    # Callback for non-blocking recording
+    def callback(indata, frames, time, status):
+        recorded_chunks.append(indata.copy())
+
+    stream = sd.InputStream(samplerate=fs, channels=channels, callback=callback)
+    with stream:
+        input()  # Wait until user presses Enter
+        # Exiting the 'with' block stops the stream
+
+    # Combine all chunks
+    audio_np = np.concatenate(recorded_chunks, axis=0)
+    write(path, fs, audio_np)
+
+
+def record_streaming(path):
+    with StreamingRecorder(path) as rec:
+        input()  # Wait until user presses Enter
+    seconds = rec.frames_written / rec.samplerate
+    print(f"Wrote {seconds:.1f}s ({rec.ring.dropped} frames dropped, {rec.overflows} input overflows)")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("output", nargs="?", default="input_audio.wav", help=".wav or .flac")
+    parser.add_argument("--mode", choices=["stream", "memory"], default="stream")
+    args = parser.parse_args()
 
-print("Recording... Press ENTER again to stop.")
-recorded_chunks = []
+    print("Press ENTER to start recording...")
+    input()
 
-# Callback for non-blocking recording
-def callback(indata, frames, time, status):
-    recorded_chunks.append(indata.copy())
+    print("Recording... Press ENTER again to stop.")
+    if args.mode == "stream":
+        record_streaming(args.output)
+    else:
+        record_in_memory(args.output)
 
-stream = sd.InputStream(samplerate=fs, channels=channels, callback=callback)
-with stream:
-    input()  # Wait until user presses Enter
-    # Exiting the 'with' block stops the stream
+    print(f"Saved recording to {args.output}")
 
-# Combine all chunks
-audio_np = np.concatenate(recorded_chunks, axis=0)
-write("input_audio.wav", fs, audio_np)
 
-print("Saved recording to input_audio.wav")
+if __name__ == "__main__":
+    main()
 
 # # Transcribe using speech_recognition
 # r = sr.Recognizer()
@@ -0,0 +1,133 @@
+import sys
+import json
+import os
+import time
+
+import faiss
+import numpy as np
+
+from embedding_service import EncodingService, BACKENDS
+from chunker import chunk_description
+from vdb import prepare_chunks_for_embedding
+
+# ------------------- Retrieval parity check -------------------
+#
+# Compares a faster embedding backend (int8 torch / ONNX) against the fp32
+# reference on our own corpus: mindmap.json chunks plus windowed profile
+# passages. Every mindmap chunk and a few fixed questions are used as
+# queries; the candidate must return (nearly) the same top-k passages. A
+# mindmap chunk is itself in the corpus, so its own entry is left out of its
+# results (otherwise every backend trivially agrees on rank 1). The
+# candidate's corpus embeddings must also stay close (cosine) to fp32.
+#
+# Run in CI as tests/test_embedding_parity.py (skipped when a backend's
+# optional packages are missing), or by hand for the full report.
+# Exits non-zero when parity drops below the thresholds.
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+MIN_TOP1 = 0.95
+MIN_RECALL = 0.9
+MIN_MEAN_COSINE = 0.98
+
+QUERIES = [
+    "Who introduced the agentic Rolodex?",
+    "What is the market opportunity?",
+    "Who studies data science at Duke University?",
+    "Formula 1 world champion",
+    "Which projects were built at a hackathon?",
+]
+
+
+def load_corpus(profiles_dir=os.path.join(BACKEND_DIR, "out_speakers", "profiles"),
+                mindmap_path=os.path.join(BACKEND_DIR, "mindmap.json"), tokenizer=None):
+    texts = []
+    with open(mindmap_path, "r", encoding="utf-8") as f:
+        mindmap_texts = [c["text"] for c in prepare_chunks_for_embedding(json.load(f))]
+    texts.extend(mindmap_texts)
+
+    for filename in sorted(os.listdir(profiles_dir)):
+        if not filename.endswith(".json"):
+            continue
+        with open(os.path.join(profiles_dir, filename), "r", encoding="utf-8") as f:
+            profile = json.load(f)
+        name = profile.get("query", filename)
+        for text, link in zip(profile.get("texts", []), profile.get("links", [])):
+            for passage in chunk_description(name, name, link, text, tokenizer=tokenizer):
+                texts.append(f"{name}: {passage['body']}")
+    return texts, mindmap_texts
+
+
+def rankings(service, corpus, queries, top_k, exclude=None):
+    """
+    (top-k corpus indices per query, ms per query, corpus embeddings);
+    `exclude[i]` (a corpus index or None) is dropped from query i's results.
+    """
+    corpus_emb = service.encode(corpus)
+    index = faiss.IndexFlatL2(corpus_emb.shape[1])
+    index.add(corpus_emb)
+
+    start = time.perf_counter()
+    query_emb = np.vstack([service.encode([q]) for q in queries])
+    per_query_ms = (time.perf_counter() - start) / len(queries) * 1000
+
+    exclude = exclude or [None] * len(queries)
+    _, indices = index.search(query_emb, top_k + 1)
+    indices = np.array([[i for i in row if i != own][:top_k] for row, own in zip(indices, exclude)])
+    return indices, per_query_ms, corpus_emb
+
+
+def measure_parity(backend, top_k=5):
+    """Top-1 agreement, recall@k and corpus-embedding cosine of `backend` vs torch fp32."""
+    reference = EncodingService(backend="torch", verbose=False)
+    candidate = EncodingService(backend=backend, verbose=False)
+
+    corpus, mindmap_texts = load_corpus(tokenizer=reference.tokenizer)
+    queries = QUERIES + mindmap_texts
+    # mindmap chunks come first in the corpus, so chunk i is corpus entry i
+    exclude = [None] * len(QUERIES) + list(range(len(mindmap_texts)))
+
+    ref_idx, ref_ms, ref_emb = rankings(reference, corpus, queries, top_k, exclude)
+    cand_idx, cand_ms, cand_emb = rankings(candidate, corpus, queries, top_k, exclude)
+
+    cosines = np.sum(ref_emb * cand_emb, axis=1) / (
+        np.linalg.norm(ref_emb, axis=1) * np.linalg.norm(cand_emb, axis=1) + 1e-12
+    )
+    return {
+        "passages": len(corpus),
+        "queries": len(queries),
+        "top_k": top_k,
+        "top1": float(np.mean(ref_idx[:, 0] == cand_idx[:, 0])),
+        "recall": float(np.mean([len(set(r) & set(c)) / top_k for r, c in zip(ref_idx, cand_idx)])),
+        "mean_cosine": float(np.mean(cosines)),
+        "min_cosine": float(np.min(cosines)),
+        "reference_ms": ref_ms,
+        "candidate_ms": cand_ms,
+    }
+
+
+def check_parity(backend, top_k=5):
+    result = measure_parity(backend, top_k)
+    print(f"📚 {result['passages']} passages, {result['queries']} queries, top_k={top_k}")
+    print(f"torch fp32:  {result['reference_ms']:.2f} ms/query")
+    print(f"{backend}: {result['candidate_ms']:.2f} ms/query")
+    print(f"Top-1 agreement: {result['top1']:.1%} (min {MIN_TOP1:.0%})")
+    print(f"Recall@{top_k}:       {result['recall']:.1%} (min {MIN_RECALL:.0%})")
+    print(f"Mean cosine:     {result['mean_cosine']:.4f} (min {MIN_MEAN_COSINE}), "
+          f"worst {result['min_cosine']:.4f}")
+
+    ok = (result["top1"] >= MIN_TOP1 and result["recall"] >= MIN_RECALL
+          and result["mean_cosine"] >= MIN_MEAN_COSINE)
+    print("✅ Parity OK" if ok else "❌ Parity check failed")
+    return ok
+
+
+def main():
+    backend = sys.argv[1] if len(sys.argv) > 1 else "torch-int8"
+    if backend not in BACKENDS:
+        raise SystemExit(f"Unknown backend {backend!r}; expected one of {BACKENDS}")
+    if not check_parity(backend):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
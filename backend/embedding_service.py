@@ -0,0 +1,230 @@
+import os
+import json
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from metrics import timed
+
+DEFAULT_MODEL = "all-MiniLM-L6-v2"
+
+# Inference backend: "torch" (fp32), "torch-int8" (dynamic-quantized Linear
+# layers) or "onnx" (ONNX Runtime, needs `pip install sentence-transformers[onnx]`)
+BACKENDS = ("torch", "torch-int8", "onnx")
+DEFAULT_BACKEND = os.getenv("EMBED_BACKEND", "torch")
+# Optional ONNX file inside the model repo, e.g. onnx/model_qint8_avx512_vnni.onnx
+ONNX_FILE = os.getenv("EMBED_ONNX_FILE")
+
+# Defaults can be tuned per host without code changes
+DEFAULT_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "32"))
+DEFAULT_TOKEN_BUDGET = int(os.getenv("EMBED_TOKEN_BUDGET", "4096"))
+DEFAULT_WORKERS = int(os.getenv("EMBED_WORKERS", "1"))
+DEFAULT_TORCH_THREADS = int(os.getenv("EMBED_TORCH_THREADS", "0"))  # 0 = leave torch default
+
+
+def load_model(model_name=DEFAULT_MODEL, backend=DEFAULT_BACKEND):
+    """Load `model_name` on CPU with the requested inference backend."""
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown embedding backend {backend!r}; expected one of {BACKENDS}")
+    # imported here so importing this module (and the CLIs built on it) stays cheap
+    from sentence_transformers import SentenceTransformer
+
+    if backend == "onnx":
+        model_kwargs = {"file_name": ONNX_FILE} if ONNX_FILE else None
+        return SentenceTransformer(model_name, device="cpu", backend="onnx", model_kwargs=model_kwargs)
+
+    model = SentenceTransformer(model_name, device="cpu")
+    if backend == "torch-int8":
+        import torch
+        torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8, inplace=True)
+    return model
+
+
+class EncodingService:
+    """
+    Shared text encoder for vdb, RAG_FRAMEWORK and person_db.
+
+    Inputs are sorted by token length and grouped into batches whose padded
+    size (batch rows x longest row) stays under `token_budget`, so short
+    mindmap sentences are never padded out to the length of a scraped page.
+    Batches run on a thread pool (torch releases the GIL during inference).
+    The HF fast tokenizer is not re-entrant ("Already borrowed" when two
+    threads use it), so tokenization is serialized under a lock and only
+    the forward passes run concurrently.
+    """
+
+    def __init__(self, model_name=DEFAULT_MODEL, model=None, backend=DEFAULT_BACKEND,
+                 batch_size=DEFAULT_BATCH_SIZE, token_budget=DEFAULT_TOKEN_BUDGET, workers=DEFAULT_WORKERS,
+                 torch_threads=DEFAULT_TORCH_THREADS, verbose=True):
+        """
+        Args:
+            model_name: SentenceTransformer model to load (ignored if `model` given)
+            model: Already-loaded SentenceTransformer to wrap
+            backend: Inference backend, see BACKENDS (ignored if `model` given)
+            batch_size: Max texts per batch
+            token_budget: Max padded tokens (rows x longest row) per batch
+            workers: Threads running batches concurrently
+            torch_threads: Intra-op threads for torch (0 = torch default);
+                           with several workers keep workers x threads <= cores
+            verbose: Print throughput after each encode call
+        """
+        if torch_threads:
+            import torch
+            torch.set_num_threads(torch_threads)
+
+        self.model_name = model_name
+        self.backend = backend
+        self.model = model or load_model(model_name, backend)
+        self.tokenizer = getattr(self.model, "tokenizer", None)
+        self.max_seq_length = self.model.max_seq_length or 256
+        self.batch_size = batch_size
+        self.token_budget = token_budget
+        self.workers = max(1, workers)
+        self.verbose = verbose
+        self.last_stats = None
+        self._pool = ThreadPoolExecutor(max_workers=self.workers) if self.workers > 1 else None
+        self._tokenizer_lock = threading.Lock()
+
+    def get_sentence_embedding_dimension(self):
+        return self.model.get_sentence_embedding_dimension()
+
+    # ---------------- Batching ----------------
+
+    def token_lengths(self, texts):
+        """Token count of each text as the model will see it (after truncation)."""
+        if self.tokenizer is None:
+            return [min(len(t.split()) + 2, self.max_seq_length) for t in texts]
+        # Anything past ~10 chars/token is truncated anyway; don't tokenize it
+        clipped = [t[:self.max_seq_length * 10] for t in texts]
+        with self._tokenizer_lock:
+            encoded = self.tokenizer(clipped, add_special_tokens=True, truncation=True,
+                                     max_length=self.max_seq_length)
+        return [len(ids) for ids in encoded["input_ids"]]
+
+    def make_batches(self, lengths):
+        """Group text indices (longest first) into token-budgeted batches."""
+        order = sorted(range(len(lengths)), key=lambda i: lengths[i], reverse=True)
+        batches, current, longest = [], [], 0
+        for i in order:
+            longest_if_added = max(longest, lengths[i])
+            if current and (len(current) >= self.batch_size
+                            or longest_if_added * (len(current) + 1) > self.token_budget):
+                batches.append(current)
+                current, longest_if_added = [], lengths[i]
+            current.append(i)
+            longest = longest_if_added
+        if current:
+            batches.append(current)
+        return batches
+
+    # ---------------- Encoding ----------------
+
+    def _encode_batch(self, texts):
+        import torch
+
+        # same steps as SentenceTransformer.encode, with the tokenizer behind the lock
+        with self._tokenizer_lock:
+            features = self.model.tokenize(texts)
+        with torch.no_grad():
+            embeddings = self.model(features)["sentence_embedding"]
+        return embeddings.float().cpu().numpy()
+
+    @timed("embed")
+    def encode(self, texts):
+        """
+        Encode `texts` and return a float32 array in input order.
+        Throughput stats for the call are kept in `self.last_stats`.
+        """
+        texts = list(texts)
+        if not texts:
+            return np.zeros((0, self.get_sentence_embedding_dimension()), dtype="float32")
+
+        start = time.perf_counter()
+        lengths = self.token_lengths(texts)
+        batches = self.make_batches(lengths)
+        batch_texts = [[texts[i] for i in batch] for batch in batches]
+
+        if self._pool is not None and len(batches) > 1:
+            outputs = list(self._pool.map(self._encode_batch, batch_texts))
+        else:
+            outputs = [self._encode_batch(b) for b in batch_texts]
+
+        dim = outputs[0].shape[1]
+        embeddings = np.empty((len(texts), dim), dtype="float32")
+        for batch, out in zip(batches, outputs):
+            embeddings[batch] = out
+
+        elapsed = time.perf_counter() - start
+        real_tokens = sum(lengths)
+        padded_tokens = sum(len(b) * max(lengths[i] for i in b) for b in batches)
+        self.last_stats = {
+            "texts": len(texts),
+            "batches": len(batches),
+            "seconds": elapsed,
+            "texts_per_sec": len(texts) / elapsed if elapsed > 0 else float("inf"),
+            "tokens": real_tokens,
+            "padded_tokens": padded_tokens,
+            "padding_ratio": 1 - real_tokens / padded_tokens if padded_tokens else 0.0,
+        }
+        if self.verbose and len(texts) > 1:
+            s = self.last_stats
+            print(f"⚡ Encoded {s['texts']} texts in {s['batches']} batches: "
+                  f"{s['texts_per_sec']:.1f} texts/s, padding {s['padding_ratio']:.1%}")
+        return embeddings
+
+
+_ENCODERS = {}
+_ENCODERS_LOCK = threading.Lock()
+
+
+def get_encoder(model_name=DEFAULT_MODEL, backend=None, **kwargs):
+    """Process-wide EncodingService per (model, backend), loaded on first use."""
+    backend = backend or DEFAULT_BACKEND
+    key = (model_name, backend)
+    with _ENCODERS_LOCK:
+        if key not in _ENCODERS:
+            _ENCODERS[key] = EncodingService(model_name, backend=backend, **kwargs)
+        return _ENCODERS[key]
+
+
+# ------------------- Benchmark -------------------
+
+def load_benchmark_corpus(profiles_dir="out_speakers/profiles", mindmap_path="mindmap.json"):
+    """Mixed corpus: short mindmap chunk texts plus long scraped profile pages."""
+    from vdb import prepare_chunks_for_embedding
+
+    texts = []
+    if os.path.exists(mindmap_path):
+        with open(mindmap_path, "r", encoding="utf-8") as f:
+            texts.extend(c["text"] for c in prepare_chunks_for_embedding(json.load(f)))
+    if os.path.isdir(profiles_dir):
+        for filename in sorted(os.listdir(profiles_dir)):
+            if filename.endswith(".json"):
+                with open(os.path.join(profiles_dir, filename), "r", encoding="utf-8") as f:
+                    texts.extend(t for t in json.load(f).get("texts", []) if t)
+    return texts
+
+
+def main():
+    texts = load_benchmark_corpus()
+    print(f"📚 Benchmark corpus: {len(texts)} texts")
+
+    service = EncodingService(verbose=False)
+    service.encode(texts[:8])  # warm up
+
+    start = time.perf_counter()
+    service.model.encode(texts, convert_to_numpy=True, show_progress_bar=False)
+    naive = time.perf_counter() - start
+    print(f"Default encode:   {len(texts) / naive:.1f} texts/s")
+
+    service.encode(texts)
+    s = service.last_stats
+    print(f"EncodingService:  {s['texts_per_sec']:.1f} texts/s "
+          f"({s['batches']} batches, padding {s['padding_ratio']:.1%}, "
+          f"workers={service.workers})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,311 @@
+import os
+import uuid
+import asyncio
+import logging
+from datetime import datetime, timezone
+
+from .conversation_payload import split_conversation_doc, chunk_path, assemble_part
+from .metrics import timed
+
+# ------------------- Data access layer -------------------
+#
+# All Firestore access from the API goes through a store object so request
+# handlers never block the event loop on a round trip:
+#
+#   FirestoreStore  - google.cloud.firestore.AsyncClient (honours
+#                     FIRESTORE_EMULATOR_HOST, so it also runs against the
+#                     local emulator)
+#   InMemoryStore   - same interface over dicts, for tests and benchmarks
+#
+# make_store() picks one from $FIRESTORE_BACKEND ("firestore" | "memory").
+
+SERVICE_ACCOUNT = "backend/ai-hackathon-4e25e-firebase-adminsdk-fbsvc-5557fc6879.json"
+MAX_BATCH_WRITES = 500  # Firestore limit per batch
+MAX_BATCH_BYTES = 9 * 1024 * 1024  # stay under the 10 MiB request limit
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+VOICE_PROFILE_FIELDS = ["voiceEmbedding", "displayName", "name", "email"]
+
+
+def display_name(user_id, data):
+    """Best human-readable name on a user profile."""
+    email = data.get("email") or ""
+    return data.get("displayName") or data.get("name") or email.split("@")[0] or user_id
+
+
+def _op_bytes(data):
+    """Rough encoded size of a write; dominated by payload blobs."""
+    if not data:
+        return 0
+    return sum(len(v) if isinstance(v, (bytes, str)) else 16 for v in data.values())
+
+
+def split_ops(ops):
+    """Group write ops into batches within Firestore's count and size limits."""
+    batches, current, size = [], [], 0
+    for op in ops:
+        op_size = _op_bytes(op[2])
+        if current and (len(current) >= MAX_BATCH_WRITES or size + op_size > MAX_BATCH_BYTES):
+            batches.append(current)
+            current, size = [], 0
+        current.append(op)
+        size += op_size
+    if current:
+        batches.append(current)
+    return batches
+
+
+class FirestoreStore:
+    """Async Firestore access for conversations and users."""
+
+    def __init__(self, client):
+        self.client = client
+
+    @classmethod
+    def from_service_account(cls, path=SERVICE_ACCOUNT):
+        from google.cloud import firestore
+        from firebase_admin import credentials
+
+        if os.getenv("FIRESTORE_EMULATOR_HOST"):
+            project = os.getenv("GOOGLE_CLOUD_PROJECT", "demo-rolodex")
+            return cls(firestore.AsyncClient(project=project))
+        cred = credentials.Certificate(path)
+        return cls(firestore.AsyncClient(project=cred.project_id, credentials=cred.get_credential()))
+
+    def server_timestamp(self):
+        from google.cloud import firestore
+        return firestore.SERVER_TIMESTAMP
+
+    def new_id(self, collection):
+        return self.client.collection(collection).document().id
+
+    # ---------------- Batched writes ----------------
+
+    @timed("firestore")
+    async def write_batch(self, ops):
+        """
+        Apply writes in order, batched within Firestore's count/size limits
+        (each batch is atomic).
+
+        ops: list of (kind, path, data) where kind is "set", "merge",
+             "update" or "delete" and path is "collection/doc[/sub/doc...]".
+        """
+        for group in split_ops(ops):
+            batch = self.client.batch()
+            for kind, path, data in group:
+                ref = self.client.document(path)
+                if kind == "set":
+                    batch.set(ref, data)
+                elif kind == "merge":
+                    batch.set(ref, data, merge=True)
+                elif kind == "update":
+                    batch.update(ref, data)
+                elif kind == "delete":
+                    batch.delete(ref)
+                else:
+                    raise ValueError(f"Unknown write kind {kind!r}")
+            await batch.commit()
+
+    # ---------------- Conversations ----------------
+
+    async def add_conversation(self, doc):
+        """Store a conversation with its heavy fields split into compressed payload chunks."""
+        conv_id = self.new_id("conversations")
+        _, ops = split_conversation_doc(conv_id, doc)
+        await self.write_batch(ops)
+        return conv_id
+
+    @timed("firestore")
+    async def get_conversation(self, conv_id):
+        snap = await self.client.collection("conversations").document(conv_id).get()
+        return snap.to_dict() if snap.exists else None
+
+    @timed("firestore")
+    async def get_payload_parts(self, conv_id, manifests, parts):
+        """Load and decompress the requested heavy parts of a conversation."""
+        parts = [p for p in parts if p in manifests]
+        refs = [
+            self.client.document(chunk_path(conv_id, part, seq))
+            for part in parts
+            for seq in range(manifests[part]["chunks"])
+        ]
+        chunks = {part: [] for part in parts}
+        if refs:
+            async for snap in self.client.get_all(refs):
+                if snap.exists:
+                    data = snap.to_dict()
+                    chunks[data["part"]].append(data)
+        return {part: assemble_part(manifests[part], chunks[part]) for part in parts}
+
+    @timed("firestore")
+    async def list_conversations(self, user_id, fields, limit, cursor=None):
+        """
+        One page of a user's conversations, newest first.
+
+        Returns (items, next_cursor) where items is a list of (id, data).
+        Raises InvalidCursor if `cursor` is not one of the user's documents.
+        """
+        from google.api_core.exceptions import FailedPrecondition
+        from google.cloud import firestore
+
+        coll = self.client.collection("conversations")
+        base = coll.where("userId", "==", user_id)
+        ordered = base.order_by("timestamp", direction=firestore.Query.DESCENDING)
+
+        cursor_snap = None
+        if cursor:
+            cursor_snap = await coll.document(cursor).get()
+            if not cursor_snap.exists or (cursor_snap.to_dict() or {}).get("userId") != user_id:
+                raise InvalidCursor(cursor)
+
+        async def page(q):
+            # fetch one extra document to know whether another page exists
+            if cursor_snap is not None:
+                q = q.start_after(cursor_snap)
+            return [doc async for doc in q.select(fields).limit(limit + 1).stream()]
+
+        try:
+            docs = await page(ordered)
+        except FailedPrecondition as e:
+            # only a missing composite index for userId + timestamp; pages come
+            # back in document order until it is created
+            logging.error("conversations index missing, listing unordered: %s", e)
+            docs = await page(base)
+
+        has_more = len(docs) > limit
+        docs = docs[:limit]
+        items = [(doc.id, doc.to_dict() or {}) for doc in docs]
+        return items, (docs[-1].id if has_more and docs else None)
+
+    # ---------------- Users ----------------
+
+    @timed("firestore")
+    async def get_user(self, user_id):
+        snap = await self.client.collection("users").document(user_id).get()
+        return snap.to_dict() if snap.exists else None
+
+    @timed("firestore")
+    async def set_user(self, user_id, data, merge=True):
+        await self.client.collection("users").document(user_id).set(data, merge=merge)
+
+    @timed("firestore")
+    async def list_voice_profiles(self):
+        """(user_id, display name, embedding) for every enrolled user."""
+        query = (
+            self.client.collection("users")
+            .where("hasVoiceProfile", "==", True)
+            .select(VOICE_PROFILE_FIELDS)
+        )
+        profiles = []
+        async for doc in query.stream():
+            data = doc.to_dict() or {}
+            if data.get("voiceEmbedding"):
+                profiles.append((doc.id, display_name(doc.id, data), data["voiceEmbedding"]))
+        return profiles
+
+
+class InMemoryStore:
+    """Dict-backed stand-in with the same interface as FirestoreStore."""
+
+    def __init__(self):
+        self.docs = {}  # "collection/doc" -> data
+        self._lock = asyncio.Lock()
+
+    def server_timestamp(self):
+        return datetime.now(timezone.utc)
+
+    def new_id(self, collection):
+        return uuid.uuid4().hex[:20]
+
+    @timed("firestore")
+    async def write_batch(self, ops):
+        async with self._lock:
+            for kind, path, data in ops:
+                if kind == "set":
+                    self.docs[path] = dict(data)
+                elif kind == "merge":
+                    self.docs.setdefault(path, {}).update(data)
+                elif kind == "update":
+                    if path not in self.docs:
+                        raise KeyError(f"No document to update: {path}")
+                    self.docs[path].update(data)
+                elif kind == "delete":
+                    self.docs.pop(path, None)
+                else:
+                    raise ValueError(f"Unknown write kind {kind!r}")
+
+    async def add_conversation(self, doc):
+        conv_id = self.new_id("conversations")
+        _, ops = split_conversation_doc(conv_id, doc)
+        await self.write_batch(ops)
+        return conv_id
+
+    @timed("firestore")
+    async def get_conversation(self, conv_id):
+        data = self.docs.get(f"conversations/{conv_id}")
+        return dict(data) if data is not None else None
+
+    @timed("firestore")
+    async def get_payload_parts(self, conv_id, manifests, parts):
+        parts = [p for p in parts if p in manifests]
+        result = {}
+        for part in parts:
+            chunks = [
+                self.docs[chunk_path(conv_id, part, seq)]
+                for seq in range(manifests[part]["chunks"])
+                if chunk_path(conv_id, part, seq) in self.docs
+            ]
+            result[part] = assemble_part(manifests[part], chunks)
+        return result
+
+    @timed("firestore")
+    async def list_conversations(self, user_id, fields, limit, cursor=None):
+        items = [
+            (path.split("/", 1)[1], data)
+            for path, data in self.docs.items()
+            if path.count("/") == 1 and path.startswith("conversations/") and data.get("userId") == user_id
+        ]
+        items.sort(key=lambda item: (item[1].get("timestamp") or datetime.min.replace(tzinfo=timezone.utc), item[0]),
+                   reverse=True)
+        if cursor:
+            ids = [conv_id for conv_id, _ in items]
+            if cursor not in ids:
+                raise InvalidCursor(cursor)
+            items = items[ids.index(cursor) + 1:]
+
+        page = [(conv_id, {f: data[f] for f in fields if f in data}) for conv_id, data in items[:limit]]
+        next_cursor = page[-1][0] if len(items) > limit and page else None
+        return page, next_cursor
+
+    @timed("firestore")
+    async def get_user(self, user_id):
+        data = self.docs.get(f"users/{user_id}")
+        return dict(data) if data is not None else None
+
+    @timed("firestore")
+    async def set_user(self, user_id, data, merge=True):
+        await self.write_batch([("merge" if merge else "set", f"users/{user_id}", data)])
+
+    @timed("firestore")
+    async def list_voice_profiles(self):
+        profiles = []
+        for path, data in self.docs.items():
+            if path.startswith("users/") and path.count("/") == 1 and data.get("hasVoiceProfile"):
+                user_id = path.split("/", 1)[1]
+                if data.get("voiceEmbedding"):
+                    profiles.append((user_id, display_name(user_id, data), data["voiceEmbedding"]))
+        return profiles
+
+
+def make_store():
+    """Store selected by $FIRESTORE_BACKEND (default: real Firestore)."""
+    backend = os.getenv("FIRESTORE_BACKEND", "firestore")
+    if backend == "memory":
+        return InMemoryStore()
+    if backend == "firestore":
+        return FirestoreStore.from_service_account()
+    raise ValueError(f"Unknown FIRESTORE_BACKEND {backend!r}")
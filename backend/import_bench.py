@@ -0,0 +1,68 @@
+"""
+Import-time benchmark for the backend.
+
+Imports each module in a fresh interpreter with `-X importtime` and reports
+wall time plus the slowest imports (cumulative), so heavy dependencies
+creeping back into module scope show up before they slow worker boot.
+
+Run from the repo root:
+    python -m backend.import_bench [module ...] [--top 15]
+"""
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+DEFAULT_MODULES = [
+    "backend.app",
+    "backend.RAG_FRAMEWORK",
+    "backend.Audio_to_text",
+    "backend.LLM_json_generator",
+]
+
+
+def import_profile(module):
+    """(wall seconds, [(cumulative_us, depth, name)]) for importing `module` in a fresh process."""
+    env = {**os.environ, "PYTHONPATH": os.pathsep.join(filter(None, ["backend", os.environ.get("PYTHONPATH")]))}
+    start = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, env=env,
+    )
+    wall = time.perf_counter() - start
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else "import failed")
+
+    entries = []
+    for line in proc.stderr.splitlines():
+        # "import time: self [us] | cumulative | imported package"
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        name = name[1:]  # nesting is shown as two extra spaces per level
+        entries.append((int(cumulative), (len(name) - len(name.lstrip())) // 2, name.strip()))
+    return wall, entries
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("modules", nargs="*", default=DEFAULT_MODULES)
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+
+    for module in args.modules:
+        try:
+            wall, entries = import_profile(module)
+        except RuntimeError as e:
+            print(f"\n⚠️ {module}: {e}")
+            continue
+        print(f"\n📦 {module}: {wall:.2f}s wall (interpreter start included)")
+        # direct imports of the module under test (depth 1) show where the time goes
+        direct = [(us, name) for us, depth, name in entries if depth <= 1 and name != module]
+        for us, name in sorted(direct, reverse=True)[:args.top]:
+            print(f"  {us / 1000:>9.1f} ms  {name}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,324 @@
+import asyncio
+import os
+
+import numpy as np
+
+from .voice_embedding import SAMPLE_RATE
+
+# ------------------- Live audio -> rolling transcript -------------------
+#
+# MediaRecorder chunks are only decodable as one continuous WebM stream,
+# so a single ffmpeg process per session turns the incoming bytes into
+# 16 kHz mono s16le PCM. The PCM is sent to a streaming transcriber as it
+# arrives:
+#
+#   AssemblyAIRealtimeTranscriber  - AssemblyAI real-time API ($API_Key)
+#   SegmentingTranscriber          - local: energy-based speech segments,
+#                                    transcribed with the offline faster-whisper
+#                                    model (Audio_to_text.LocalBackend)
+#
+# Transcribers yield events
+#   {"type": "partial" | "utterance", "text", "start", "end", "speaker"}
+# (seconds from the start of the session). LiveSession forwards them and,
+# every few finished utterances, refreshes a partial mindmap in the
+# background. Utterances without text (no local ASR available) are still
+# forwarded as speech activity but never reach the mindmap. The final, diarized conversation is still produced from the
+# whole recording once the session ends.
+
+PCM_BYTES_PER_SECOND = SAMPLE_RATE * 2
+SEND_BYTES = PCM_BYTES_PER_SECOND // 10    # the real-time API wants 50-1000 ms per message
+READ_BYTES = PCM_BYTES_PER_SECOND // 4
+MINDMAP_EVERY_UTTERANCES = int(os.getenv("LIVE_MINDMAP_EVERY", 5))
+
+
+class StreamDecoder:
+    """ffmpeg subprocess decoding a streamed WebM/Opus recording to PCM."""
+
+    proc = None
+
+    async def start(self):
+        self.proc = await asyncio.create_subprocess_exec(
+            "ffmpeg", "-loglevel", "error",
+            "-fflags", "nobuffer", "-probesize", "32768", "-analyzeduration", "0",
+            "-i", "pipe:0",
+            "-f", "s16le", "-ac", "1", "-ar", str(SAMPLE_RATE), "pipe:1",
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+        )
+
+    async def feed(self, chunk: bytes):
+        self.proc.stdin.write(chunk)
+        await self.proc.stdin.drain()
+
+    async def read(self) -> bytes:
+        """Next block of PCM; b"" once the input is closed and drained."""
+        return await self.proc.stdout.read(READ_BYTES)
+
+    async def close(self):
+        if self.proc is not None and not self.proc.stdin.is_closing():
+            self.proc.stdin.close()
+
+    async def wait(self):
+        await self.proc.wait()
+
+    def kill(self):
+        if self.proc is not None and self.proc.returncode is None:
+            self.proc.kill()
+
+
+class StreamingTranscriber:
+    """Base class: PCM in via send(), events out via events()."""
+
+    _DONE = object()
+
+    def __init__(self):
+        self._queue = asyncio.Queue()
+
+    async def start(self):
+        self._loop = asyncio.get_running_loop()
+
+    async def send(self, pcm: bytes):
+        raise NotImplementedError
+
+    async def close(self):
+        """Flush pending audio; events() ends after the last event."""
+        self._queue.put_nowait(self._DONE)
+
+    def _emit(self, event):
+        self._queue.put_nowait(event)
+
+    def _emit_threadsafe(self, event):
+        self._loop.call_soon_threadsafe(self._queue.put_nowait, event)
+
+    async def events(self):
+        while True:
+            event = await self._queue.get()
+            if event is self._DONE:
+                return
+            yield event
+
+
+class AssemblyAIRealtimeTranscriber(StreamingTranscriber):
+    """AssemblyAI real-time transcription (no diarization; speaker is None)."""
+
+    async def start(self):
+        await super().start()
+        import assemblyai as aai
+
+        aai.settings.api_key = os.getenv("API_Key")
+        self.rt = aai.RealtimeTranscriber(
+            sample_rate=SAMPLE_RATE,
+            on_data=self._on_data,
+            on_error=lambda error: self._emit_threadsafe({"type": "error", "message": str(error)}),
+        )
+        await self._loop.run_in_executor(None, self.rt.connect)
+
+    def _on_data(self, transcript):
+        if not transcript.text:
+            return
+        final = type(transcript).__name__ == "RealtimeFinalTranscript"
+        self._emit_threadsafe({
+            "type": "utterance" if final else "partial",
+            "text": transcript.text,
+            "start": transcript.audio_start / 1000,
+            "end": transcript.audio_end / 1000,
+            "speaker": None,
+        })
+
+    async def send(self, pcm: bytes):
+        await self._loop.run_in_executor(None, self.rt.stream, pcm)
+
+    async def close(self):
+        await self._loop.run_in_executor(None, self.rt.close)
+        await super().close()
+
+
+class SegmentingTranscriber(StreamingTranscriber):
+    """
+    Cuts speech segments on energy and silence gaps and transcribes each
+    with `transcribe(samples) -> str` if given. Without it (or once it
+    fails) utterances carry no text.
+    """
+
+    FRAME = int(SAMPLE_RATE * 0.03)
+    SILENCE_DBFS = -45.0
+    END_SILENCE_SECONDS = 0.6
+    MAX_SEGMENT_SECONDS = 15.0
+
+    def __init__(self, transcribe=None):
+        super().__init__()
+        self.transcribe = transcribe
+        self._pending = np.zeros(0, dtype=np.float32)
+        self._segment = []
+        self._segment_start = None
+        self._silent_frames = 0
+        self._frames_seen = 0
+
+    async def send(self, pcm: bytes):
+        samples = np.frombuffer(pcm, dtype=np.int16).astype(np.float32) / 2 ** 15
+        self._pending = np.concatenate([self._pending, samples])
+        n_frames = len(self._pending) // self.FRAME
+        frames = self._pending[:n_frames * self.FRAME].reshape(n_frames, self.FRAME)
+        self._pending = self._pending[n_frames * self.FRAME:]
+
+        rms = np.sqrt(np.mean(frames ** 2, axis=1) + 1e-12)
+        speech = 20 * np.log10(rms) > self.SILENCE_DBFS
+        for frame, is_speech in zip(frames, speech):
+            t = self._frames_seen * self.FRAME / SAMPLE_RATE
+            self._frames_seen += 1
+            if is_speech:
+                if self._segment_start is None:
+                    self._segment_start = t
+                    self._emit({"type": "partial", "text": "", "start": t, "end": t, "speaker": None})
+                self._silent_frames = 0
+                self._segment.append(frame)
+            elif self._segment_start is not None:
+                self._silent_frames += 1
+                self._segment.append(frame)
+                if self._silent_frames * self.FRAME >= self.END_SILENCE_SECONDS * SAMPLE_RATE:
+                    await self._finish_segment()
+            if self._segment_start is not None and \
+                    len(self._segment) * self.FRAME >= self.MAX_SEGMENT_SECONDS * SAMPLE_RATE:
+                await self._finish_segment()
+
+    async def _finish_segment(self):
+        samples = np.concatenate(self._segment)
+        start = self._segment_start
+        end = start + len(samples) / SAMPLE_RATE
+        self._segment, self._segment_start, self._silent_frames = [], None, 0
+
+        text = ""
+        if self.transcribe is not None:
+            try:
+                text = await self._loop.run_in_executor(None, self.transcribe, samples)
+            except Exception as e:
+                print(f"⚠️ Local live transcription unavailable, sending speech segments only: {e}")
+                self.transcribe = None
+        self._emit({"type": "utterance", "text": text, "start": round(start, 2),
+                    "end": round(end, 2), "speaker": None})
+
+    async def close(self):
+        if self._segment_start is not None:
+            await self._finish_segment()
+        await super().close()
+
+
+def local_transcribe(samples):
+    """Text of one speech segment from the shared offline ASR model (loaded on first use)."""
+    from . import Audio_to_text
+
+    return Audio_to_text.get_backend("local").transcribe_samples(samples)
+
+
+def make_streaming_transcriber(backend=None):
+    """$LIVE_ASR ("assemblyai" | "local"); AssemblyAI when an API key is configured."""
+    backend = backend or os.getenv("LIVE_ASR") or ("assemblyai" if os.getenv("API_Key") else "local")
+    if backend == "assemblyai":
+        return AssemblyAIRealtimeTranscriber()
+    if backend == "local":
+        return SegmentingTranscriber(transcribe=local_transcribe)
+    raise ValueError(f"Unknown LIVE_ASR {backend!r}")
+
+
+def format_live_transcript(utterances):
+    """Rolling transcript in the same layout Audio_to_text.get_text writes."""
+    return "".join(
+        f"[ Start Time:{u['start']} End Time:{u['end']} ]\n"
+        f"Speaker {u['speaker'] or 'A'}: {u['text']}\n"
+        for u in utterances if u["text"]
+    )
+
+
+class LiveSession:
+    """
+    One live recording: decoder -> transcriber -> `emit(event)`.
+
+    `build_mindmap(transcript_text)` (async) is called in the background
+    every `mindmap_every` finished utterances with text; its result is emitted as
+    {"type": "mindmap", "data": ...}. Only one refresh runs at a time.
+    """
+
+    def __init__(self, transcriber, emit, build_mindmap=None,
+                 mindmap_every=MINDMAP_EVERY_UTTERANCES):
+        self.decoder = StreamDecoder()
+        self.transcriber = transcriber
+        self.emit = emit
+        self.build_mindmap = build_mindmap
+        self.mindmap_every = mindmap_every
+        self.utterances = []
+        self.bytes_received = 0
+        self._audio_task = None
+        self._event_task = None
+        self._mindmap_task = None
+        self._mindmap_at = 0
+
+    async def start(self):
+        await self.decoder.start()
+        await self.transcriber.start()
+        self._audio_task = asyncio.create_task(self._pump_audio())
+        self._event_task = asyncio.create_task(self._pump_events())
+
+    async def feed(self, chunk: bytes):
+        self.bytes_received += len(chunk)
+        await self.decoder.feed(chunk)
+
+    async def _pump_audio(self):
+        buffered = b""
+        while True:
+            pcm = await self.decoder.read()
+            if not pcm:
+                break
+            buffered += pcm
+            if len(buffered) >= SEND_BYTES:
+                await self.transcriber.send(buffered)
+                buffered = b""
+        if buffered:
+            await self.transcriber.send(buffered)
+        await self.decoder.wait()
+        await self.transcriber.close()
+
+    async def _pump_events(self):
+        async for event in self.transcriber.events():
+            if event["type"] == "utterance" and event["text"]:
+                self.utterances.append(event)
+                self._maybe_refresh_mindmap()
+            await self._send(event)
+
+    async def _send(self, event):
+        try:
+            await self.emit(event)
+        except Exception:
+            # the client went away; keep draining so the decoder can exit
+            pass
+
+    def _maybe_refresh_mindmap(self):
+        if self.build_mindmap is None or len(self.utterances) - self._mindmap_at < self.mindmap_every:
+            return
+        if self._mindmap_task is not None and not self._mindmap_task.done():
+            return
+        self._mindmap_at = len(self.utterances)
+        self._mindmap_task = asyncio.create_task(self._refresh_mindmap())
+
+    async def _refresh_mindmap(self):
+        try:
+            data = await self.build_mindmap(format_live_transcript(self.utterances))
+            await self._send({"type": "mindmap", "data": data, "utterances": len(self.utterances)})
+        except Exception as e:
+            print(f"⚠️ Live mindmap refresh failed: {e}")
+
+    async def close(self):
+        """
+        End of audio: drain the decoder and transcriber, drop any pending
+        mindmap refresh. Also safe after a failed start() or a failed pump;
+        the ffmpeg process and the pump tasks never outlive this call.
+        """
+        try:
+            await self.decoder.close()
+            for task in (self._audio_task, self._event_task):
+                if task is not None:
+                    await task
+        finally:
+            self.decoder.kill()
+            for task in (self._audio_task, self._event_task, self._mindmap_task):
+                if task is not None and not task.done():
+                    task.cancel()
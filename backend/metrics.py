@@ -0,0 +1,190 @@
+import asyncio
+import contextvars
+import functools
+import logging
+import sys
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+# ------------------- Timing metrics and trace ids -------------------
+#
+# Pipeline stages (upload, decode, transcribe, llm, firestore, embed,
+# search, ...) are timed with `stage(name)` / `@timed(name)`. Every timing
+#   - goes into a process-wide histogram, exported in Prometheus text
+#     format by render_prometheus() (served at /metrics), and
+#   - is added to the current request's timings (a context variable), so a
+#     job record can store where its own time went.
+# Nested stages report exclusive time: a `search` that embeds its query
+# records the embedding under `embed` and only the rest under `search`, so
+# stage times add up instead of double counting. A stage nested in a stage
+# of the same name (set_user -> write_batch, both `firestore`) is timed
+# once, by the outer call.
+# Each request carries a trace id (X-Request-ID or generated) that is also
+# added to log records. Stdlib only; no module-level dependency on the app,
+# so the CLI modules can import it too.
+#
+# The app imports this file as `backend.metrics`, the script-style modules
+# (RAG_FRAMEWORK, person_db, vdb, embedding_service) as top-level `metrics`.
+# Both names are bound to the same module object below, so there is one
+# registry and one trace context whichever name is imported first.
+
+# one module object under both import names (see above)
+for _alias in ("metrics", "backend.metrics"):
+    sys.modules.setdefault(_alias, sys.modules[__name__])
+
+PREFIX = "rolodex"
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+_trace_id = contextvars.ContextVar("trace_id", default=None)
+_timings = contextvars.ContextVar("timings", default=None)
+# innermost running stage: [name, seconds spent in its nested stages]
+_active_stage = contextvars.ContextVar("active_stage", default=None)
+
+
+class Histogram:
+    """Cumulative-bucket histogram keyed by a tuple of label values."""
+
+    def __init__(self, name, help_text, label_names, buckets=BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.label_names = label_names
+        self.buckets = buckets
+        self._series = {}  # labels -> [bucket counts..., +Inf count, sum]
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labels):
+        with self._lock:
+            series = self._series.setdefault(labels, [0] * (len(self.buckets) + 1) + [0.0])
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[len(self.buckets)] += 1
+            series[-1] += value
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = sorted(self._series.items())
+        for labels, series in items:
+            base = ",".join(f'{k}="{v}"' for k, v in zip(self.label_names, labels))
+            sep = "," if base else ""
+            for bound, count in zip(self.buckets, series):
+                lines.append(f'{self.name}_bucket{{{base}{sep}le="{bound}"}} {count}')
+            lines.append(f'{self.name}_bucket{{{base}{sep}le="+Inf"}} {series[len(self.buckets)]}')
+            lines.append(f"{self.name}_sum{{{base}}} {series[-1]:.6f}")
+            lines.append(f"{self.name}_count{{{base}}} {series[len(self.buckets)]}")
+        return lines
+
+
+class Counter:
+    def __init__(self, name, help_text, label_names):
+        self.name = name
+        self.help = help_text
+        self.label_names = label_names
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for labels, value in items:
+            base = ",".join(f'{k}="{v}"' for k, v in zip(self.label_names, labels))
+            lines.append(f"{self.name}{{{base}}} {value}")
+        return lines
+
+
+STAGE_SECONDS = Histogram(f"{PREFIX}_stage_seconds", "Time spent per pipeline stage.", ("stage",))
+STAGE_ERRORS = Counter(f"{PREFIX}_stage_errors_total", "Pipeline stages that raised.", ("stage",))
+REQUEST_SECONDS = Histogram(f"{PREFIX}_http_request_seconds", "HTTP request latency.",
+                            ("method", "route", "status"))
+METRICS = [STAGE_SECONDS, STAGE_ERRORS, REQUEST_SECONDS]
+
+
+def render_prometheus():
+    return "\n".join(line for metric in METRICS for line in metric.render()) + "\n"
+
+
+# ---------------- Trace context ----------------
+
+def start_trace(trace_id=None):
+    """Begin a trace in the current context; returns its id."""
+    trace_id = trace_id or uuid.uuid4().hex[:16]
+    _trace_id.set(trace_id)
+    _timings.set({})
+    return trace_id
+
+
+def current_trace_id():
+    return _trace_id.get()
+
+
+def current_timings():
+    """Seconds per stage recorded in this trace so far (summed if repeated)."""
+    return dict(_timings.get() or {})
+
+
+class TraceIdFilter(logging.Filter):
+    def filter(self, record):
+        record.trace_id = _trace_id.get() or "-"
+        return True
+
+
+# ---------------- Timers ----------------
+
+def record(stage_name, seconds, failed=False):
+    STAGE_SECONDS.observe(seconds, stage_name)
+    if failed:
+        STAGE_ERRORS.inc(stage_name)
+    timings = _timings.get()
+    if timings is not None:
+        timings[stage_name] = round(timings.get(stage_name, 0.0) + seconds, 4)
+
+
+@contextmanager
+def stage(stage_name):
+    """Time a block (sync or containing awaits) as `stage_name`, excluding nested stages."""
+    parent = _active_stage.get()
+    if parent is not None and parent[0] == stage_name:
+        yield  # already timed by the enclosing call
+        return
+    frame = [stage_name, 0.0]
+    token = _active_stage.set(frame)
+    start = time.perf_counter()
+    failed = False
+    try:
+        yield
+    except BaseException:
+        failed = True
+        raise
+    finally:
+        elapsed = time.perf_counter() - start
+        _active_stage.reset(token)
+        if parent is not None:
+            parent[1] += elapsed
+        # concurrent nested stages (gather) can sum past the wall time
+        record(stage_name, max(0.0, elapsed - frame[1]), failed)
+
+
+def timed(stage_name):
+    """Decorator form of stage() for plain and async functions."""
+    def decorate(fn):
+        if asyncio.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                with stage(stage_name):
+                    return await fn(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with stage(stage_name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
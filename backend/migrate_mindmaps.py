@@ -0,0 +1,59 @@
+"""
+One-time migration: rewrite stored conversations into the canonical
+mindmap schema (see mindmap_store.py) and move their heavy fields into
+compressed payload chunks (see conversation_payload.py).
+
+Run from the repo root:
+    python -m backend.migrate_mindmaps            # apply
+    python -m backend.migrate_mindmaps --dry-run  # only count
+"""
+import sys
+
+import firebase_admin
+from firebase_admin import credentials, firestore
+
+from .mindmap_store import migrate_doc
+from .conversation_payload import split_conversation_doc
+from .firestore_store import split_ops
+
+SERVICE_ACCOUNT = "backend/ai-hackathon-4e25e-firebase-adminsdk-fbsvc-5557fc6879.json"
+
+
+def migrate(db, dry_run=False):
+    scanned = migrated = 0
+
+    for doc in db.collection("conversations").stream():
+        scanned += 1
+        data = doc.to_dict() or {}
+        if "payloadParts" in data:
+            continue  # already written by the split-storage path
+        migrated += 1
+        if dry_run:
+            continue
+
+        # payload chunks first, the slimmed main document last, batched within
+        # Firestore's 500-write / 10 MiB limits like the app's writes. The main
+        # document goes in the final batch, so a failure part-way leaves the
+        # old inline document in place and the conversation is migrated again
+        # on the next run.
+        _, ops = split_conversation_doc(doc.id, {**data, **(migrate_doc(data) or {})})
+        for group in split_ops(ops):
+            batch = db.batch()
+            for _, path, op_data in group:
+                batch.set(db.document(path), op_data)
+            batch.commit()
+
+    return scanned, migrated
+
+
+def main():
+    dry_run = "--dry-run" in sys.argv
+    if not firebase_admin._apps:
+        firebase_admin.initialize_app(credentials.Certificate(SERVICE_ACCOUNT))
+    scanned, migrated = migrate(firestore.client(), dry_run=dry_run)
+    verb = "would migrate" if dry_run else "migrated"
+    print(f"✅ Scanned {scanned} conversations, {verb} {migrated}")
+
+
+if __name__ == "__main__":
+    main()
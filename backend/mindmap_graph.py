@@ -0,0 +1,115 @@
+import math
+
+# ------------------- Mindmap -> node/edge graph -------------------
+#
+# The LLM produces topics / subtopics / relationships; the frontend renders
+# nodes and edges. The graph is built once when the conversation is stored,
+# with a radial layout already applied (title in the centre, topics on an
+# inner ring, each topic's subtopics fanned out in its own sector) and
+# id -> position indexes so the client never has to search the lists.
+
+LAYOUT_VERSION = "radial-v1"
+MIN_TOPIC_RADIUS = 300
+SUBTOPIC_RING_GAP = 260
+NODE_SPACING = 90  # min arc length between neighbouring nodes
+
+
+def _describe_topic(topic):
+    parts = []
+    if topic.get("introduced_by"):
+        at = f" at {topic['introduced_at']}" if topic.get("introduced_at") else ""
+        parts.append(f"Introduced by {topic['introduced_by']}{at}.")
+    if topic.get("stance"):
+        target = f" toward {topic['targeted_at']}" if topic.get("targeted_at") else ""
+        parts.append(f"Stance: {topic['stance']}{target}.")
+    if topic.get("discussed_by"):
+        parts.append(f"Discussed by {', '.join(topic['discussed_by'])}.")
+    if topic.get("sentiment"):
+        parts.append(f"Sentiment: {topic['sentiment']}.")
+    return " ".join(parts)
+
+
+def _position(radius, angle):
+    return {"x": round(radius * math.cos(angle), 1), "y": round(radius * math.sin(angle), 1)}
+
+
+def mindmap_to_graph(mindmap):
+    """
+    Build {"nodes", "edges", "nodeIndex", "edgeIndex", "layout"} from a
+    mindmap dict following the LLM_json_generator schema.
+    """
+    topics = [t for t in mindmap.get("main_topics", []) if isinstance(t, dict)]
+    nodes, edges = [], []
+    label_to_id = {}
+
+    def add_node(node_id, label, kind, conversation, position):
+        nodes.append({
+            "id": node_id,
+            "label": label,
+            "kind": kind,
+            "conversation": conversation,
+            "position": position,
+        })
+        label_to_id.setdefault(label.strip().lower(), node_id)
+
+    def add_edge(source, target, edge_type, conversation):
+        edges.append({
+            "id": f"e{len(edges)}",
+            "source": source,
+            "target": target,
+            "type": edge_type,
+            "conversation": conversation,
+        })
+
+    title = mindmap.get("conversation_title") or "Conversation"
+    participants = [p.get("name") for p in mindmap.get("participants", [])
+                    if isinstance(p, dict) and p.get("name")]
+    add_node("root", title, "conversation",
+             f"Participants: {', '.join(participants)}." if participants else "",
+             {"x": 0.0, "y": 0.0})
+
+    # ring radii grow with the number of nodes so neighbours don't overlap
+    total_subtopics = sum(len(t.get("subtopics", [])) for t in topics)
+    topic_radius = max(MIN_TOPIC_RADIUS, len(topics) * NODE_SPACING / (2 * math.pi))
+    sub_radius = max(topic_radius + SUBTOPIC_RING_GAP,
+                     total_subtopics * NODE_SPACING / (2 * math.pi))
+
+    # each topic gets an angular sector proportional to its subtopic count
+    weights = [max(1, len(t.get("subtopics", []))) for t in topics]
+    total_weight = sum(weights) or 1
+    angle = -math.pi / 2
+    for i, (topic, weight) in enumerate(zip(topics, weights)):
+        sector = 2 * math.pi * weight / total_weight
+        centre = angle + sector / 2
+        topic_id = f"t{i}"
+        add_node(topic_id, topic.get("topic", f"Topic {i + 1}"), "topic",
+                 _describe_topic(topic), _position(topic_radius, centre))
+        add_edge("root", topic_id, "contains", f"{title} covers {topic.get('topic', '')}")
+
+        subtopics = [s for s in topic.get("subtopics", []) if isinstance(s, dict)]
+        for j, sub in enumerate(subtopics):
+            sub_angle = angle + sector * (j + 0.5) / len(subtopics)
+            sub_id = f"t{i}.s{j}"
+            add_node(sub_id, sub.get("subtopic", f"Subtopic {j + 1}"), "subtopic",
+                     _describe_topic(sub), _position(sub_radius, sub_angle))
+            add_edge(topic_id, sub_id, sub.get("stance") or "contains", _describe_topic(sub))
+        angle += sector
+
+    for rel in mindmap.get("relationships", []):
+        if not isinstance(rel, dict):
+            continue
+        source = label_to_id.get(str(rel.get("from", "")).strip().lower())
+        target = label_to_id.get(str(rel.get("to", "")).strip().lower())
+        if not source or not target or source == target:
+            continue
+        by = f" (initiated by {rel['initiated_by']})" if rel.get("initiated_by") else ""
+        add_edge(source, target, rel.get("type") or "related",
+                 f"{rel.get('from')} {rel.get('type', 'relates to')} {rel.get('to')}{by}")
+
+    return {
+        "nodes": nodes,
+        "edges": edges,
+        "nodeIndex": {n["id"]: i for i, n in enumerate(nodes)},
+        "edgeIndex": {e["id"]: i for i, e in enumerate(edges)},
+        "layout": LAYOUT_VERSION,
+    }
@@ -0,0 +1,96 @@
+import json
+
+from .mindmap_graph import mindmap_to_graph
+
+# ------------------- Canonical conversation storage -------------------
+#
+# Conversations used to store `mindmap` as a JSON string, a list of blocks
+# or a dict, and every read had to parse and dig the graph/speakers out of
+# it. Documents are now normalized once, on write (or by the migration in
+# migrate_mindmaps.py), into:
+#
+#   mindmap:        dict (the LLM schema; legacy block lists become {"blocks": [...]})
+#   graph:          dict with laid-out "nodes" / "edges" (see mindmap_graph.py)
+#   speakers:       list of names
+#   title:          conversation title or None
+#   schemaVersion:  MINDMAP_SCHEMA_VERSION
+#
+# so the read path is a pure projection.
+
+MINDMAP_SCHEMA_VERSION = 2  # v2: graph derived from the mindmap with precomputed layout
+
+
+def _parse(mindmap_val):
+    if isinstance(mindmap_val, str):
+        try:
+            return json.loads(mindmap_val)
+        except json.JSONDecodeError:
+            return None
+    return mindmap_val
+
+
+def normalize_mindmap(mindmap_val, speakers=None):
+    """
+    Canonicalize any stored/generated mindmap shape.
+
+    Returns dict with keys mindmap, graph, speakers, title.
+    """
+    parsed = _parse(mindmap_val)
+    graph = None
+    title = None
+
+    if isinstance(parsed, dict):
+        mindmap = parsed
+        graph = parsed.get("graph")
+        title = parsed.get("conversation_title")
+        if not speakers:
+            speakers = [p.get("name") for p in parsed.get("participants", [])
+                        if isinstance(p, dict) and p.get("name")]
+    elif isinstance(parsed, list):
+        # legacy: list of blocks, first block carries speakers/graph
+        mindmap = {"blocks": parsed}
+        first = parsed[0] if parsed and isinstance(parsed[0], dict) else {}
+        graph = first.get("graph")
+        title = first.get("conversation_title")
+        if not speakers:
+            speakers = first.get("speakers")
+    else:
+        mindmap = {}
+
+    if not graph and mindmap.get("main_topics"):
+        graph = mindmap_to_graph(mindmap)
+
+    return {
+        "mindmap": mindmap,
+        "graph": graph or {},
+        "speakers": list(speakers or []),
+        "title": title,
+    }
+
+
+def build_conversation_doc(user_id, mindmap_data, source_timestamp, timestamp, transcript=None):
+    """Firestore document for a newly processed conversation."""
+    normalized = normalize_mindmap(mindmap_data)
+    doc = {
+        "userId": user_id,
+        "timestamp": timestamp,
+        "sourceTimestamp": source_timestamp,
+        "schemaVersion": MINDMAP_SCHEMA_VERSION,
+        **normalized,
+    }
+    if transcript is not None:
+        doc["transcript"] = transcript
+    return doc
+
+
+def migrate_doc(data):
+    """
+    Fields to update on a stored conversation to bring it to the current
+    schema, or None if it is already current.
+    """
+    if data.get("schemaVersion") == MINDMAP_SCHEMA_VERSION:
+        return None
+    normalized = normalize_mindmap(data.get("mindmap"), data.get("speakers"))
+    if not normalized["graph"] and data.get("graph"):
+        normalized["graph"] = data["graph"]
+    return {**normalized, "schemaVersion": MINDMAP_SCHEMA_VERSION}
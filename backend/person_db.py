@@ -2,27 +2,46 @@ import json
 import uuid
 import faiss
 import numpy as np
-from sentence_transformers import SentenceTransformer
 from datetime import datetime
 import os
 
+from text_dedup import SimHashIndex, simhash, dedup_text, normalize_words
+from chunker import chunk_description
+from embedding_service import get_encoder
+from vector_store import build_index, index_memory_bytes
+from metrics import timed
+
 class PersonDatabase:
     """
     Standalone Person Database with FAISS indexing
     Can be used independently and continuously updated
     """
     
-    def __init__(self, model_name="all-MiniLM-L6-v2", db_path="person_db"):
+    def __init__(self, model_name="all-MiniLM-L6-v2", db_path="person_db", dedup_distance=3,
+                 chunk_tokens=200, chunk_overlap=40, backend=None, storage=None):
         """
         Initialize Person Database
         
         Args:
-            model_name: SentenceTransformer model for embeddings
+            model_name: SentenceTransformer model for embeddings (shared EncodingService)
             db_path: Directory to save database files
+            dedup_distance: Max SimHash bit distance for two passages to count
+                            as near-duplicates (0 = exact only, None = no dedup)
+            chunk_tokens: Max tokens per indexed passage (MiniLM truncates at 256,
+                          leave room for the "Name (source): " prefix)
+            chunk_overlap: Tokens shared between consecutive passages
+            backend: Embedding backend ("torch", "torch-int8", "onnx");
+                     defaults to $EMBED_BACKEND or "torch"
+            storage: Vector storage in the FAISS index ("fp32", "fp16", "int8");
+                     defaults to $EMBED_STORAGE or "fp16"
         """
         self.persons = {}
         self.model_name = model_name
-        self.model = SentenceTransformer(model_name)
+        self.dedup_distance = dedup_distance
+        self.chunk_tokens = chunk_tokens
+        self.chunk_overlap = chunk_overlap
+        self.storage = storage
+        self.encoder = get_encoder(model_name, backend)
         self.index = None
         self.chunks = []
         self.db_path = db_path
@@ -52,6 +71,20 @@ class PersonDatabase:
         Returns:
             dict: The updated person record
         """
+        if person_id in self.persons:
+            description = self._dedup_description(person_id, source, description)
+            if not description:
+                # Nothing new from this source; drop any stale copy it had
+                self.persons[person_id]["descriptions"] = [
+                    d for d in self.persons[person_id]["descriptions"] if d["source"] != source
+                ]
+                self.persons[person_id]["updated_at"] = datetime.now().isoformat()
+                self.save_data()
+                if rebuild_index:
+                    self.build_index()
+                print(f"♻️ Skipped {name} ({source}): all passages already stored")
+                return self.persons[person_id]
+
         if person_id not in self.persons:
             self.persons[person_id] = {
                 "id": person_id,
@@ -88,6 +121,43 @@ class PersonDatabase:
         print(f"✅ Added/Updated {name} ({source})")
         return self.persons[person_id]
     
+    def _dedup_description(self, person_id, source, description):
+        """
+        Remove snippets of `description` that near-duplicate text already stored
+        for this person under another source. The source that already holds a
+        snippet gets `source` recorded in its `also_sources` so source filters
+        still match.
+        
+        Returns:
+            str: The description with redundant snippets cut out ("" if none left)
+        """
+        if self.dedup_distance is None:
+            return description
+        
+        index = SimHashIndex(self.dedup_distance)
+        owners = {}
+        for desc in self.persons[person_id]["descriptions"]:
+            if desc["source"] == source:
+                continue
+            owners[desc["source"]] = desc
+            dedup_text(desc["text"], index, key_prefix=desc["source"])
+        if not owners:
+            return description
+        
+        # duplicate snippets are cut out of the original text, separators and all
+        kept, duplicates = dedup_text(description, index, key_prefix=source)
+        for _, (owner_source, _) in duplicates:
+            owner = owners.get(owner_source)
+            if owner is None:
+                continue  # duplicate within the new description itself
+            also = owner.setdefault("also_sources", [])
+            if source not in also:
+                also.append(source)
+        
+        if duplicates:
+            print(f"♻️ Dropped {len(duplicates)} duplicate snippets from {person_id} ({source})")
+        return kept
+    
     def add_person_batch(self, persons_list):
         """
         Add multiple persons at once (more efficient)
@@ -175,55 +245,83 @@ class PersonDatabase:
             return
         
         self.chunks = []
+        seen = SimHashIndex(self.dedup_distance) if self.dedup_distance is not None else None
+        dropped = 0
+        
+        def append_chunk(body, prefix, metadata, chunk_id=None, dedup=True):
+            """Append a chunk unless its body near-duplicates an indexed chunk"""
+            nonlocal dropped
+            if seen is not None and dedup and len(normalize_words(body)) >= 8:
+                fingerprint = simhash(body)
+                match = seen.find(fingerprint)
+                if match is not None:
+                    # Merge: point the kept chunk at this person/source as well
+                    kept = self.chunks[match]["metadata"]
+                    if metadata["person_id"] != kept["person_id"]:
+                        also = kept.setdefault("also_person_ids", [])
+                        if metadata["person_id"] not in also:
+                            also.append(metadata["person_id"])
+                    if metadata.get("source") and metadata.get("source") != kept.get("source"):
+                        also = kept.setdefault("also_sources", [])
+                        if metadata["source"] not in also:
+                            also.append(metadata["source"])
+                    dropped += 1
+                    return
+                seen.add(len(self.chunks), fingerprint)
+            self.chunks.append({
+                "id": chunk_id or str(uuid.uuid4()),
+                "text": f"{prefix}{body}",
+                "metadata": metadata
+            })
+        
+        tokenizer = self.encoder.tokenizer
         
         for person in self.persons.values():
-            # Create a combined chunk with all descriptions
-            all_descriptions = " ".join([
-                f"[{desc['source']}] {desc['text']}" 
-                for desc in person["descriptions"]
-            ])
-            
-            self.chunks.append({
-                "id": person["id"],
-                "text": f"Person: {person['name']}. {all_descriptions}",
-                "metadata": {
+            # Short profile chunk so name lookups still hit the person; the
+            # description text itself is only indexed through the windows below
+            sources = ", ".join(desc["source"] for desc in person["descriptions"])
+            append_chunk(
+                f"Sources: {sources}.",
+                f"Person: {person['name']}. ",
+                {
                     "type": "person_combined",
                     "name": person["name"],
                     "person_id": person["id"]
-                }
-            })
+                },
+                chunk_id=person["id"],
+                dedup=False
+            )
             
-            # Create individual chunks for each description
+            # Window each description into bounded passages
             for desc in person["descriptions"]:
-                self.chunks.append({
-                    "id": str(uuid.uuid4()),
-                    "text": f"{person['name']} ({desc['source']}): {desc['text']}",
-                    "metadata": {
-                        "type": "person_description",
-                        "name": person["name"],
-                        "person_id": person["id"],
-                        "source": desc["source"]
-                    }
-                })
+                passages = chunk_description(
+                    person["id"], person["name"], desc["source"], desc["text"],
+                    max_tokens=self.chunk_tokens,
+                    overlap=self.chunk_overlap,
+                    tokenizer=tokenizer
+                )
+                for passage in passages:
+                    metadata = passage["metadata"]
+                    if desc.get("also_sources"):
+                        metadata["also_sources"] = list(desc["also_sources"])
+                    append_chunk(passage["body"], f"{person['name']} ({desc['source']}): ", metadata)
+        
+        if dropped:
+            print(f"♻️ Skipped {dropped} near-duplicate chunks")
         
         # Generate embeddings
         texts = [c["text"] for c in self.chunks]
-        embeddings = self.model.encode(texts, convert_to_numpy=True)
+        embeddings = self.encoder.encode(texts)
         
-        # Add embeddings to chunks
-        for i, c in enumerate(self.chunks):
-            c["embedding"] = embeddings[i]
-        
-        # Build FAISS index
-        dim = embeddings.shape[1]
-        self.index = faiss.IndexFlatL2(dim)
-        self.index.add(embeddings)
+        # Build FAISS index (the index holds the only copy of the vectors)
+        self.index = build_index(embeddings, storage=self.storage)
         
         # Auto-save index
         self.save_index()
         
         print(f"✅ FAISS index built with {len(self.chunks)} chunks for {len(self.persons)} persons")
     
+    @timed("search")
     def search(self, query_text, top_k=5, filter_by_source=None):
         """
         Search the person database using FAISS
@@ -239,7 +337,7 @@ class PersonDatabase:
         if self.index is None:
             raise ValueError("Index not built. Call build_index() first or load existing index.")
         
-        query_embedding = self.model.encode([query_text], convert_to_numpy=True)
+        query_embedding = self.encoder.encode([query_text])
         
         # Search more than needed if filtering
         search_k = top_k * 3 if filter_by_source else top_k
@@ -249,9 +347,12 @@ class PersonDatabase:
         for dist, idx in zip(distances[0], indices[0]):
             chunk = self.chunks[idx]
             
-            # Apply source filter if specified
+            # Apply source filter if specified (deduped chunks carry the
+            # sources whose copies were merged into them)
             if filter_by_source:
-                if chunk["metadata"].get("source") != filter_by_source:
+                metadata = chunk["metadata"]
+                if (metadata.get("source") != filter_by_source
+                        and filter_by_source not in metadata.get("also_sources", [])):
                     continue
             
             results.append({
@@ -303,13 +404,9 @@ class PersonDatabase:
         # Save FAISS index
         faiss.write_index(self.index, self.index_file)
         
-        # Save chunks (without embeddings to save space)
-        chunks_without_embeddings = [
-            {k: v for k, v in chunk.items() if k != "embedding"}
-            for chunk in self.chunks
-        ]
+        # Save chunks (text + metadata; vectors live in the index)
         with open(self.chunks_file, "w", encoding="utf-8") as f:
-            json.dump(chunks_without_embeddings, f, indent=2, ensure_ascii=False)
+            json.dump(self.chunks, f, indent=2, ensure_ascii=False)
         
         print(f"💾 Index saved to {self.index_file}")
     
@@ -347,7 +444,8 @@ class PersonDatabase:
             "total_descriptions": total_descriptions,
             "unique_sources": list(sources),
             "avg_descriptions_per_person": total_descriptions / len(self.persons) if self.persons else 0,
-            "index_size": len(self.chunks) if self.chunks else 0
+            "index_size": len(self.chunks) if self.chunks else 0,
+            "index_bytes": index_memory_bytes(self.index) if self.index is not None else 0
         }
     
     def print_statistics(self):
@@ -360,7 +458,7 @@ class PersonDatabase:
         print(f"Total Descriptions: {stats['total_descriptions']}")
         print(f"Average Descriptions per Person: {stats['avg_descriptions_per_person']:.2f}")
         print(f"Unique Sources: {', '.join(stats['unique_sources'])}")
-        print(f"FAISS Index Size: {stats['index_size']} chunks")
+        print(f"FAISS Index Size: {stats['index_size']} chunks ({stats['index_bytes'] / 1024:.1f} KB of vectors)")
         print("="*60 + "\n")
     
     # ==================== Web Search Integration ====================
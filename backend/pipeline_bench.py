@@ -0,0 +1,429 @@
+"""
+End-to-end load benchmark with local stand-ins for the external services.
+
+Runs the API in-process with deterministic fakes, so no network or keys are
+needed and runs are comparable:
+
+  AssemblyAI  -> replays the utterances of a recorded transcript (--transcript)
+  Gemini      -> returns a recorded mindmap (--mindmap) / a canned chat answer,
+                 through the real response parsing
+  Firestore   -> the in-memory store (FIRESTORE_BACKEND=memory)
+  ECAPA       -> hashed pseudo-embeddings (--voice ecapa for the real model)
+
+and drives these scenarios at --concurrency:
+
+  process   POST /process-audio (decode, VAD, encode, transcribe, match, llm, save)
+  list      GET /get-conversations
+  detail    GET /conversations/{id}
+  retrieve  RAG_FRAMEWORK.query_both_indexes over the mindmap + person profiles
+  chat      retrieve + make_rag_make_sense
+
+Reports throughput, p50/p95/p99 latency, peak RSS and, for process, the
+per-stage timings. --json saves the report; --baseline compares p95 with a
+saved report and exits 1 on a regression larger than --tolerance.
+
+The app has no chat endpoint, so retrieve / chat call RAG_FRAMEWORK directly
+(it needs sentence-transformers for the query embeddings).
+
+Run from the repo root:
+    python -m backend.pipeline_bench [--scenarios process,list] [--requests 50] [--concurrency 8]
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import resource
+import sys
+import tempfile
+import time
+import types
+import zlib
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+SCENARIOS = ("process", "list", "detail", "retrieve", "chat")
+BENCH_USER = "bench-user"
+QUERIES = [
+    "Who introduced the contact book idea?",
+    "What did the team say about relationships?",
+    "Tell me about Mobasserul Haque",
+    "Which topics had a negative sentiment?",
+]
+
+
+# ---------------- Local stand-ins ----------------
+
+class RecordedTranscriber:
+    """ASR backend that replays the utterances of a recorded transcript."""
+
+    name = "recorded"
+
+    def __init__(self, utterances, latency=0.0):
+        self.utterances = utterances
+        self.latency = latency
+
+    def transcribe(self, audio_file):
+        time.sleep(self.latency)
+        return [dict(u) for u in self.utterances]
+
+
+class RecordedGemini:
+    """Stands in for the `genai` module: every model answers with `text`."""
+
+    def __init__(self, text, latency=0.0):
+        outer = self
+
+        class GenerativeModel:
+            def __init__(self, model_name, **kwargs):
+                pass
+
+            def generate_content(self, prompt, **kwargs):
+                time.sleep(outer.latency)
+                return types.SimpleNamespace(text=outer.text)
+
+        self.text = text
+        self.latency = latency
+        self.GenerativeModel = GenerativeModel
+
+    def configure(self, **kwargs):
+        pass
+
+
+class HashedVoiceEncoder:
+    """Deterministic pseudo-embeddings (seeded by the clip) in place of ECAPA."""
+
+    model_id = "bench-hashed"
+    dim = 192
+
+    def embed_batch(self, waveforms):
+        import numpy as np
+        from .voice_embedding import SAMPLE_RATE, l2_normalize
+
+        rows = [
+            np.random.default_rng(zlib.crc32(np.asarray(w[:SAMPLE_RATE], dtype=np.float32).tobytes()))
+            .standard_normal(self.dim)
+            for w in waveforms
+        ]
+        return l2_normalize(np.asarray(rows, dtype=np.float32))
+
+    def embed_profile(self, waveforms):
+        from .voice_embedding import l2_normalize
+
+        return l2_normalize(self.embed_batch(waveforms).mean(axis=0))
+
+
+def install_fakes(app_module, utterances, mindmap_text, args):
+    """Swap the external services of the in-process app for the stand-ins."""
+    from . import Audio_to_text, LLM_json_generator
+
+    Audio_to_text.register_backend("recorded", RecordedTranscriber(utterances, args.asr_latency))
+    Audio_to_text.ASR_BACKEND = "recorded"
+    LLM_json_generator.genai = RecordedGemini(mindmap_text, args.llm_latency)
+
+    if args.voice == "ecapa":
+        return
+
+    async def load_voice_encoder():
+        app_module.voice_encoder = HashedVoiceEncoder() if args.voice == "fake" else None
+
+    app_module.load_voice_encoder = load_voice_encoder
+
+
+async def enroll_voices(app_module, count):
+    """Random enrolled profiles so speaker matching searches a populated index."""
+    import numpy as np
+
+    if app_module.voice_index is None:
+        return
+    rng = np.random.default_rng(0)
+    for i in range(count):
+        app_module.voice_index.upsert(f"bench-voice-{i}", f"Enrolled {i}",
+                                      rng.standard_normal(app_module.voice_index.dim))
+
+
+async def seed_conversations(app_module, mindmap, transcript_text, count):
+    """Stored conversations for list / detail, independent of the process scenario."""
+    from .mindmap_store import build_conversation_doc
+
+    ids = []
+    for i in range(count):
+        doc = build_conversation_doc(BENCH_USER, mindmap, source_timestamp=f"seed-{i}",
+                                     timestamp=app_module.store.server_timestamp(),
+                                     transcript=transcript_text)
+        ids.append(await app_module.store.add_conversation(doc))
+    return ids
+
+
+def build_retrieval(mindmap, profiles_dir, chat_text, latency):
+    """(query, chat) callables over the mindmap and scraped person profiles."""
+    if BACKEND_DIR not in sys.path:
+        sys.path.insert(0, BACKEND_DIR)  # RAG_FRAMEWORK imports its siblings absolutely
+    import RAG_FRAMEWORK
+
+    RAG_FRAMEWORK.genai = RecordedGemini(chat_text, latency)
+    person_db = RAG_FRAMEWORK.PersonDatabase()
+    for filename in sorted(os.listdir(profiles_dir)):
+        if filename.endswith(".json"):
+            with open(os.path.join(profiles_dir, filename), "r", encoding="utf-8") as f:
+                person_db.load_from_scraper_json(json.load(f))
+    person_db.build_person_chunks()
+    person_db.create_faiss_index()
+    chunks = RAG_FRAMEWORK.prepare_mindmap_chunks(mindmap, person_db)
+    index = RAG_FRAMEWORK.build_mindmap_index(chunks)
+
+    def query(i):
+        return RAG_FRAMEWORK.query_both_indexes(index, chunks, person_db, QUERIES[i % len(QUERIES)])
+
+    def chat(i):
+        return RAG_FRAMEWORK.make_rag_make_sense(QUERIES[i % len(QUERIES)], query(i), history={})
+
+    return query, chat
+
+
+# ---------------- Load generation ----------------
+
+def percentile(sorted_values, q):
+    """Nearest-rank percentile of an ascending list."""
+    if not sorted_values:
+        return None
+    return sorted_values[max(0, math.ceil(q / 100 * len(sorted_values)) - 1)]
+
+
+def peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+async def run_load(call, requests, concurrency):
+    """Issue `requests` calls of `call(i)` from `concurrency` workers; latency report."""
+    latencies, errors, results = [], [], []
+    pending = iter(range(requests))
+
+    async def worker():
+        for i in pending:
+            start = time.perf_counter()
+            try:
+                results.append(await call(i))
+            except Exception as e:
+                errors.append(f"{type(e).__name__}: {e}")
+                continue
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    report = {
+        "requests": requests,
+        "concurrency": concurrency,
+        "errors": len(errors),
+        "seconds": round(elapsed, 3),
+        "throughput": round(len(latencies) / elapsed, 2) if elapsed else None,
+        "peakRssMb": peak_rss_mb(),
+    }
+    for q in (50, 95, 99):
+        value = percentile(latencies, q)
+        report[f"p{q}"] = round(value, 4) if value is not None else None
+    if errors:
+        report["firstError"] = errors[0]
+    return report, results
+
+
+def stage_breakdown(responses):
+    """p50 / p95 seconds per pipeline stage from the process responses' timings."""
+    per_stage = {}
+    for body in responses:
+        for name, seconds in (body.get("timings") or {}).items():
+            per_stage.setdefault(name, []).append(seconds)
+    return {
+        name: {"p50": percentile(sorted(values), 50), "p95": percentile(sorted(values), 95)}
+        for name, values in sorted(per_stage.items())
+    }
+
+
+def in_thread(fn):
+    async def call(i):
+        return await asyncio.to_thread(fn, i)
+    return call
+
+
+async def run_scenarios(args, fixtures):
+    import httpx
+    from . import app as app_module
+
+    install_fakes(app_module, fixtures["utterances"], fixtures["mindmapText"], args)
+    app = app_module.app
+    # runs the app's lifespan: stale-upload purge, store, background warm-up
+    async with app.router.lifespan_context(app):
+        await app.state.warm_up
+        for name, state in app_module.readiness.items():
+            if state["error"]:
+                print(f"⚠️ {name} unavailable: {state['error']}")
+        await enroll_voices(app_module, args.enrolled)
+        conversation_ids = await seed_conversations(
+            app_module, fixtures["mindmap"], fixtures["transcriptText"], args.seed
+        )
+
+        reports = {}
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+
+            async def process(i):
+                response = await client.post(
+                    "/process-audio",
+                    data={"userId": BENCH_USER, "timestamp": f"bench-{os.getpid()}-{i}"},
+                    files={"filePath": ("recording.webm", fixtures["audio"], "audio/webm")},
+                )
+                response.raise_for_status()
+                return response.json()
+
+            async def list_page(i):
+                response = await client.get("/get-conversations", params={"user_id": BENCH_USER})
+                response.raise_for_status()
+
+            async def detail(i):
+                conv_id = conversation_ids[i % len(conversation_ids)]
+                response = await client.get(f"/conversations/{conv_id}", params={"user_id": BENCH_USER})
+                response.raise_for_status()
+
+            calls = {"process": process, "list": list_page, "detail": detail}
+            if {"retrieve", "chat"} & set(args.scenarios):
+                try:
+                    query, chat = await asyncio.to_thread(
+                        build_retrieval, fixtures["mindmap"], args.profiles, args.chat_answer, args.llm_latency
+                    )
+                    calls["retrieve"], calls["chat"] = in_thread(query), in_thread(chat)
+                except Exception as e:
+                    print(f"⚠️ retrieval unavailable, skipping retrieve/chat: {e}")
+
+            for name in args.scenarios:
+                if name not in calls:
+                    continue
+                requests = args.process_requests if name == "process" else args.requests
+                report, results = await run_load(calls[name], requests, args.concurrency)
+                if name == "process":
+                    report["stages"] = stage_breakdown(results)
+                reports[name] = report
+                print_report(name, report)
+
+    return reports
+
+
+# ---------------- Reporting ----------------
+
+def print_report(name, report):
+    def ms(value):
+        return f"{value * 1000:8.1f}" if value is not None else "       -"
+
+    print(f"\n🏁 {name}: {report['requests']} requests x{report['concurrency']} in {report['seconds']}s, "
+          f"{report['errors']} errors")
+    print(f"  throughput {report['throughput']} req/s   p50 {ms(report['p50'])} ms   "
+          f"p95 {ms(report['p95'])} ms   p99 {ms(report['p99'])} ms   peak RSS {report['peakRssMb']} MB")
+    if report.get("firstError"):
+        print(f"  first error: {report['firstError']}")
+    for stage_name, values in report.get("stages", {}).items():
+        print(f"    {stage_name:<14} p50 {ms(values['p50'])} ms   p95 {ms(values['p95'])} ms")
+
+
+def compare_with_baseline(reports, baseline_path, tolerance):
+    """Scenarios whose p95 grew more than `tolerance` over the baseline (or that now fail)."""
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = json.load(f)["scenarios"]
+    regressions = []
+    for name, report in reports.items():
+        before = baseline.get(name)
+        if not before or before.get("p95") is None:
+            continue
+        if report["errors"] > before.get("errors", 0):
+            regressions.append(f"{name}: {report['errors']} errors (baseline {before.get('errors', 0)})")
+        if report["p95"] is not None and report["p95"] > before["p95"] * (1 + tolerance):
+            regressions.append(f"{name}: p95 {report['p95'] * 1000:.1f} ms vs "
+                               f"{before['p95'] * 1000:.1f} ms baseline")
+    return regressions
+
+
+def load_fixtures(args):
+    from .Named_Transcript import parse_transcript
+
+    with open(args.transcript, "r", encoding="utf-8") as f:
+        transcript_text = f.read()
+    with open(args.mindmap, "r", encoding="utf-8") as f:
+        mindmap_text = f.read()
+    with open(args.audio, "rb") as f:
+        audio = f.read()
+    utterances = parse_transcript(transcript_text)
+    if not utterances:
+        raise SystemExit(f"No utterances in {args.transcript}")
+    return {
+        "transcriptText": transcript_text,
+        "utterances": utterances,
+        "mindmapText": mindmap_text,
+        "mindmap": json.loads(mindmap_text),
+        "audio": audio,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS),
+                        help=f"comma-separated subset of {','.join(SCENARIOS)}")
+    parser.add_argument("--requests", type=int, default=200, help="requests per read scenario")
+    parser.add_argument("--process-requests", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--audio", default=os.path.join(BACKEND_DIR, "output.wav"))
+    parser.add_argument("--transcript", default=os.path.join(BACKEND_DIR, "REALTIME_transcript.txt"))
+    parser.add_argument("--mindmap", default=os.path.join(BACKEND_DIR, "mindmap.json"))
+    parser.add_argument("--profiles", default=os.path.join(BACKEND_DIR, "out_speakers", "profiles"))
+    parser.add_argument("--chat-answer", default="They discussed rebuilding the contact book around relationships.")
+    parser.add_argument("--asr-latency", type=float, default=0.0, help="simulated seconds per transcription")
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="simulated seconds per Gemini call")
+    parser.add_argument("--voice", choices=("fake", "ecapa", "off"), default="fake")
+    parser.add_argument("--enrolled", type=int, default=50, help="voice profiles in the index")
+    parser.add_argument("--seed", type=int, default=50, help="conversations stored for list / detail")
+    parser.add_argument("--json", help="write the report here")
+    parser.add_argument("--baseline", help="report from an earlier run to compare p95 against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed p95 growth over --baseline")
+    args = parser.parse_args()
+    args.scenarios = [s.strip() for s in args.scenarios.split(",") if s.strip()]
+    unknown = set(args.scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+    for name in ("audio", "transcript", "mindmap", "profiles", "json", "baseline"):
+        if getattr(args, name):
+            setattr(args, name, os.path.abspath(getattr(args, name)))
+
+    # everything the app writes (recordings, transcripts, voice index) goes to a
+    # scratch directory; set before the app modules read their configuration
+    workdir = tempfile.mkdtemp(prefix="pipeline_bench_")
+    os.makedirs(os.path.join(workdir, "data"))
+    os.environ["FIRESTORE_BACKEND"] = "memory"
+    os.environ["VOICE_INDEX_PATH"] = os.path.join(workdir, "data", "voice_index.faiss")
+    os.environ["UPLOAD_DIR"] = os.path.join(workdir, "data", "uploads")
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+    fixtures = load_fixtures(args)
+    os.chdir(workdir)
+    print(f"📁 Working in {workdir}")
+    reports = asyncio.run(run_scenarios(args, fixtures))
+
+    result = {
+        "config": {k: v for k, v in vars(args).items() if k not in ("json", "baseline")},
+        "scenarios": reports,
+    }
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+        print(f"\n💾 Report written to {args.json}")
+    if args.baseline:
+        regressions = compare_with_baseline(reports, args.baseline, args.tolerance)
+        for line in regressions:
+            print(f"🔥 Regression: {line}")
+        if regressions:
+            sys.exit(1)
+        print(f"\n✅ Within {args.tolerance:.0%} of the baseline p95")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+from typing import Dict, List
+
+import numpy as np
+
+from .voice_embedding import SAMPLE_RATE
+
+# ------------------- Automatic speaker naming -------------------
+#
+# Diarization labels speakers "A", "B", ...; enrolled users have ECAPA
+# voice embeddings on their profile. Each diarized speaker's segments are
+# cut out of the recording, embedded in one batch and looked up (cosine)
+# in the enrolled voice index (voice_index.VoiceIndex). Labels are assigned
+# greedily, best match first, one enrolled user per label, and only above
+# a threshold; everyone else keeps their "Speaker X" label.
+
+DEFAULT_THRESHOLD = 0.35        # ECAPA cosine; same-speaker pairs usually score > 0.4
+MAX_SECONDS_PER_SPEAKER = 30.0  # enough for a stable embedding
+MIN_SECONDS_PER_SPEAKER = 1.0   # shorter than this is too noisy to match
+
+
+def collect_speaker_audio(waveform: np.ndarray, utterances: List[dict],
+                          max_seconds: float = MAX_SECONDS_PER_SPEAKER) -> Dict[str, np.ndarray]:
+    """Concatenate each speaker's utterance audio (capped at `max_seconds`)."""
+    budget = int(max_seconds * SAMPLE_RATE)
+    pieces: Dict[str, List[np.ndarray]] = {}
+    taken: Dict[str, int] = {}
+    for u in utterances:
+        speaker = u["speaker"]
+        remaining = budget - taken.get(speaker, 0)
+        if remaining <= 0:
+            continue
+        start = int(u["start"] * SAMPLE_RATE)
+        end = min(int(u["end"] * SAMPLE_RATE), len(waveform), start + remaining)
+        if end <= start:
+            continue
+        pieces.setdefault(speaker, []).append(waveform[start:end])
+        taken[speaker] = taken.get(speaker, 0) + (end - start)
+    return {speaker: np.concatenate(chunks) for speaker, chunks in pieces.items()}
+
+
+def match_speakers(encoder, waveform: np.ndarray, utterances: List[dict], enrolled,
+                   threshold: float = DEFAULT_THRESHOLD) -> Dict[str, dict]:
+    """
+    Map diarized labels to enrolled users in `enrolled` (a VoiceIndex).
+
+    Returns {"Speaker A": {"name", "user_id", "score"}} for matched labels only.
+    """
+    if not len(enrolled):
+        return {}
+    audio = {
+        speaker: samples
+        for speaker, samples in collect_speaker_audio(waveform, utterances).items()
+        if len(samples) >= MIN_SECONDS_PER_SPEAKER * SAMPLE_RATE
+    }
+    if not audio:
+        return {}
+
+    labels = list(audio)
+    embeddings = encoder.embed_batch([audio[label] for label in labels])
+    scores, users = enrolled.search(embeddings, k=min(len(labels), len(enrolled)))
+
+    candidates = [
+        (float(score), label, user)
+        for label, row_scores, row_users in zip(labels, scores, users)
+        for score, user in zip(row_scores, row_users)
+        if user is not None and score >= threshold
+    ]
+    candidates.sort(reverse=True)
+
+    mapping, used = {}, set()
+    for score, label, (user_id, name) in candidates:
+        if label in mapping or user_id in used:
+            continue
+        mapping[label] = {
+            "name": name,
+            "user_id": user_id,
+            "score": round(score, 3),
+        }
+        used.add(user_id)
+    return {f"Speaker {label}": match for label, match in mapping.items()}
@@ -0,0 +1,6 @@
+import os
+import sys
+
+# the script-style modules (person_db, embedding_service, ...) import their
+# siblings absolutely, as when run from backend/
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,26 @@
+import pytest
+
+pytest.importorskip("sentence_transformers")
+pytest.importorskip("faiss")
+pytest.importorskip("google.generativeai")  # via vdb
+
+import embedding_parity
+from embedding_parity import MIN_MEAN_COSINE, MIN_RECALL, MIN_TOP1
+
+# optional packages each candidate backend needs on top of sentence-transformers
+BACKEND_EXTRAS = {
+    "torch-int8": [],
+    "onnx": ["onnxruntime", "optimum"],
+}
+
+
+@pytest.mark.parametrize("backend", sorted(BACKEND_EXTRAS))
+def test_backend_matches_fp32_retrieval(backend):
+    for module in BACKEND_EXTRAS[backend]:
+        pytest.importorskip(module)
+
+    result = embedding_parity.measure_parity(backend)
+
+    assert result["mean_cosine"] >= MIN_MEAN_COSINE
+    assert result["top1"] >= MIN_TOP1
+    assert result["recall"] >= MIN_RECALL
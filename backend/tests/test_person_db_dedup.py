@@ -0,0 +1,54 @@
+import pytest
+
+pytest.importorskip("faiss")
+
+import person_db
+from text_dedup import SimHashIndex, dedup_text
+
+SCRAPED = (
+    "Mobasserul Haque is a software engineer working on applied machine learning.\n"
+    "Studies data science at Duke University | Based in Durham, North Carolina\n"
+    "Built an agentic contact book at a hackathon."
+)
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    # dedup never touches the encoder; don't load a model for it
+    monkeypatch.setattr(person_db, "get_encoder", lambda *args, **kwargs: None)
+    return person_db.PersonDatabase(db_path=str(tmp_path / "person_db"))
+
+
+def test_description_without_duplicates_is_stored_unchanged(db):
+    db.add_person("mh", "Mobasserul Haque", "Plays chess on weekends. Enjoys long runs.", "twitter",
+                  rebuild_index=False)
+    db.add_person("mh", "Mobasserul Haque", SCRAPED, "linkedin", rebuild_index=False)
+
+    texts = {d["source"]: d["text"] for d in db.persons["mh"]["descriptions"]}
+    assert texts["linkedin"] == SCRAPED
+
+
+def test_duplicate_snippet_is_cut_and_separators_kept(db):
+    db.add_person("mh", "Mobasserul Haque", "Studies data science at Duke University", "website",
+                  rebuild_index=False)
+    db.add_person("mh", "Mobasserul Haque", SCRAPED, "linkedin", rebuild_index=False)
+
+    texts = {d["source"]: d for d in db.persons["mh"]["descriptions"]}
+    assert texts["linkedin"]["text"] == (
+        "Mobasserul Haque is a software engineer working on applied machine learning.\n"
+        "Based in Durham, North Carolina\n"
+        "Built an agentic contact book at a hackathon."
+    )
+    assert texts["website"]["also_sources"] == ["linkedin"]
+
+
+def test_dedup_text_matches_snippet_across_shifted_boundaries():
+    index = SimHashIndex(3)
+    dedup_text("Intro. Mobasserul Haque is a software engineer at Acme working on AI.", index, "a")
+    text, duplicates = dedup_text(
+        "A much longer lead in that shifts every boundary around. "
+        "Mobasserul Haque is a software engineer at Acme working on AI.",
+        index, "b",
+    )
+    assert text == "A much longer lead in that shifts every boundary around."
+    assert [key for _, key in duplicates] == [("a", 1)]
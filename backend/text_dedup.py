@@ -0,0 +1,203 @@
+import re
+import hashlib
+
+# ------------------- Near-duplicate detection (SimHash) -------------------
+#
+# Scraped person descriptions repeat the same sentences across sources
+# (the combined web_search text vs the per-domain groups) and across
+# near-identical person records. Dedup works per snippet (sentence or
+# " | "-separated search snippet) rather than per passage, so a repeated
+# snippet still matches when the passage boundaries around it shift. Each
+# snippet gets a 64-bit SimHash over word shingles; two snippets whose
+# hashes differ in at most `max_distance` bits are the same text. Snippets
+# too short for a stable SimHash are compared by their normalized words.
+
+HASH_BITS = 64
+MIN_EXACT_WORDS = 3  # shorter snippets ("Home", "Read more") are never deduped
+WORD_RE = re.compile(r"\w+", flags=re.UNICODE)
+SENTENCE_SPLIT_RE = re.compile(r"(?<=[.!?])\s+|\s+\|\s+|\n+")
+
+
+def normalize_words(text):
+    """Lowercased word tokens, punctuation dropped."""
+    return WORD_RE.findall(text.lower())
+
+
+def _hash64(token):
+    return int.from_bytes(hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+def simhash(text, shingle_size=3):
+    """64-bit SimHash of `text` over word `shingle_size`-grams."""
+    words = normalize_words(text)
+    if not words:
+        return 0
+    if len(words) < shingle_size:
+        shingles = [" ".join(words)]
+    else:
+        shingles = [" ".join(words[i:i + shingle_size]) for i in range(len(words) - shingle_size + 1)]
+
+    weights = [0] * HASH_BITS
+    for sh in shingles:
+        h = _hash64(sh)
+        for bit in range(HASH_BITS):
+            if h >> bit & 1:
+                weights[bit] += 1
+            else:
+                weights[bit] -= 1
+
+    fingerprint = 0
+    for bit, w in enumerate(weights):
+        if w > 0:
+            fingerprint |= 1 << bit
+    return fingerprint
+
+
+def hamming_distance(a, b):
+    return bin(a ^ b).count("1")
+
+
+def split_snippets(text):
+    """Sentences / search snippets of `text`, the unit of dedup."""
+    return [s.strip() for s in SENTENCE_SPLIT_RE.split(text or "") if s and s.strip()]
+
+
+def split_passages(text, min_words=20):
+    """
+    Split scraped text into sentence-aligned passages of at least `min_words`
+    words (the last passage may be shorter).
+    """
+    sentences = split_snippets(text)
+    passages, current, count = [], [], 0
+    for sentence in sentences:
+        current.append(sentence)
+        count += len(normalize_words(sentence))
+        if count >= min_words:
+            passages.append(" ".join(current))
+            current, count = [], 0
+    if current:
+        passages.append(" ".join(current))
+    return passages
+
+
+class SimHashIndex:
+    """
+    Lookup table of SimHash fingerprints.
+
+    The 64 bits are split into `max_distance + 1` bands; by the pigeonhole
+    principle any fingerprint within `max_distance` bits of a stored one
+    shares at least one band exactly, so only those candidates are compared.
+    """
+
+    def __init__(self, max_distance=3):
+        self.max_distance = max_distance
+        self.num_bands = max_distance + 1
+        self.band_bits = HASH_BITS // self.num_bands
+        self.bands = [{} for _ in range(self.num_bands)]
+        self.fingerprints = {}  # key -> fingerprint
+        self.exact = {}  # normalized short text -> key
+
+    def _band_values(self, fingerprint):
+        mask = (1 << self.band_bits) - 1
+        return [(fingerprint >> (i * self.band_bits)) & mask for i in range(self.num_bands)]
+
+    def find(self, fingerprint):
+        """Return the key of a stored near-duplicate, or None."""
+        seen = set()
+        for band, value in zip(self.bands, self._band_values(fingerprint)):
+            for key in band.get(value, ()):
+                if key in seen:
+                    continue
+                seen.add(key)
+                if hamming_distance(fingerprint, self.fingerprints[key]) <= self.max_distance:
+                    return key
+        return None
+
+    def add(self, key, fingerprint):
+        self.fingerprints[key] = fingerprint
+        for band, value in zip(self.bands, self._band_values(fingerprint)):
+            band.setdefault(value, []).append(key)
+
+    def find_text(self, words, min_words=8):
+        """Key of a stored near-duplicate of the tokenized snippet `words`, or None."""
+        if len(words) < min_words:
+            return self.exact.get(" ".join(words))
+        return self.find(simhash(" ".join(words)))
+
+    def add_text(self, key, words, min_words=8):
+        if len(words) < min_words:
+            self.exact.setdefault(" ".join(words), key)
+        else:
+            self.add(key, simhash(" ".join(words)))
+
+    def __len__(self):
+        return len(self.fingerprints) + len(self.exact)
+
+
+def dedup_passages(passages, index, key_prefix="new", min_words=8):
+    """
+    Drop the snippets of `passages` that near-duplicate a snippet already in
+    `index` (or an earlier snippet of the same list). Snippets of at least
+    `min_words` words are compared by SimHash, shorter ones (down to
+    MIN_EXACT_WORDS) by their exact normalized words.
+
+    Returns (kept_passages, duplicates) where kept passages are rebuilt from
+    their remaining snippets (empty ones dropped) and duplicates is a list of
+    (snippet, matched_key). Kept snippets are added to `index` under
+    (key_prefix, (passage, snippet)).
+    """
+    kept, duplicates = [], []
+    for i, passage in enumerate(passages):
+        remaining = []
+        for j, snippet in enumerate(split_snippets(passage)):
+            words = normalize_words(snippet)
+            if len(words) < MIN_EXACT_WORDS:
+                remaining.append(snippet)
+                continue
+            match = index.find_text(words, min_words)
+            if match is not None:
+                duplicates.append((snippet, match))
+                continue
+            index.add_text((key_prefix, (i, j)), words, min_words)
+            remaining.append(snippet)
+        if remaining:
+            kept.append(" ".join(remaining))
+    return kept, duplicates
+
+
+def dedup_text(text, index, key_prefix="new", min_words=8):
+    """
+    dedup_passages() for one stored text: snippets that near-duplicate
+    something in `index` are cut out of `text`, and everything else is left
+    byte-for-byte as it was, including the " | " and newline separators.
+    Kept snippets are added to `index` under (key_prefix, position).
+
+    Returns (text, duplicates); `text` is unchanged when nothing matched.
+    """
+    pieces = re.split(f"({SENTENCE_SPLIT_RE.pattern})", text or "")
+    snippets, separators = pieces[0::2], pieces[1::2]
+    dropped, duplicates = set(), []
+    for j, snippet in enumerate(snippets):
+        words = normalize_words(snippet)
+        if len(words) < MIN_EXACT_WORDS:
+            continue
+        match = index.find_text(words, min_words)
+        if match is not None:
+            duplicates.append((snippet.strip(), match))
+            dropped.add(j)
+            continue
+        index.add_text((key_prefix, j), words, min_words)
+    if not dropped:
+        return text, duplicates
+
+    # each surviving snippet keeps the separator that followed it; a dropped
+    # run takes its own separators with it
+    parts, previous = [], None
+    for j, snippet in enumerate(snippets):
+        if j in dropped:
+            continue
+        if previous is not None:
+            parts.append(separators[previous])
+        parts.append(snippet)
+        previous = j
+    return "".join(parts), duplicates
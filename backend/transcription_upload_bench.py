@@ -0,0 +1,93 @@
+"""
+Upload size / latency benchmark for the transcription stage.
+
+Compares the old upload (full-rate WAV exported from the WebM) with the
+VAD-trimmed 16 kHz encodings in audio_encoding.py: bytes on the wire and
+encode time for each, and with --transcribe also end-to-end AssemblyAI
+latency (needs API_Key) for the old WAV vs the selected format.
+
+Run from the repo root:
+    python -m backend.transcription_upload_bench [audio ...] [--transcribe] [--format opus]
+"""
+import argparse
+import glob
+import io
+import os
+import tempfile
+import time
+
+from pydub import AudioSegment
+
+from .audio_encoding import TRANSCRIBE_FORMAT, TRANSCRIBE_FORMATS, encode_samples, prepare_transcription_audio
+from .vad import trim_silence
+from .voice_embedding import load_audio_file
+
+DEFAULT_AUDIO = ["backend/output.wav"] + sorted(glob.glob("data/recording_*.webm"))[-3:]
+
+
+def legacy_wav_bytes(path):
+    """What process_audio used to upload: the recording exported as WAV at its own rate."""
+    buf = io.BytesIO()
+    AudioSegment.from_file(path).export(buf, format="wav")
+    return buf.getvalue()
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+def bench_file(path):
+    legacy, legacy_s = timed(legacy_wav_bytes, path)
+    samples = load_audio_file(path)
+    speech, time_map, stats = trim_silence(samples)
+
+    print(f"\n🎧 {path}: {stats['originalSeconds']}s, speech {stats['speechSeconds']}s "
+          f"(trimmed {stats['trimmedRatio']:.0%}), source {os.path.getsize(path) / 1024:.0f} KB")
+    print(f"  {'legacy wav':<16}{len(legacy) / 1024:>10.0f} KB  {legacy_s * 1000:>7.0f} ms")
+    for fmt in TRANSCRIBE_FORMATS:
+        data, secs = timed(encode_samples, speech, fmt)
+        print(f"  {fmt + ' (vad)':<16}{len(data) / 1024:>10.0f} KB  {secs * 1000:>7.0f} ms  "
+              f"{len(legacy) / max(len(data), 1):>6.1f}x smaller")
+    return speech, time_map
+
+
+def bench_transcription(path, speech, trimmed, fmt):
+    from . import Audio_to_text
+
+    with tempfile.TemporaryDirectory() as tmp:
+        legacy_path = os.path.join(tmp, "legacy.wav")
+        with open(legacy_path, "wb") as f:
+            f.write(legacy_wav_bytes(path))
+        _, legacy_s = timed(Audio_to_text.get_text, legacy_path, os.path.join(tmp, "legacy.txt"))
+
+        def encoded_run():
+            out = prepare_transcription_audio(os.path.join(tmp, "rec.webm"), speech, trimmed, fmt)
+            Audio_to_text.get_text(out, os.path.join(tmp, "new.txt"))
+
+        if fmt == "original" and not trimmed:
+            _, new_s = timed(Audio_to_text.get_text, path, os.path.join(tmp, "new.txt"))
+        else:
+            _, new_s = timed(encoded_run)
+    print(f"  ⏱ transcription end-to-end: legacy wav {legacy_s:.1f}s, {fmt} {new_s:.1f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("audio", nargs="*", default=DEFAULT_AUDIO)
+    parser.add_argument("--transcribe", action="store_true", help="also time AssemblyAI transcription")
+    parser.add_argument("--format", default=TRANSCRIBE_FORMAT)
+    args = parser.parse_args()
+
+    for path in args.audio:
+        if not os.path.exists(path):
+            print(f"⚠️ Skipping missing {path}")
+            continue
+        speech, time_map = bench_file(path)
+        if args.transcribe:
+            bench_transcription(path, speech, bool(time_map.segments), args.format)
+
+
+if __name__ == "__main__":
+    main()
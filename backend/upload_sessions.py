@@ -0,0 +1,223 @@
+import hashlib
+import json
+import os
+import threading
+import time
+import uuid
+
+# ------------------- Chunked, resumable uploads -------------------
+#
+# Long recordings are uploaded as a sequence of parts instead of one blob:
+#
+#   create()                -> upload id
+#   append(id, offset, ..)  -> bytes received so far
+#   status(id)              -> where to resume after a dropped connection
+#   finalize(id, size)      -> path of the assembled recording (state "processing")
+#   complete(id[, error])   -> "finalized", or "failed" so finalize can be retried
+#   abort(id)               -> drop the session
+#
+# Each part is written straight to the upload's data file at its offset and
+# verified against the client's SHA-256 before the manifest advances, so
+# the server holds at most one part in memory and a failed or repeated part
+# is simply retried from the last acknowledged offset. Manifests are small
+# JSON files next to the data, so uploads survive a server restart.
+
+UPLOAD_DIR = os.getenv("UPLOAD_DIR", "data/uploads")
+MAX_PART_BYTES = int(os.getenv("UPLOAD_MAX_PART_BYTES", 8 * 1024 * 1024))
+UPLOAD_TTL_SECONDS = int(os.getenv("UPLOAD_TTL_SECONDS", 24 * 3600))
+HASH_READ_BYTES = 1024 * 1024
+
+
+class UploadError(ValueError):
+    pass
+
+
+class UnknownUpload(UploadError):
+    pass
+
+
+class OffsetMismatch(UploadError):
+    def __init__(self, expected):
+        super().__init__(f"Expected offset {expected}")
+        self.expected = expected
+
+
+class ChecksumMismatch(UploadError):
+    pass
+
+
+def _write_json(path, data):
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+    os.replace(tmp, path)
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(HASH_READ_BYTES), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class UploadStore:
+    """Upload sessions on local disk; safe to call from worker threads."""
+
+    def __init__(self, root=UPLOAD_DIR, max_part_bytes=MAX_PART_BYTES):
+        self.root = root
+        self.max_part_bytes = max_part_bytes
+        self._locks = {}
+        self._locks_guard = threading.Lock()
+
+    def _lock(self, upload_id):
+        with self._locks_guard:
+            return self._locks.setdefault(upload_id, threading.Lock())
+
+    def _forget_lock(self, upload_id):
+        with self._locks_guard:
+            self._locks.pop(upload_id, None)
+
+    def _manifest_path(self, upload_id):
+        return os.path.join(self.root, f"{upload_id}.json")
+
+    def _data_path(self, upload_id):
+        return os.path.join(self.root, f"{upload_id}.part")
+
+    def _load(self, upload_id):
+        if not upload_id.isalnum():
+            raise UnknownUpload(upload_id)
+        try:
+            with open(self._manifest_path(upload_id), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            raise UnknownUpload(upload_id) from None
+
+    # ---------------- Protocol ----------------
+
+    def create(self, user_id, timestamp, content_type="audio/webm"):
+        upload_id = uuid.uuid4().hex
+        manifest = {
+            "uploadId": upload_id,
+            "userId": user_id,
+            "timestamp": timestamp,
+            "contentType": content_type,
+            "received": 0,
+            "parts": [],
+            "state": "open",
+            "createdAt": time.time(),
+        }
+        # created on first use, not when the app imports this module
+        os.makedirs(self.root, exist_ok=True)
+        open(self._data_path(upload_id), "wb").close()
+        _write_json(self._manifest_path(upload_id), manifest)
+        return manifest
+
+    def status(self, upload_id):
+        return self._load(upload_id)
+
+    def append(self, upload_id, offset, data, sha256):
+        """
+        Write one part at `offset`, which must equal the bytes received so
+        far, and `sha256` (hex) must match `data`. Returns the updated manifest.
+        """
+        if len(data) > self.max_part_bytes:
+            raise UploadError(f"Part larger than {self.max_part_bytes} bytes")
+        if not sha256:
+            raise UploadError("Parts need a SHA-256 checksum")
+        if hashlib.sha256(data).hexdigest() != sha256.lower():
+            raise ChecksumMismatch(f"Part at offset {offset} does not match its checksum")
+
+        with self._lock(upload_id):
+            manifest = self._load(upload_id)
+            if manifest["state"] != "open":
+                raise UploadError(f"Upload {upload_id} is {manifest['state']}")
+            if offset != manifest["received"]:
+                raise OffsetMismatch(manifest["received"])
+
+            with open(self._data_path(upload_id), "r+b") as f:
+                # drop anything past the acknowledged offset (a part that was
+                # written but never recorded in the manifest)
+                f.seek(offset)
+                f.write(data)
+                f.truncate()
+                f.flush()
+                os.fsync(f.fileno())
+
+            manifest["parts"].append({"offset": offset, "size": len(data), "sha256": sha256})
+            manifest["received"] = offset + len(data)
+            _write_json(self._manifest_path(upload_id), manifest)
+            return manifest
+
+    def finalize(self, upload_id, size, dest_path):
+        """
+        Check the total size, move the assembled file to `dest_path` and
+        return the manifest (with the file's SHA-256), now "processing".
+        Call complete() once the recording is processed. A "failed" upload
+        is already assembled and is simply handed out again for a retry.
+        """
+        with self._lock(upload_id):
+            manifest = self._load(upload_id)
+            if manifest["state"] == "failed":
+                if size != manifest["received"]:
+                    raise OffsetMismatch(manifest["received"])
+                manifest["state"] = "processing"
+                _write_json(self._manifest_path(upload_id), manifest)
+                return manifest
+            if manifest["state"] != "open":
+                raise UploadError(f"Upload {upload_id} is {manifest['state']}")
+            if size != manifest["received"]:
+                raise OffsetMismatch(manifest["received"])
+
+            data_path = self._data_path(upload_id)
+            with open(data_path, "r+b") as f:
+                f.truncate(size)
+            manifest["sha256"] = file_sha256(data_path)
+            os.makedirs(os.path.dirname(dest_path) or ".", exist_ok=True)
+            os.replace(data_path, dest_path)
+
+            manifest["state"] = "processing"
+            manifest["path"] = dest_path
+            _write_json(self._manifest_path(upload_id), manifest)
+            return manifest
+
+    def complete(self, upload_id, error=None):
+        """Record the outcome of processing a finalized upload."""
+        with self._lock(upload_id):
+            manifest = self._load(upload_id)
+            manifest["state"] = "failed" if error else "finalized"
+            manifest["error"] = error
+            _write_json(self._manifest_path(upload_id), manifest)
+        if not error:
+            self._forget_lock(upload_id)
+        return manifest
+
+    def abort(self, upload_id):
+        """Delete a session's manifest and unassembled data."""
+        with self._lock(upload_id):
+            for path in (self._data_path(upload_id), self._manifest_path(upload_id)):
+                if os.path.exists(path):
+                    os.remove(path)
+        self._forget_lock(upload_id)
+
+    # ---------------- Housekeeping ----------------
+
+    def purge_stale(self, max_age=UPLOAD_TTL_SECONDS):
+        """Delete sessions (and their data) older than `max_age` seconds."""
+        if not os.path.isdir(self.root):
+            return 0
+        cutoff = time.time() - max_age
+        removed = 0
+        for name in os.listdir(self.root):
+            if not name.endswith(".json"):
+                continue
+            upload_id = name[:-len(".json")]
+            try:
+                manifest = self._load(upload_id)
+            except (UnknownUpload, ValueError):
+                continue
+            if manifest.get("createdAt", 0) >= cutoff:
+                continue
+            self.abort(upload_id)
+            removed += 1
+        return removed
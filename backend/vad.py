@@ -0,0 +1,109 @@
+import bisect
+import os
+
+import numpy as np
+
+from .voice_embedding import SAMPLE_RATE
+
+# ------------------- Voice activity detection -------------------
+#
+# Ambient recordings are mostly silence. Before transcription, speech
+# regions are found with a frame-energy detector whose threshold adapts to
+# the recording's noise floor, padded, merged across short pauses and
+# concatenated with a short gap between them. A TimestampMap records where
+# each kept region came from so utterance times from the transcriber can
+# be mapped back onto the original recording.
+
+FRAME_SECONDS = 0.03
+NOISE_PERCENTILE = 10       # quietest frames estimate the noise floor
+SPEECH_MARGIN_DB = 12.0     # speech = this far above the noise floor ...
+MIN_SPEECH_DBFS = -55.0     # ... and never below this absolute level
+PAD_SECONDS = 0.3           # keep some context around each region
+MERGE_GAP_SECONDS = 0.8     # pauses shorter than this stay in
+MIN_REGION_SECONDS = 0.25   # isolated clicks are dropped
+JOIN_GAP_SECONDS = 0.3      # silence inserted between kept regions
+SKIP_IF_KEPT_ABOVE = 0.9    # not worth re-encoding if little would be cut
+VAD_ENABLED = os.getenv("VAD_ENABLED", "1") != "0"
+
+
+def frame_dbfs(samples: np.ndarray, frame: int) -> np.ndarray:
+    n = len(samples) // frame
+    frames = samples[:n * frame].reshape(n, frame)
+    return 20 * np.log10(np.sqrt(np.mean(frames ** 2, axis=1)) + 1e-9)
+
+
+def detect_speech(samples: np.ndarray, sample_rate: int = SAMPLE_RATE):
+    """Speech regions as a list of (start_sample, end_sample)."""
+    frame = int(sample_rate * FRAME_SECONDS)
+    db = frame_dbfs(samples, frame)
+    if not len(db):
+        return []
+    threshold = max(np.percentile(db, NOISE_PERCENTILE) + SPEECH_MARGIN_DB, MIN_SPEECH_DBFS)
+    speech = db > threshold
+
+    regions = []
+    start = None
+    for i, is_speech in enumerate(np.append(speech, False)):
+        if is_speech and start is None:
+            start = i
+        elif not is_speech and start is not None:
+            regions.append([start * frame, i * frame])
+            start = None
+
+    pad = int(PAD_SECONDS * sample_rate)
+    merged = []
+    for s, e in regions:
+        s, e = max(0, s - pad), min(len(samples), e + pad)
+        if merged and s - merged[-1][1] <= MERGE_GAP_SECONDS * sample_rate:
+            merged[-1][1] = max(merged[-1][1], e)
+        else:
+            merged.append([s, e])
+    return [(s, e) for s, e in merged if e - s >= MIN_REGION_SECONDS * sample_rate]
+
+
+class TimestampMap:
+    """Maps times in the trimmed audio back to the original recording."""
+
+    def __init__(self, segments):
+        """segments: list of (trimmed_start, original_start, duration) in seconds."""
+        self.segments = segments
+        self._starts = [s[0] for s in segments]
+
+    def to_original(self, t: float) -> float:
+        if not self.segments:
+            return t
+        i = max(0, bisect.bisect_right(self._starts, t) - 1)
+        trimmed_start, original_start, duration = self.segments[i]
+        # times in the inserted gap after a region stick to that region's end
+        return round(original_start + min(t - trimmed_start, duration), 3)
+
+
+def trim_silence(samples: np.ndarray, sample_rate: int = SAMPLE_RATE):
+    """
+    Returns (trimmed samples, TimestampMap, stats). The map is empty and
+    the input is returned unchanged when there is nothing worth cutting.
+    """
+    total = len(samples)
+    regions = detect_speech(samples, sample_rate)
+    kept = sum(e - s for s, e in regions)
+    stats = {
+        "originalSeconds": round(total / sample_rate, 2),
+        "speechSeconds": round(kept / sample_rate, 2),
+        "regions": len(regions),
+    }
+    if not regions or kept >= SKIP_IF_KEPT_ABOVE * total:
+        return samples, TimestampMap([]), {**stats, "trimmedRatio": 0.0}
+
+    gap = np.zeros(int(JOIN_GAP_SECONDS * sample_rate), dtype=samples.dtype)
+    pieces, segments, position = [], [], 0
+    for i, (s, e) in enumerate(regions):
+        if i:
+            pieces.append(gap)
+            position += len(gap)
+        pieces.append(samples[s:e])
+        segments.append((position / sample_rate, s / sample_rate, (e - s) / sample_rate))
+        position += e - s
+
+    trimmed = np.concatenate(pieces)
+    stats["trimmedRatio"] = round(1 - len(trimmed) / total, 3)
+    return trimmed, TimestampMap(segments), stats
@@ -1,7 +1,8 @@
 import json
 import uuid
-import faiss
-from sentence_transformers import SentenceTransformer
+from embedding_service import get_encoder
+from vector_store import build_index
+from metrics import timed
 import google.generativeai as genai
 
 # ------------------- Step 1: Prepare JSON chunks -------------------
@@ -34,27 +35,23 @@ def prepare_chunks_for_embedding(json_data):
 
 # ------------------- Step 2: Generate embeddings -------------------
 
-def embed_chunks(chunks, model_name="all-MiniLM-L6-v2"):
-    model = SentenceTransformer(model_name)
+def embed_chunks(chunks, model_name="all-MiniLM-L6-v2", backend=None):
+    encoder = get_encoder(model_name, backend)
     texts = [c["text"] for c in chunks]
-    embeddings = model.encode(texts, convert_to_numpy=True)
-    for i, c in enumerate(chunks):
-        c["embedding"] = embeddings[i]
+    embeddings = encoder.encode(texts)
+    # Vectors are not copied onto the chunks; the FAISS index is the one store
     return chunks, embeddings
 
 # ------------------- Step 3: Build FAISS index -------------------
 
-def build_faiss_index(embeddings):
-    dim = embeddings.shape[1]
-    index = faiss.IndexFlatL2(dim)  # L2 distance
-    index.add(embeddings)
-    return index
+def build_faiss_index(embeddings, storage=None):
+    return build_index(embeddings, storage)  # L2 distance, fp16 by default
 
 # ------------------- Step 4: Query FAISS -------------------
 
-def query_faiss(index, query_text, chunks, model_name="all-MiniLM-L6-v2", top_k=5):
-    model = SentenceTransformer(model_name)
-    query_embedding = model.encode([query_text], convert_to_numpy=True)
+@timed("search")
+def query_faiss(index, query_text, chunks, model_name="all-MiniLM-L6-v2", top_k=5, backend=None):
+    query_embedding = get_encoder(model_name, backend).encode([query_text])
     distances, indices = index.search(query_embedding, top_k)
 
     results = []
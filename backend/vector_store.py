@@ -0,0 +1,55 @@
+import os
+
+import faiss
+import numpy as np
+
+# ------------------- Compact FAISS vector storage -------------------
+#
+# The FAISS index is the only copy of each embedding; chunks keep text and
+# metadata only. Vectors are stored as fp16 (half the memory, rankings
+# unchanged in practice) or scalar-quantized int8 (a quarter) instead of
+# a float32 flat index. Use get_vector() if a chunk's vector is needed.
+#
+# int8 learns per-dimension value ranges from the indexed vectors; with only
+# a handful of them (a few profiles) those ranges are degenerate and recall
+# drops, so below INT8_MIN_TRAIN vectors int8 falls back to fp16.
+
+STORAGE_TYPES = {
+    "fp32": None,
+    "fp16": faiss.ScalarQuantizer.QT_fp16,
+    "int8": faiss.ScalarQuantizer.QT_8bit,
+}
+DEFAULT_STORAGE = os.getenv("EMBED_STORAGE", "fp16")
+INT8_MIN_TRAIN = int(os.getenv("EMBED_INT8_MIN_TRAIN", 1000))
+
+
+def build_index(embeddings, storage=None):
+    """L2 index over `embeddings` using the requested storage type."""
+    storage = storage or DEFAULT_STORAGE
+    if storage not in STORAGE_TYPES:
+        raise ValueError(f"Unknown storage {storage!r}; expected one of {list(STORAGE_TYPES)}")
+
+    embeddings = np.ascontiguousarray(embeddings, dtype="float32")
+    dim = embeddings.shape[1]
+    if storage == "int8" and len(embeddings) < INT8_MIN_TRAIN:
+        storage = "fp16"
+
+    if storage == "fp32":
+        index = faiss.IndexFlatL2(dim)
+    else:
+        index = faiss.IndexScalarQuantizer(dim, STORAGE_TYPES[storage], faiss.METRIC_L2)
+        # int8 learns per-dimension ranges; fp16 training is a no-op
+        index.train(embeddings)
+    index.add(embeddings)
+    return index
+
+
+def get_vector(index, i):
+    """Decoded float32 vector of the i-th indexed chunk."""
+    return index.reconstruct(int(i))
+
+
+def index_memory_bytes(index):
+    """Approximate bytes used by stored vectors."""
+    code_size = getattr(index, "code_size", index.d * 4)
+    return index.ntotal * code_size
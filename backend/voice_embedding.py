@@ -0,0 +1,111 @@
+from __future__ import annotations
+
+import io
+import threading
+from typing import TYPE_CHECKING, List
+
+if TYPE_CHECKING:
+    import numpy as np
+
+# ------------------- ECAPA speaker embeddings -------------------
+#
+# SpeechBrain's ECAPA-TDNN trained on VoxCeleb (config bundled under
+# pretrained_models/spkrec-ecapa-voxceleb). The model is loaded once per
+# process and every call embeds a whole list of clips in one padded
+# encode_batch() forward pass. Embeddings are L2-normalized so cosine
+# similarity is a plain dot product. numpy, pydub and torch are imported
+# inside the functions so importing SAMPLE_RATE / the helpers stays cheap.
+
+ECAPA_SOURCE = "speechbrain/spkrec-ecapa-voxceleb"
+ECAPA_SAVEDIR = "pretrained_models/spkrec-ecapa-voxceleb"
+SAMPLE_RATE = 16000
+
+
+def _audio_segment_to_array(audio) -> np.ndarray:
+    import numpy as np
+
+    audio = audio.set_channels(1).set_frame_rate(SAMPLE_RATE).set_sample_width(2)
+    samples = np.array(audio.get_array_of_samples()).astype(np.float32)
+    return samples / (2 ** 15)
+
+
+def decode_audio_bytes(file_bytes: bytes) -> np.ndarray:
+    """
+    Decode an uploaded clip to 16 kHz mono float32 samples.
+    The browser sends WebM/Opus; anything else ffmpeg understands (e.g. WAV) also works.
+    """
+    from pydub import AudioSegment
+
+    try:
+        audio = AudioSegment.from_file(io.BytesIO(file_bytes), format="webm")
+    except Exception:
+        audio = AudioSegment.from_file(io.BytesIO(file_bytes))
+    return _audio_segment_to_array(audio)
+
+
+def load_audio_file(path: str) -> np.ndarray:
+    """Decode an audio file on disk to 16 kHz mono float32 samples."""
+    from pydub import AudioSegment
+
+    return _audio_segment_to_array(AudioSegment.from_file(path))
+
+
+def l2_normalize(vectors: np.ndarray) -> np.ndarray:
+    import numpy as np
+
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+class VoiceEncoder:
+    """ECAPA speaker encoder; load once and share."""
+
+    def __init__(self, source: str = ECAPA_SOURCE, savedir: str = ECAPA_SAVEDIR, device: str = "cpu"):
+        import numpy as np
+
+        try:
+            from speechbrain.inference.speaker import EncoderClassifier
+        except ImportError:  # speechbrain < 1.0
+            from speechbrain.pretrained import EncoderClassifier
+
+        self.model_id = source
+        self.model = EncoderClassifier.from_hparams(
+            source=source, savedir=savedir, run_opts={"device": device}
+        )
+        self.model.eval()
+        # one second of silence is enough to read the embedding size off the model
+        self.dim = int(self.embed_batch([np.zeros(SAMPLE_RATE, dtype=np.float32)]).shape[1])
+
+    def embed_batch(self, waveforms: List[np.ndarray]) -> np.ndarray:
+        """Embed clips of different lengths in one padded forward pass -> (n, dim)."""
+        import numpy as np
+        import torch
+
+        lengths = [len(w) for w in waveforms]
+        max_len = max(lengths)
+        batch = np.zeros((len(waveforms), max_len), dtype=np.float32)
+        for i, w in enumerate(waveforms):
+            batch[i, :len(w)] = w
+        # relative lengths tell ECAPA's statistics pooling to ignore the padding
+        wav_lens = torch.tensor([n / max_len for n in lengths], dtype=torch.float32)
+
+        with torch.no_grad():
+            emb = self.model.encode_batch(torch.from_numpy(batch), wav_lens)
+        return l2_normalize(emb.squeeze(1).cpu().numpy().astype(np.float32))
+
+    def embed_profile(self, waveforms: List[np.ndarray]) -> np.ndarray:
+        """Averaged, re-normalized embedding of several enrollment samples."""
+        return l2_normalize(self.embed_batch(waveforms).mean(axis=0))
+
+
+_SHARED_ENCODER = None
+_SHARED_ENCODER_LOCK = threading.Lock()
+
+
+def get_voice_encoder() -> VoiceEncoder:
+    """Process-wide VoiceEncoder (the API's speaker matching and local diarization share it)."""
+    global _SHARED_ENCODER
+    with _SHARED_ENCODER_LOCK:
+        if _SHARED_ENCODER is None:
+            _SHARED_ENCODER = VoiceEncoder()
+        return _SHARED_ENCODER
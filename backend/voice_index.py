@@ -0,0 +1,203 @@
+import json
+import os
+import threading
+
+import faiss
+import numpy as np
+
+from .metrics import timed
+from .voice_embedding import l2_normalize
+
+# ------------------- Enrolled voice index -------------------
+#
+# Local FAISS inner-product index over the normalized ECAPA embeddings of
+# every enrolled user (inner product == cosine). Firestore stays the source
+# of truth; the index is
+#
+#   - rebuilt from Firestore on startup if the files are missing or were
+#     built with a different embedding model, and otherwise reconciled with
+#     Firestore by sync() (profiles enrolled by another worker, while this
+#     one was down or during warm-up are added; changed / removed ones fixed),
+#   - updated in place by /voice-profile (upsert by user id),
+#   - persisted to disk after each change (index + JSON sidecar with the
+#     id -> user mapping), written atomically.
+#
+# Speaker matching then costs one search instead of fetching every profile.
+# The index lives in one process; run one API worker per index file.
+
+VOICE_INDEX_PATH = os.getenv("VOICE_INDEX_PATH", "data/voice_index.faiss")
+
+
+def _atomic_write(path, write):
+    tmp = f"{path}.tmp"
+    write(tmp)
+    os.replace(tmp, path)
+
+
+def _write_json(path, data):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+
+
+class VoiceIndex:
+    """Thread-safe, persisted FAISS index of enrolled voice embeddings."""
+
+    def __init__(self, dim, model_id=None, path=VOICE_INDEX_PATH):
+        self.dim = dim
+        self.model_id = model_id
+        self.path = path
+        self.index = faiss.IndexIDMap2(faiss.IndexFlatIP(dim))
+        self.user_ids = {}   # faiss id -> user id
+        self.names = {}      # faiss id -> display name
+        self._ids = {}       # user id -> faiss id
+        self._next_id = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return self.index.ntotal
+
+    @property
+    def version(self):
+        """Increases with every upsert; pass to sync() to keep later updates."""
+        return self._next_id
+
+    # ---------------- Updates ----------------
+
+    def upsert(self, user_id, name, embedding):
+        """Add or replace one user's embedding."""
+        vec = l2_normalize(np.asarray(embedding, dtype=np.float32).reshape(1, -1))
+        if vec.shape[1] != self.dim:
+            raise ValueError(f"Expected a {self.dim}-dim voice embedding, got {vec.shape[1]}")
+        with self._lock:
+            old = self._ids.pop(user_id, None)
+            if old is not None:
+                self.index.remove_ids(np.array([old], dtype=np.int64))
+                self.user_ids.pop(old, None)
+                self.names.pop(old, None)
+            new = self._next_id
+            self._next_id += 1
+            self.index.add_with_ids(vec, np.array([new], dtype=np.int64))
+            self._ids[user_id] = new
+            self.user_ids[new] = user_id
+            self.names[new] = name
+
+    def remove(self, user_id):
+        with self._lock:
+            old = self._ids.pop(user_id, None)
+            if old is None:
+                return False
+            self.index.remove_ids(np.array([old], dtype=np.int64))
+            self.user_ids.pop(old, None)
+            self.names.pop(old, None)
+            return True
+
+    def rebuild(self, profiles):
+        """Replace the contents with `profiles`: iterable of (user_id, name, embedding)."""
+        with self._lock:
+            self.index.reset()
+            self.user_ids, self.names, self._ids, self._next_id = {}, {}, {}, 0
+        for user_id, name, embedding in profiles:
+            if embedding is not None and len(embedding) == self.dim:
+                self.upsert(user_id, name, embedding)
+
+    def sync(self, profiles, since=None):
+        """
+        Bring the index in line with `profiles` (iterable of (user_id, name,
+        embedding), the source of truth): add missing users, replace changed
+        names or embeddings, drop users no longer enrolled.
+        Entries upserted after `version` was `since` are newer than the
+        profile list and left alone.
+        Returns the number of entries changed.
+        """
+        wanted = {
+            user_id: (name, embedding)
+            for user_id, name, embedding in profiles
+            if embedding is not None and len(embedding) == self.dim
+        }
+        with self._lock:
+            current = {
+                user_id: (self.names[fid], self.index.reconstruct(int(fid)))
+                for user_id, fid in self._ids.items()
+                if since is None or fid < since
+            }
+            newer = set(self._ids) - current.keys()
+
+        changed = 0
+        for user_id in current.keys() - wanted.keys() - newer:
+            self.remove(user_id)
+            changed += 1
+        for user_id, (name, embedding) in wanted.items():
+            if user_id in newer:
+                continue
+            vec = l2_normalize(np.asarray(embedding, dtype=np.float32))
+            have = current.get(user_id)
+            if have is None or have[0] != name or not np.allclose(have[1], vec, atol=1e-5):
+                self.upsert(user_id, name, embedding)
+                changed += 1
+        return changed
+
+    # ---------------- Lookup ----------------
+
+    @timed("search")
+    def search(self, queries, k):
+        """
+        Top-k (scores, users) per query row, highest cosine first, where
+        users[i][j] is the (user_id, name) of hit j. Ids are resolved under
+        the same lock as the search so a concurrent upsert / remove can't
+        leave a hit pointing at a removed or replaced user.
+        """
+        queries = np.ascontiguousarray(l2_normalize(np.asarray(queries, dtype=np.float32)))
+        with self._lock:
+            k = min(k, self.index.ntotal)
+            if k == 0:
+                return np.zeros((len(queries), 0)), [[] for _ in queries]
+            scores, ids = self.index.search(queries, k)
+            users = [
+                [(self.user_ids[int(fid)], self.names[int(fid)]) if fid >= 0 else None for fid in row]
+                for row in ids
+            ]
+        return scores, users
+
+    # ---------------- Persistence ----------------
+
+    def _meta_path(self):
+        return os.path.splitext(self.path)[0] + ".json"
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with self._lock:
+            meta = {
+                "dim": self.dim,
+                "model_id": self.model_id,
+                "next_id": self._next_id,
+                "entries": [[fid, uid, self.names[fid]] for fid, uid in self.user_ids.items()],
+            }
+            _atomic_write(self.path, lambda tmp: faiss.write_index(self.index, tmp))
+            _atomic_write(self._meta_path(), lambda tmp: _write_json(tmp, meta))
+
+    @classmethod
+    def load(cls, dim, model_id=None, path=VOICE_INDEX_PATH):
+        """
+        Load a saved index, or return None if there is none usable
+        (missing, a different model or dimension, or out of sync).
+        """
+        voice_index = cls(dim, model_id=model_id, path=path)
+        if not (os.path.exists(path) and os.path.exists(voice_index._meta_path())):
+            return None
+        try:
+            with open(voice_index._meta_path(), "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            index = faiss.read_index(path)
+        except Exception as e:
+            print(f"⚠️ Could not read voice index {path}: {e}")
+            return None
+        if meta.get("dim") != dim or meta.get("model_id") != model_id or index.ntotal != len(meta["entries"]):
+            return None
+
+        voice_index.index = index
+        voice_index._next_id = meta["next_id"]
+        for fid, uid, name in meta["entries"]:
+            voice_index.user_ids[fid] = uid
+            voice_index.names[fid] = name
+            voice_index._ids[uid] = fid
+        return voice_index
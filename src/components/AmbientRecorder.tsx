@@ -1,14 +1,138 @@
 import { useRef, useState, useEffect } from 'react';
 import { useAuth } from '@/hooks/useAuth';
 import { Button } from '@/components/ui/button';
-import { Square } from 'lucide-react';
+import { RotateCcw, Square } from 'lucide-react';
 import { toast } from 'sonner';
 
+const API = 'http://localhost:8000';
+// recorder chunks are collected into ~1 MB parts and uploaded while recording;
+// a backlog left by failed uploads is sent in parts of at most maxPartBytes
+const PART_BYTES = 1024 * 1024;
+const MAX_RETRIES = 5;
+
+type UploadSession = { id: string; sent: number; maxPartBytes: number };
+
+const sleep = (ms: number) => new Promise((resolve) => setTimeout(resolve, ms));
+
+const errorDetail = async (res: Response) => {
+  try {
+    const { detail } = await res.json();
+    return typeof detail === 'string' ? detail : detail?.message ?? res.statusText;
+  } catch {
+    return res.statusText;
+  }
+};
+
+// retries network errors and 5xx responses; any other response is returned as is
+const fetchWithRetry = async (url: string, init?: RequestInit) => {
+  for (let attempt = 1; ; attempt++) {
+    try {
+      const res = await fetch(url, init);
+      if (res.status < 500 || attempt > MAX_RETRIES) return res;
+    } catch (error) {
+      if (attempt > MAX_RETRIES) throw error;
+    }
+    await sleep(500 * 2 ** attempt);
+  }
+};
+
+const sha256Hex = async (blob: Blob) => {
+  const digest = await crypto.subtle.digest('SHA-256', await blob.arrayBuffer());
+  return Array.from(new Uint8Array(digest))
+    .map((b) => b.toString(16).padStart(2, '0'))
+    .join('');
+};
+
 const AmbientRecorder = () => {
   const mediaRecorderRef = useRef<MediaRecorder | null>(null);
-  const chunksRef = useRef<Blob[]>([]);
+  // chunks not yet acknowledged by the server
+  const pendingRef = useRef<Blob[]>([]);
+  const pendingBytesRef = useRef(0);
+  const uploadRef = useRef<UploadSession | null>(null);
+  const timestampRef = useRef('');
+  // serializes part uploads so offsets stay in order
+  const flushRef = useRef<Promise<void>>(Promise.resolve());
   const { user } = useAuth();
   const [isRecording, setIsRecording] = useState(false);
+  // the last save failed; the session and pending chunks are kept for a retry
+  const [canRetry, setCanRetry] = useState(false);
+  const [isSaving, setIsSaving] = useState(false);
+
+  const ensureUpload = async (): Promise<UploadSession | null> => {
+    if (uploadRef.current) return uploadRef.current;
+    if (!user) return null;
+
+    const formData = new FormData();
+    formData.append('userId', user.uid);
+    formData.append('timestamp', timestampRef.current);
+    const res = await fetchWithRetry(`${API}/uploads`, { method: 'POST', body: formData });
+    if (!res.ok) throw new Error(`Failed to start upload: ${await errorDetail(res)}`);
+    const data = await res.json();
+    uploadRef.current = { id: data.uploadId, sent: 0, maxPartBytes: data.maxPartBytes };
+    return uploadRef.current;
+  };
+
+  const sendPart = async (upload: UploadSession, part: Blob) => {
+    let resyncs = 0;
+    while (part.size > 0) {
+      const res = await fetchWithRetry(`${API}/uploads/${upload.id}/parts?offset=${upload.sent}`, {
+        method: 'PUT',
+        headers: {
+          'Content-Type': 'application/octet-stream',
+          'X-Content-SHA256': await sha256Hex(part),
+        },
+        body: part,
+      });
+
+      if (res.status === 409 && ++resyncs <= MAX_RETRIES) {
+        // out of step (e.g. the last response was lost): resume from the server's offset
+        const statusRes = await fetchWithRetry(`${API}/uploads/${upload.id}`);
+        if (!statusRes.ok) throw new Error(`Upload status failed: ${await errorDetail(statusRes)}`);
+        const status = await statusRes.json();
+        if (status.received < upload.sent) throw new Error('Server lost part of the upload');
+        part = part.slice(status.received - upload.sent);
+        upload.sent = status.received;
+        continue;
+      }
+      if (!res.ok) throw new Error(`Part upload failed (${res.status}): ${await errorDetail(res)}`);
+
+      const data = await res.json();
+      upload.sent = data.received;
+      return;
+    }
+  };
+
+  // drop the first `bytes` of the pending chunks once the server has them
+  const dropSent = (bytes: number) => {
+    const pending = pendingRef.current;
+    while (bytes > 0 && pending.length > 0) {
+      if (pending[0].size <= bytes) {
+        bytes -= pending.shift()!.size;
+      } else {
+        pending[0] = pending[0].slice(bytes);
+        bytes = 0;
+      }
+    }
+    pendingBytesRef.current = pending.reduce((total, blob) => total + blob.size, 0);
+  };
+
+  const flush = (final = false) => {
+    const run = flushRef.current.then(async () => {
+      while (pendingBytesRef.current >= PART_BYTES || (final && pendingBytesRef.current > 0)) {
+        const upload = await ensureUpload();
+        if (!upload) return;
+
+        // ondataavailable keeps appending while the part is in flight
+        const part = new Blob(pendingRef.current, { type: 'audio/webm' }).slice(0, upload.maxPartBytes);
+        const before = upload.sent;
+        await sendPart(upload, part);
+        dropSent(upload.sent - before);
+      }
+    });
+    // later flushes wait for this one but retry from the acknowledged offset if it failed
+    flushRef.current = run.catch((error) => console.error('❌ Chunk upload failed:', error));
+    return final ? run : flushRef.current;
+  };
 
   const startRecording = async () => {
     try {
@@ -22,11 +146,17 @@ const AmbientRecorder = () => {
 
       const mediaRecorder = new MediaRecorder(stream);
       mediaRecorderRef.current = mediaRecorder;
-      chunksRef.current = [];
+      pendingRef.current = [];
+      pendingBytesRef.current = 0;
+      uploadRef.current = null;
+      flushRef.current = Promise.resolve();
+      timestampRef.current = new Date().toISOString().replace(/[:.]/g, '-');
 
       mediaRecorder.ondataavailable = (event) => {
         if (event.data.size > 0) {
-          chunksRef.current.push(event.data);
+          pendingRef.current.push(event.data);
+          pendingBytesRef.current += event.data.size;
+          if (pendingBytesRef.current >= PART_BYTES) flush();
         }
       };
 
@@ -40,6 +170,42 @@ const AmbientRecorder = () => {
     }
   };
 
+  // upload whatever is left, then assemble and process on the server
+  const saveRecording = async () => {
+    if (!user) return;
+    setIsSaving(true);
+    try {
+      await flush(true);
+      const upload = await ensureUpload();
+      if (!upload) throw new Error('No upload session');
+
+      const formData = new FormData();
+      formData.append('size', String(upload.sent));
+      // not retried automatically: a failure here already ran the whole pipeline
+      const res = await fetch(`${API}/uploads/${upload.id}/finalize`, {
+        method: 'POST',
+        body: formData,
+      });
+      if (!res.ok) throw new Error(await errorDetail(res));
+
+      const data = await res.json();
+      console.log('Parsed JSON:', data);
+      pendingRef.current = [];
+      pendingBytesRef.current = 0;
+      uploadRef.current = null;
+      setCanRetry(false);
+      toast.success('Recording processed successfully!');
+      console.log('✅ Recording finished and processed.');
+    } catch (error) {
+      // keep the session and pending chunks: finalize can be retried from the failed state
+      console.error('❌ Failed to process audio:', error);
+      toast.error(`Error processing recording: ${error instanceof Error ? error.message : error}`);
+      setCanRetry(true);
+    } finally {
+      setIsSaving(false);
+    }
+  };
+
   const stopAndSaveRecording = async () => {
     console.log('🛑 Stopping recording...');
     if (mediaRecorderRef.current?.state !== 'recording') return;
@@ -48,60 +214,12 @@ const AmbientRecorder = () => {
       if (!mediaRecorderRef.current) return resolve();
 
       mediaRecorderRef.current.addEventListener('stop', async () => {
-        try {
-          const blob = new Blob(chunksRef.current, { type: 'audio/webm' });
-          const timestamp = new Date().toISOString().replace(/[:.]/g, '-');
-
-          // Simulate an absolute file path on your local filesystem
-          // Replace this base path with your real data folder path on disk
-          
-          const absoluteFilePath = "C:/Users/slneha/Documents/AI Hackathon 2025/data/recording_"+timestamp+".webm";
-
-          console.log('🗂 File saved at (absolute path):', absoluteFilePath);
-
-          // Pass only the absolute file path to backend
-          if (user) {
-            const formData = new FormData();
-            formData.append('userId', user.uid);
-            formData.append('timestamp', timestamp);
-            formData.append('filePath', blob, absoluteFilePath); // pass absolute path
-
-            try {
-              const res = await fetch('http://localhost:8000/process-audio', {
-                method: 'POST',
-                body: formData,
-              });
-
-
-              const responseText = await res.text();
-              console.log("Raw response:", res);
-
-              try {
-                const data = JSON.parse(responseText);
-                console.log("Parsed JSON:", data);
-                toast.success('Recording processed successfully!');
-              } catch (e) {
-                console.error("Failed to parse JSON:", e);
-                toast.error('Invalid JSON response from server.');
-              }
-            } catch (error) {
-              console.error('❌ Failed to process audio:', error);
-              toast.error('Error processing recording.');
-            }
-          }
-
-          chunksRef.current = [];
-          setIsRecording(false);
-          console.log('✅ Recording finished and processed.');
-        } catch (error) {
-          console.error('Error saving recording:', error);
-          toast.error('Error saving recording.');
-        }
-
+        setIsRecording(false);
         // Stop all tracks
         if (mediaRecorderRef.current) {
           mediaRecorderRef.current.stream.getTracks().forEach((track) => track.stop());
         }
+        await saveRecording();
         resolve();
       });
 
@@ -113,13 +231,28 @@ const AmbientRecorder = () => {
     startRecording();
   }, []);
 
+  if (canRetry && !isRecording) {
+    return (
+      <Button
+        onClick={saveRecording}
+        variant="destructive"
+        size="sm"
+        className="fixed bottom-4 right-4 z-50"
+        disabled={isSaving}
+      >
+        <RotateCcw className="mr-2 h-4 w-4" />
+        Retry Upload
+      </Button>
+    );
+  }
+
   return (
     <Button
       onClick={stopAndSaveRecording}
       variant="destructive"
       size="sm"
       className="fixed bottom-4 right-4 z-50"
-      disabled={!isRecording}
+      disabled={!isRecording || isSaving}
     >
       <Square className="mr-2 h-4 w-4" />
       Stop Recording
@@ -127,4 +260,4 @@ const AmbientRecorder = () => {
   );
 };
 
-export default AmbientRecorder;
\ No newline at end of file
+export default AmbientRecorder;
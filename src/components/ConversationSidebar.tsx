@@ -1,4 +1,4 @@
-import { useEffect, useState } from 'react';
+import { useCallback, useEffect, useState } from 'react';
 import { useAuth } from '@/hooks/useAuth';
 import { ScrollArea } from '@/components/ui/scroll-area';
 import { Card } from '@/components/ui/card';
@@ -10,40 +10,43 @@ interface Conversation {
   id: string;
   timestamp: string;
   speakers: string[];
-  graph: ConversationGraph;
-  // if your backend returns extra fields, you can add them here
+  title?: string | null;
 }
 
 interface ConversationSidebarProps {
   onSelectConversation: (conversation: { id: string; graph: ConversationGraph } | null) => void;
 }
 
+const PAGE_SIZE = 20;
+
 export const ConversationSidebar = ({ onSelectConversation }: ConversationSidebarProps) => {
   const { user } = useAuth();
   const [conversations, setConversations] = useState<Conversation[]>([]);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
   const [selectedId, setSelectedId] = useState<string | null>(null);
   const [loading, setLoading] = useState(false);
   const [isCollapsed, setIsCollapsed] = useState(false);
 
-  useEffect(() => {
-    // no user yet -> don't fetch
-    if (!user) return;
-
-    const fetchConversations = async () => {
+  const fetchConversations = useCallback(
+    async (cursor: string | null) => {
+      if (!user) return;
       setLoading(true);
       try {
-        const res = await fetch(
-          `http://localhost:8000/get-conversations?user_id=${encodeURIComponent(user.uid)}`
-        );
+        const params = new URLSearchParams({ user_id: user.uid, limit: String(PAGE_SIZE) });
+        if (cursor) params.set('cursor', cursor);
+
+        // revalidate with the stored ETag; an unchanged list comes back as a 304
+        const res = await fetch(`http://localhost:8000/get-conversations?${params.toString()}`, {
+          cache: 'no-cache',
+        });
         if (!res.ok) {
           console.error('❌ backend returned non-OK for get-conversations', res.status);
           return;
         }
         const data = await res.json();
-        console.log('📥 /get-conversations response:', data);
 
-        // data shape from backend:
-        // { count: number, conversations: [ { id, timestamp, speakers, graph, ... } ] }
+        // data shape from backend (list fields only, no mindmap/graph):
+        // { count, conversations: [ { id, timestamp, speakers, title } ], nextCursor }
         const convs = (data.conversations || []).map((c: any) => {
           // normalize timestamp
           const ts =
@@ -55,29 +58,53 @@ export const ConversationSidebar = ({ onSelectConversation }: ConversationSideba
             id: c.id,
             timestamp: ts,
             speakers: Array.isArray(c.speakers) ? c.speakers : [],
-            graph: (c.graph || c.mindmap || {}) as ConversationGraph,
+            title: c.title ?? null,
           } as Conversation;
         });
 
         console.log('✅ parsed conversations:', convs.length);
-        setConversations(convs);
+        setConversations((prev) => (cursor ? [...prev, ...convs] : convs));
+        setNextCursor(data.nextCursor ?? null);
       } catch (err) {
         console.error('🔥 error fetching conversations from backend:', err);
       } finally {
         setLoading(false);
       }
-    };
+    },
+    [user]
+  );
 
-    fetchConversations();
-  }, [user]);
+  useEffect(() => {
+    // no user yet -> don't fetch
+    if (!user) return;
+    fetchConversations(null);
+  }, [user, fetchConversations]);
 
-  const handleSelectConversation = (conv: Conversation) => {
+  const handleSelectConversation = async (conv: Conversation) => {
     if (selectedId === conv.id) {
       setSelectedId(null);
       onSelectConversation(null);
-    } else {
-      setSelectedId(conv.id);
-      onSelectConversation({ id: conv.id, graph: conv.graph });
+      return;
+    }
+    if (!user) return;
+
+    setSelectedId(conv.id);
+    try {
+      // the mindmap/graph is only loaded for the conversation being opened
+      const res = await fetch(
+        `http://localhost:8000/conversations/${encodeURIComponent(conv.id)}?user_id=${encodeURIComponent(user.uid)}&include=graph`
+      );
+      if (!res.ok) {
+        console.error('❌ backend returned non-OK for conversation detail', res.status);
+        return;
+      }
+      const detail = await res.json();
+      onSelectConversation({
+        id: conv.id,
+        graph: (detail.graph || detail.mindmap || {}) as ConversationGraph,
+      });
+    } catch (err) {
+      console.error('🔥 error fetching conversation detail:', err);
     }
   };
 
@@ -108,13 +135,29 @@ export const ConversationSidebar = ({ onSelectConversation }: ConversationSideba
               onClick={() => handleSelectConversation(conv)}
             >
               <div className="text-sm font-medium text-foreground">
-                {new Date(conv.timestamp).toLocaleString()}
+                {conv.title || new Date(conv.timestamp).toLocaleString()}
               </div>
+              {conv.title && (
+                <div className="text-xs text-muted-foreground">
+                  {new Date(conv.timestamp).toLocaleString()}
+                </div>
+              )}
               <div className="text-xs text-muted-foreground mt-1">
                 {conv.speakers?.join(', ') || 'Unknown speakers'}
               </div>
             </Card>
           ))}
+          {nextCursor && (
+            <Button
+              variant="ghost"
+              size="sm"
+              className="w-full"
+              disabled={loading}
+              onClick={() => fetchConversations(nextCursor)}
+            >
+              {loading ? 'Loading…' : 'Load more'}
+            </Button>
+          )}
         </div>
       </ScrollArea>
     </div>
@@ -1,4 +1,4 @@
-import { useCallback, useState } from 'react';
+import { useCallback, useMemo, useState } from 'react';
 import {
   ReactFlow,
   Background,
@@ -28,10 +28,32 @@ export const MindmapVisualization = ({ graph }: MindmapVisualizationProps) => {
     conversation: string;
   } | null>(null);
 
-  const initialNodes: Node[] = graph.nodes.map((node, index) => ({
+  const graphNodes = graph.nodes ?? [];
+  const graphEdges = graph.edges ?? [];
+
+  // id -> item lookups; use the backend's precomputed indexes when present
+  const nodeById = useMemo(() => {
+    const index = graph.nodeIndex;
+    return new Map(
+      index
+        ? Object.entries(index).map(([id, i]) => [id, graphNodes[i]])
+        : graphNodes.map((n) => [n.id, n])
+    );
+  }, [graph.nodeIndex, graphNodes]);
+  const edgeById = useMemo(() => {
+    const index = graph.edgeIndex;
+    return new Map(
+      index
+        ? Object.entries(index).map(([id, i]) => [id, graphEdges[i]])
+        : graphEdges.map((e) => [e.id, e])
+    );
+  }, [graph.edgeIndex, graphEdges]);
+
+  const initialNodes: Node[] = graphNodes.map((node, index) => ({
     id: node.id,
     data: { label: node.label },
-    position: { x: (index % 3) * 200, y: Math.floor(index / 3) * 150 },
+    // backend lays the graph out; grid fallback for graphs stored without positions
+    position: node.position ?? { x: (index % 3) * 200, y: Math.floor(index / 3) * 150 },
     style: {
       background: 'hsl(var(--primary))',
       color: 'hsl(var(--primary-foreground))',
@@ -41,7 +63,7 @@ export const MindmapVisualization = ({ graph }: MindmapVisualizationProps) => {
     },
   }));
 
-  const initialEdges: Edge[] = graph.edges.map((edge) => ({
+  const initialEdges: Edge[] = graphEdges.map((edge) => ({
     id: edge.id,
     source: edge.source,
     target: edge.target,
@@ -68,18 +90,18 @@ export const MindmapVisualization = ({ graph }: MindmapVisualizationProps) => {
   }, [setNodes]);
 
   const onNodeClick: NodeMouseHandler = useCallback((_, node) => {
-    const nodeData = graph.nodes.find((n) => n.id === node.id);
+    const nodeData = nodeById.get(node.id);
     if (nodeData) {
       setSelectedItem({ type: 'node', conversation: nodeData.conversation });
     }
-  }, [graph.nodes]);
+  }, [nodeById]);
 
   const onEdgeClick: EdgeMouseHandler = useCallback((_, edge) => {
-    const edgeData = graph.edges.find((e) => e.id === edge.id);
+    const edgeData = edgeById.get(edge.id);
     if (edgeData) {
       setSelectedItem({ type: 'edge', conversation: edgeData.conversation });
     }
-  }, [graph.edges]);
+  }, [edgeById]);
 
   return (
     <div className="h-full flex flex-col">
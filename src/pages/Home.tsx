@@ -12,13 +12,20 @@ export interface ConversationGraph {
     id: string;
     label: string;
     conversation: string;
+    kind?: string;
+    // precomputed by the backend layout stage
+    position?: { x: number; y: number };
   }>;
   edges: Array<{
     id: string;
     source: string;
     target: string;
     conversation: string;
+    type?: string;
   }>;
+  // id -> array index, precomputed by the backend
+  nodeIndex?: Record<string, number>;
+  edgeIndex?: Record<string, number>;
 }
 
 const Home = () => {